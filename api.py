@@ -0,0 +1,383 @@
+# ============================================================
+# Study Buddy Quest - JSON API 🔌
+# A headless, async HTTP API next to the Streamlit app: quiz
+# generation (topic or image), the quiz parsers and grading,
+# plus a batch endpoint that runs many generations at once.
+# It runs in the same process as the app, so it shares the
+# Gemini client, the gateway's response cache, the rate
+# limiter and telemetry. Blocking Gemini calls run on the
+# thread pool and take their turn in the app's generation
+# queue; the event loop only routes requests.
+#
+# Needs starlette and uvicorn (pip install starlette uvicorn).
+#
+# Environment:
+#   STUDY_BUDDY_API_PORT  serve the API on this port; unset = off
+#   STUDY_BUDDY_API_KEY   required bearer token / X-API-Key
+#
+# Standalone: python api.py --port 8600
+# ============================================================
+
+import argparse
+import asyncio
+import base64
+import binascii
+import hmac
+import importlib.util
+import os
+import sys
+import threading
+
+try:
+    from starlette.applications import Starlette
+    from starlette.concurrency import run_in_threadpool
+    from starlette.responses import JSONResponse
+    from starlette.routing import Route
+except ImportError:  # the app runs fine without the API
+    Starlette = None
+
+import telemetry
+from job_queue import GENERATION_QUEUE, QueueFullError
+from quiz_generation import (
+    classify_generation_error,
+    gemini_configured,
+    generate_quiz_from_image,
+    generate_quiz_with_gemini,
+    parse_generated_quiz,
+)
+from quiz_logic import (
+    calculate_level,
+    grade_answers,
+    parse_individual_questions,
+    parse_quiz_answers,
+    score_quiz,
+    strip_answers_from_quiz,
+)
+from rate_limit import RateLimitedError, Requester
+
+INSTALL_HINT = "The JSON API needs starlette and uvicorn: pip install starlette uvicorn"
+DIFFICULTIES = {"easy": "Easy 🌱", "medium": "Medium 🌿", "hard": "Hard 🌳"}
+MAX_QUESTIONS = 15
+MAX_BATCH = 20
+BATCH_CONCURRENCY = 4
+IMAGE_TYPES = ("image/jpeg", "image/png", "image/webp")
+
+API_REQUESTS = telemetry.REGISTRY.counter(
+    "study_buddy_api_requests_total", "JSON API requests by endpoint and status"
+)
+
+
+class ApiError(Exception):
+    """A request the API rejects with a given status and message."""
+
+    def __init__(self, status: int, message: str, headers: dict = None):
+        self.status = status
+        self.message = message
+        self.headers = headers or {}
+        super().__init__(message)
+
+
+# ============================================================
+# REQUEST FIELDS
+# ============================================================
+def _text(body: dict, name: str, required: bool = True, limit: int = 200) -> str:
+    value = body.get(name)
+    if value is None or (isinstance(value, str) and not value.strip()):
+        if required:
+            raise ApiError(422, f"'{name}' is required")
+        return None
+    if not isinstance(value, str):
+        raise ApiError(422, f"'{name}' must be a string")
+    return value.strip()[:limit]
+
+
+def _difficulty(body: dict) -> str:
+    value = (_text(body, "difficulty", required=False) or "medium").split()[0].lower()
+    if value not in DIFFICULTIES:
+        raise ApiError(422, "'difficulty' must be easy, medium or hard")
+    return DIFFICULTIES[value]
+
+
+def _num_questions(body: dict) -> int:
+    value = body.get("num_questions", 5)
+    if not isinstance(value, int) or isinstance(value, bool) or not 1 <= value <= MAX_QUESTIONS:
+        raise ApiError(422, f"'num_questions' must be a whole number from 1 to {MAX_QUESTIONS}")
+    return value
+
+
+def _answers(body: dict, name: str) -> list:
+    value = body.get(name)
+    if not isinstance(value, list) or not all(isinstance(a, str) or a is None for a in value):
+        raise ApiError(422, f"'{name}' must be a list of answer letters")
+    return value
+
+
+def _requester(body: dict) -> Requester:
+    """Rate limit identity: each API student gets their own budget inside their classroom's."""
+    student = _text(body, "student", required=False, limit=80) or "anonymous"
+    classroom = _text(body, "classroom", required=False, limit=80) or "api"
+    return Requester(session=f"api:{student}", student=f"api:{student}", classroom=classroom)
+
+
+# ============================================================
+# OPERATIONS - Blocking; run on the thread pool
+# ============================================================
+def quiz_payload(quiz_content: str, num_questions: int) -> dict:
+    """Generated quiz text plus its parsed questions, answers and explanations."""
+    parsed = parse_generated_quiz(quiz_content, num_questions)
+    return {
+        "questions": [
+            {"number": q["number"], "text": q["text"], "options": q["options"]}
+            for q in parsed["parsed_questions"]
+        ],
+        "correct_answers": parsed["correct_answers"],
+        "explanations": parsed["explanations"],
+        "quiz_text": parsed["questions_only"],
+    }
+
+
+def _require_gemini():
+    # A missing key is the server's problem, not a bad request
+    if not gemini_configured():
+        raise ApiError(503, "Quiz generation is unavailable: Gemini is not configured on this server")
+
+
+def topic_quiz(body: dict) -> dict:
+    """Generate a quiz on a topic (same prompt and caching as the app)."""
+    _require_gemini()
+    topic = _text(body, "topic")
+    num_questions = _num_questions(body)
+    quiz_content = GENERATION_QUEUE.run(
+        generate_quiz_with_gemini, topic, _difficulty(body),
+        grade_level=_text(body, "grade_level", required=False),
+        num_questions=num_questions,
+        requester=_requester(body),
+        priority="text",
+    )
+    return dict(quiz_payload(quiz_content, num_questions), topic=topic)
+
+
+def image_quiz(body: dict) -> dict:
+    """Generate a quiz from a base64 photo of notes or a worksheet."""
+    _require_gemini()
+    mime_type = _text(body, "mime_type", required=False) or "image/jpeg"
+    if mime_type not in IMAGE_TYPES:
+        raise ApiError(422, f"'mime_type' must be one of {', '.join(IMAGE_TYPES)}")
+    try:
+        image_bytes = base64.b64decode(_text(body, "image_base64", limit=20_000_000), validate=True)
+    except (binascii.Error, ValueError):
+        raise ApiError(422, "'image_base64' is not valid base64")
+    num_questions = _num_questions(body)
+    quiz_content, detected_topic = GENERATION_QUEUE.run(
+        generate_quiz_from_image, image_bytes, _difficulty(body),
+        grade_level=_text(body, "grade_level", required=False),
+        num_questions=num_questions,
+        mime_type=mime_type,
+        requester=_requester(body),
+        priority="image",
+    )
+    return dict(quiz_payload(quiz_content, num_questions), topic=detected_topic)
+
+
+def parse_quiz(body: dict) -> dict:
+    """Run the app's parsers over quiz text (no validation, no Gemini call)."""
+    quiz_text = _text(body, "quiz_text", limit=100_000)
+    correct_answers, explanations = parse_quiz_answers(quiz_text)
+    return {
+        "questions": parse_individual_questions(quiz_text),
+        "correct_answers": correct_answers,
+        "explanations": explanations,
+        "quiz_text": strip_answers_from_quiz(quiz_text),
+    }
+
+
+def grade_quiz(body: dict) -> dict:
+    """Grade answers and score the Experience Points exactly as the submit button does."""
+    user_answers = _answers(body, "user_answers")
+    correct_answers = _answers(body, "correct_answers")
+    total_score = body.get("total_score", 0)
+    if not isinstance(total_score, int) or isinstance(total_score, bool) or total_score < 0:
+        raise ApiError(422, "'total_score' must be a whole number of Experience Points")
+    elapsed, total_time = body.get("elapsed_s"), body.get("total_time_s")
+    if elapsed is not None or total_time is not None:
+        if not all(isinstance(v, (int, float)) and not isinstance(v, bool) and v >= 0 for v in (elapsed, total_time)):
+            raise ApiError(422, "'elapsed_s' and 'total_time_s' go together and must be seconds")
+    correct_count, wrong_questions = grade_answers(user_answers, correct_answers)
+    xp = score_quiz(correct_count, calculate_level(total_score), elapsed, total_time)
+    return {
+        "correct": correct_count,
+        "total": min(len(user_answers), len(correct_answers)),
+        "wrong_questions": wrong_questions,
+        "xp": xp,
+        "new_total_score": total_score + xp["total"],
+        "new_level": calculate_level(total_score + xp["total"]),
+    }
+
+
+# ============================================================
+# HTTP LAYER
+# ============================================================
+def _error(e: Exception) -> tuple:
+    """(status, JSON body, headers) for a failed operation."""
+    if isinstance(e, ApiError):
+        return e.status, {"error": e.message}, e.headers
+    if isinstance(e, RateLimitedError):
+        classify_generation_error(e)
+        return 429, {"error": str(e), "retry_after": e.retry_after}, {"Retry-After": str(e.retry_after)}
+    if isinstance(e, QueueFullError):
+        classify_generation_error(e)
+        return 503, {"error": str(e), "retry_after": e.retry_after}, {"Retry-After": str(e.retry_after)}
+    # Bad requests are ApiErrors from the field checks; anything else (including the
+    # parser's "Quiz generation incomplete") is an upstream failure
+    print(f"API operation failed: {type(e).__name__}: {e}")
+    return 502, {"error": "Quiz generation failed", "category": classify_generation_error(e)}, {}
+
+
+def _authorized(request) -> bool:
+    expected = os.environ.get("STUDY_BUDDY_API_KEY", "")
+    supplied = request.headers.get("x-api-key", "")
+    auth = request.headers.get("authorization", "")
+    if auth.lower().startswith("bearer "):
+        supplied = auth[7:].strip()
+    return bool(expected) and hmac.compare_digest(supplied.encode(), expected.encode())
+
+
+async def _json_body(request) -> dict:
+    try:
+        body = await request.json()
+    except ValueError:
+        raise ApiError(400, "Request body must be JSON")
+    if not isinstance(body, dict):
+        raise ApiError(400, "Request body must be a JSON object")
+    return body
+
+
+def _endpoint(name: str, operation):
+    """Wrap operation(body) -> dict as an authorized, traced JSON endpoint.
+
+    Plain functions run on the thread pool; coroutine functions run on the loop.
+    """
+    is_async = asyncio.iscoroutinefunction(operation)
+
+    async def endpoint(request):
+        status, headers = 200, {}
+        try:
+            if not _authorized(request):
+                raise ApiError(401, "Missing or wrong API key")
+            body = await _json_body(request)
+            with telemetry.trace_span(f"api.{name}"):
+                payload = await operation(body) if is_async else await run_in_threadpool(operation, body)
+        except Exception as e:
+            status, payload, headers = _error(e)
+        API_REQUESTS.inc(endpoint=name, status=str(status))
+        return JSONResponse(payload, status_code=status, headers=headers)
+
+    return endpoint
+
+
+BATCH_OPERATIONS = {"quiz": topic_quiz, "image": image_quiz, "parse": parse_quiz, "grade": grade_quiz}
+
+
+async def run_batch(body: dict) -> dict:
+    """Run up to MAX_BATCH items, BATCH_CONCURRENCY at a time; each result has its own status."""
+    items = body.get("items")
+    if not isinstance(items, list) or not 1 <= len(items) <= MAX_BATCH:
+        raise ApiError(422, f"'items' must be a list of 1 to {MAX_BATCH} requests")
+    limit = asyncio.Semaphore(BATCH_CONCURRENCY)
+
+    async def run(item):
+        try:
+            if not isinstance(item, dict) or item.get("type") not in BATCH_OPERATIONS:
+                raise ApiError(422, f"each item needs a 'type' of {', '.join(BATCH_OPERATIONS)}")
+            async with limit:
+                return {"status": 200, "result": await run_in_threadpool(BATCH_OPERATIONS[item["type"]], item)}
+        except Exception as e:
+            status, payload, _ = _error(e)
+            return dict(payload, status=status)
+
+    return {"results": await asyncio.gather(*(run(item) for item in items))}
+
+
+async def health(request):
+    return JSONResponse({"status": "ok", "gemini_configured": gemini_configured()})
+
+
+def create_app():
+    """The Starlette application (raises RuntimeError without starlette)."""
+    if Starlette is None:
+        raise RuntimeError(INSTALL_HINT)
+    return Starlette(routes=[
+        Route("/api/health", health, methods=["GET"]),
+        Route("/api/quiz", _endpoint("quiz", topic_quiz), methods=["POST"]),
+        Route("/api/quiz/image", _endpoint("image", image_quiz), methods=["POST"]),
+        Route("/api/parse", _endpoint("parse", parse_quiz), methods=["POST"]),
+        Route("/api/grade", _endpoint("grade", grade_quiz), methods=["POST"]),
+        Route("/api/batch", _endpoint("batch", run_batch), methods=["POST"]),
+    ])
+
+
+# ============================================================
+# SERVER - Background thread next to the app, or standalone
+# ============================================================
+_server_lock = threading.Lock()
+_server = None
+_server_failed = False
+
+
+def _can_start(port: int) -> bool:
+    if Starlette is None:
+        print(INSTALL_HINT)
+        return False
+    if importlib.util.find_spec("uvicorn") is None:
+        print(INSTALL_HINT)
+        return False
+    if not os.environ.get("STUDY_BUDDY_API_KEY"):
+        print(f"JSON API not started on port {port}: set STUDY_BUDDY_API_KEY first")
+        return False
+    return True
+
+
+def start_api_server(port: int, host: str = "0.0.0.0"):
+    """Serve the API with uvicorn on a daemon thread; safe to call on every rerun."""
+    global _server, _server_failed
+    with _server_lock:
+        if _server is not None or _server_failed:
+            return _server
+        if not _can_start(port):
+            _server_failed = True
+            return None
+        import uvicorn
+
+        config = uvicorn.Config(create_app(), host=host, port=port, log_level="warning")
+        _server = uvicorn.Server(config)
+        # The app's thread owns signal handling, not this one
+        _server.install_signal_handlers = lambda: None
+        threading.Thread(target=_server.run, name="api-server", daemon=True).start()
+        return _server
+
+
+def start_api_server_from_env():
+    """Start the JSON API if STUDY_BUDDY_API_PORT is set."""
+    port = os.environ.get("STUDY_BUDDY_API_PORT")
+    if port and port.isdigit():
+        return start_api_server(int(port))
+    return None
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Serve the Study Buddy Quest JSON API.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=int(os.environ.get("STUDY_BUDDY_API_PORT") or 8600))
+    args = parser.parse_args(argv)
+    if not _can_start(args.port):
+        return 1
+    if not gemini_configured():
+        print("⚠️ Gemini is not configured; only /api/parse and /api/grade will work")
+    import uvicorn
+
+    uvicorn.run(create_app(), host=args.host, port=args.port, log_level="info")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
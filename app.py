@@ -11,12 +11,73 @@ import random
 import time
 import base64
 import html
+import uuid
+import tempfile
 from io import BytesIO
 from gtts import gTTS
 
+from quiz_logic import (
+    BADGES,
+    GRADE_LEVELS,
+    QUESTION_EMOJIS,
+    QUIZ_LENGTHS,
+    find_new_badges,
+    calculate_level,
+    get_points_for_next_level,
+    get_level_title,
+    get_level_perk,
+    strip_answers_from_quiz,
+    get_emoji_for_answer,
+    sanitize_topic,
+    parse_review_bundle,
+    format_quiz_text,
+    grade_answers,
+    score_quiz,
+    REVIEW_BUNDLE_SCHEMA,
+)
+import profiling
+import telemetry
+import background
+import gemini_gateway
+from rate_limit import LIMITER, RateLimitedError, Requester
+from tutor_session import TutorSession, quiz_fingerprint
+from topic_index import canonical_topic_key
+from item_bank import ITEM_BANK, QUIZ_SOURCES, content_hash
+from quiz_variants import make_variant, variant_seed
+from review_queue import ReviewScheduler
+from mastery import MasteryTracker
+from certificates import certificate_stats, render_certificate_html, render_certificate_png
+from quiz_timer import quiz_timer, verified_elapsed
+from results_view import notes_card_html, results_html, summary_card_html
+from progress_series import chart_frames
+from quiz_generation import (
+    classify_generation_error,
+    gemini_configured,
+    generate_quiz_from_image,
+    generate_quiz_with_gemini,
+    get_client,
+    parse_generated_quiz,
+    quiz_token_estimate,
+)
+import certificate_batch
+import api
+import quiz_packs
+from job_queue import GENERATION_QUEUE, job_priority
+from rooms import ROOMS, normalize_code as normalize_room_code
+from leaderboard import GLOBAL_SCOPE, LEADERBOARDS
+
+# ============================================================
+# RERUN PROFILING - Times each section below (see profiling.py)
+# ============================================================
+if 'session_id' not in st.session_state:
+    st.session_state.session_id = uuid.uuid4().hex[:12]
+rerun_profile = profiling.start_rerun(st.session_state.get('rerun_profile'), st.session_state.session_id)
+st.session_state.rerun_profile = rerun_profile
+
 # ============================================================
 # PAGE CONFIGURATION - Must be first Streamlit command
 # ============================================================
+profiling.section("page_config")
 st.set_page_config(
     page_title="Study Buddy Quest 🧠",
     page_icon="🧠",
@@ -28,12 +89,8 @@ st.set_page_config(
 # This uses Replit's managed Gemini access (no personal API key needed)
 # Usage is billed through your Replit account/credits
 # ============================================================
-from google import genai
-
-AI_INTEGRATIONS_GEMINI_API_KEY = os.environ.get("AI_INTEGRATIONS_GEMINI_API_KEY")
-AI_INTEGRATIONS_GEMINI_BASE_URL = os.environ.get("AI_INTEGRATIONS_GEMINI_BASE_URL")
-
-if not AI_INTEGRATIONS_GEMINI_API_KEY or not AI_INTEGRATIONS_GEMINI_BASE_URL:
+profiling.section("gemini_setup")
+if not gemini_configured():
     st.error("""
     ## 🔧 AI Integration Setup Required
     
@@ -43,18 +100,22 @@ if not AI_INTEGRATIONS_GEMINI_API_KEY or not AI_INTEGRATIONS_GEMINI_BASE_URL:
     """)
     st.stop()
 
-# Configure Gemini client using Replit AI Integrations
-client = genai.Client(
-    api_key=AI_INTEGRATIONS_GEMINI_API_KEY,
-    http_options={
-        'api_version': '',
-        'base_url': AI_INTEGRATIONS_GEMINI_BASE_URL
-    }
-)
+# Gemini client using Replit AI Integrations, created once per process (see quiz_generation.py)
+client = get_client()
+
+# Prometheus /metrics endpoint (only when STUDY_BUDDY_METRICS_PORT is set)
+telemetry.start_metrics_server_from_env()
+
+# JSON API next to the app (only when STUDY_BUDDY_API_PORT is set)
+api.start_api_server_from_env()
+
+# Prebuilt quiz packs into the response cache and item bank (only when STUDY_BUDDY_QUIZ_PACKS is set)
+quiz_packs.seed_from_env()
 
 # ============================================================
 # SESSION STATE INITIALIZATION
 # ============================================================
+profiling.section("session_state")
 defaults = {
     "quiz_content": None,
     "quiz_questions_only": None,
@@ -65,11 +126,13 @@ defaults = {
     "explanations": [],
     "user_answers": [],
     "score": 0,
+    "current_topic_key": "",
+    "quiz_item_ids": [],
+    "quiz_source": "",
     "current_topic": "",
     "total_score": 0,
     "quizzes_completed": 0,
     "perfect_scores": 0,
-    "weak_topics": [],
     "wrong_questions": [],
     "badges": [],
     "quiz_error": None,
@@ -79,8 +142,15 @@ defaults = {
     "selected_category": None,
     "timed_mode": False,
     "quiz_start_time": None,
+    "quiz_shown_at": None,
+    "answer_times": {},
+    "room_code": None,
+    "teaching_room": None,
+    "room_quiz": None,
     "time_per_question": 30,
     "study_notes": None,
+    "deep_explanations": {},
+    "review_bundle": None,
     "high_contrast": False,
     "reduce_animations": False,
     "default_timed_mode": False,
@@ -89,6 +159,7 @@ defaults = {
     "student_name": "",
     "tutor_chat_history": [],
     "tutor_panel_open": False,
+    "stream_tutor": True,
     "image_quiz_mode": False,
     "uploaded_image": None,
     "xp_history": [],
@@ -97,9 +168,213 @@ defaults = {
     "popup_type": None,
 }
 
+# ============================================================
+# ADMIN ACCESS - Debug tools for teachers/maintainers
+# Shown only when the URL has ?admin=<STUDY_BUDDY_ADMIN_KEY>
+# ============================================================
+ADMIN_KEY = os.environ.get("STUDY_BUDDY_ADMIN_KEY")
+
+def is_admin():
+    """Check if this session opened the app with the admin key."""
+    return bool(ADMIN_KEY) and st.query_params.get("admin") == ADMIN_KEY
+
+# ============================================================
+# RATE LIMITING - Who is asking, for the Gemini token budgets
+# ?student=<id>&classroom=<code> group sessions; otherwise each
+# session only counts against its own budget (see rate_limit.py)
+# ============================================================
+# Post-quiz summary, notes and tips come from one structured call unless
+# STUDY_BUDDY_POST_QUIZ_MODE=separate (the original one-call-per-feature flow)
+REVIEW_BUNDLE_MODE = os.environ.get("STUDY_BUDDY_POST_QUIZ_MODE", "bundle") != "separate"
+REVIEW_BUNDLE_TIMEOUT_S = 60
+
+def current_requester():
+    """Build the rate-limit identity for this session."""
+    session_id = st.session_state.session_id
+    return Requester(
+        session=session_id,
+        student=st.query_params.get("student") or session_id,
+        classroom=st.query_params.get("classroom") or session_id,
+    )
+
+# ============================================================
+# GENERATION QUEUE - Quizzes wait their turn for a Gemini
+# worker (see job_queue.py); the loader shows the place in line
+# ============================================================
+QUEUE_POLL_S = 0.25
+
+GENERATION_LOADER_CSS = """
+<style>
+@import url('https://fonts.googleapis.com/css2?family=Nunito:wght@600&display=swap');
+.loading-card {
+    display: flex;
+    justify-content: center;
+    margin: 20px auto;
+    max-width: 380px;
+}
+.word-loader {
+    color: #a0a0b0;
+    font-family: 'Nunito', sans-serif;
+    font-weight: 600;
+    font-size: 24px;
+    height: 40px;
+    padding: 10px 10px;
+    display: flex;
+    border-radius: 20px;
+}
+.cycling-words {
+    overflow: hidden;
+    position: relative;
+}
+.cycling-word {
+    display: block;
+    height: 100%;
+    padding-left: 8px;
+    color: #8b5cf6;
+    animation: spin_words 5s infinite;
+}
+@keyframes spin_words {
+    10% { transform: translateY(-102%); }
+    25% { transform: translateY(-100%); }
+    35% { transform: translateY(-202%); }
+    50% { transform: translateY(-200%); }
+    60% { transform: translateY(-302%); }
+    75% { transform: translateY(-300%); }
+    85% { transform: translateY(-402%); }
+    100% { transform: translateY(-400%); }
+}
+</style>
+"""
+
+
+def generation_loader_html(position: int) -> str:
+    """Animated loader: the student's place in line while queued, then the cycling GENERATING words."""
+    if position > 0:
+        heading = f"<p>#{position} IN LINE</p>"
+        words = ["WAITING", "FOR A", "QUIZ", "WRITER", "WAITING"]
+    else:
+        heading = "<p>GENERATING</p>"
+        words = ["QUESTIONS", "ANSWERS", "EXPLANATIONS", "YOUR QUIZ", "QUESTIONS"]
+    spans = "".join(f'<span class="cycling-word">{word}</span>' for word in words)
+    return (GENERATION_LOADER_CSS + '<div class="loading-card"><div class="word-loader">'
+            + heading + f'<div class="cycling-words">{spans}</div></div></div>')
+
+
+def wait_for_generation(job, placeholder):
+    """Wait for a queued generation, updating the loader whenever the place in line changes."""
+    shown = None
+    with telemetry.trace_span("generation_queue_wait", priority=job.priority) as span:
+        try:
+            while True:
+                position = job.position()
+                if position != shown:
+                    placeholder.markdown(generation_loader_html(position), unsafe_allow_html=True)
+                    if shown is None:
+                        span.set_attribute("queue.position", position)
+                    shown = position
+                if job.wait(QUEUE_POLL_S):
+                    break
+        except BaseException:
+            # The student left (rerun or closed tab): give the slot back if it hasn't started
+            job.cancel()
+            raise
+    return job.result()
+
+# ============================================================
+# ITEM BANK - Questions are kept and reused (see item_bank.py)
+# A text quiz is assembled from questions the student hasn't
+# seen yet; Gemini is only asked when the topic's bank is thin
+# ============================================================
+def assemble_quiz_from_bank(topic_key: str, difficulty: str, grade_level: str, num_questions: int,
+                            requester: Requester = None) -> list:
+    """Unseen bank questions for a new quiz, or None when Gemini should write it."""
+    if ITEM_BANK is None or not topic_key:
+        return None
+    student = (requester or current_requester()).student
+    return ITEM_BANK.assemble(topic_key, difficulty.split()[0], grade_level, student, num_questions)
+
+def save_quiz_to_bank(topic_key: str, difficulty: str, grade_level: str, parsed_questions: list,
+                      correct_answers: list, explanations: list) -> list:
+    """Bank a freshly generated quiz and mark its questions as seen; returns the bank ids."""
+    if ITEM_BANK is None or not topic_key or len(parsed_questions) != len(correct_answers):
+        # Only bank quizzes whose questions and answers line up one-to-one
+        return []
+    item_ids = ITEM_BANK.add_quiz(topic_key, difficulty.split()[0], grade_level, parsed_questions,
+                                  correct_answers, explanations)
+    ITEM_BANK.mark_seen(current_requester().student, item_ids)
+    return item_ids
+
+# ============================================================
+# QUIZ VARIANTS - Each session gets its own question and option
+# order (see quiz_variants.py); STUDY_BUDDY_QUIZ_VARIANTS=off
+# keeps the order Gemini wrote
+# ============================================================
+QUIZ_VARIANTS = os.environ.get("STUDY_BUDDY_QUIZ_VARIANTS", "on").lower() != "off"
+
+# ============================================================
+# SPACED REPETITION - Missed questions come back for review
+# ============================================================
+def update_review_queue(wrong_questions: list):
+    """Schedule this quiz's missed questions and promote review cards answered correctly."""
+    scheduler = st.session_state.review_scheduler
+    correct_answers = st.session_state.correct_answers
+    explanations = st.session_state.explanations
+    missed = set(wrong_questions)
+    for i, q in enumerate(st.session_state.parsed_questions[:len(correct_answers)]):
+        key = content_hash(q['text'], q['options'])
+        if i + 1 in missed:
+            scheduler.record_miss(key, {
+                'text': q['text'],
+                'options': q['options'],
+                'answer': correct_answers[i],
+                'explanation': explanations[i] if i < len(explanations) else "",
+                'emoji': q.get('emoji', ''),
+                'topic': st.session_state.current_topic,
+                'topic_key': st.session_state.current_topic_key,
+            })
+        else:
+            scheduler.record_correct(key)
+
+# ============================================================
+# TOPIC MASTERY - Which topics the student finds hardest
+# ============================================================
+def record_mastery(correct_count: int, total_questions: int):
+    """Fold this quiz's result into the student's topic mastery."""
+    st.session_state.mastery.record(
+        st.session_state.current_topic_key,
+        st.session_state.current_topic,
+        st.session_state.get('current_difficulty', 'Medium').split()[0],
+        correct_count,
+        total_questions,
+    )
+
+def weak_topic_labels() -> list:
+    """Weakest topics first, for the adaptive section of the quiz prompt."""
+    return [topic for topic, _ in st.session_state.mastery.weakest()]
+
+# ============================================================
+# TIMED MODE - When the server saw each question first answered
+# ============================================================
+def record_answer_time(idx: int):
+    """Radio on_change callback: keep the first time question idx was answered."""
+    st.session_state.answer_times.setdefault(idx, time.time())
+
+# ============================================================
+# NEXT-QUIZ PREFETCH - While results are showing, "same topic
+# again" and "same topic, harder" are prepared in the background
+# so either can start instantly. STUDY_BUDDY_PREFETCH_BUDGET caps
+# the speculative quizzes per session per hour
+# ============================================================
+HARDER_DIFFICULTY = {"Easy 🌱": "Medium 🌿", "Medium 🌿": "Hard 🌳"}
+NEXT_QUIZ_WAIT_S = 60
+NEXT_QUIZ_BUDGET_WINDOW_S = 3600
+_prefetch_budget = os.environ.get("STUDY_BUDDY_PREFETCH_BUDGET", "")
+NEXT_QUIZ_BUDGET = int(_prefetch_budget) if _prefetch_budget.isdigit() else 6
+
 # ============================================================
 # SUBJECT CATEGORIES (Grade-dependent for school topics)
 # ============================================================
+profiling.section("categories")
 DEFAULT_CATEGORIES = [
     "Any Topic",
     "Science",
@@ -135,6 +410,25 @@ for key, value in defaults.items():
     if key not in st.session_state:
         st.session_state[key] = value
 
+# Background prefetch tasks for this session (see background.py)
+if 'background_tasks' not in st.session_state:
+    st.session_state.background_tasks = background.SessionTasks()
+
+# Missed questions waiting for spaced-repetition review (see review_queue.py)
+if 'review_scheduler' not in st.session_state:
+    st.session_state.review_scheduler = ReviewScheduler()
+
+# Speculative next quizzes, kept apart from the per-quiz tasks above
+if 'next_quiz_tasks' not in st.session_state:
+    st.session_state.next_quiz_tasks = background.SessionTasks()
+    st.session_state.next_quiz_params = {}
+    st.session_state.next_quiz_jobs = {}
+    st.session_state.next_quiz_spent_at = []  # when each speculative quiz in the budget window started
+
+# Decayed accuracy per topic, feeding the adaptive prompt (see mastery.py)
+if 'mastery' not in st.session_state:
+    st.session_state.mastery = MasteryTracker()
+
 # Ensure timed_mode respects default_timed_mode preference on fresh sessions
 if 'timed_mode_initialized' not in st.session_state:
     st.session_state.timed_mode = st.session_state.get('default_timed_mode', False)
@@ -143,6 +437,7 @@ if 'timed_mode_initialized' not in st.session_state:
 # ============================================================
 # POPUP NOTIFICATION SYSTEM
 # ============================================================
+profiling.section("popup_system")
 def show_popup(message, popup_type="warning"):
     """Show a popup notification. Type can be 'warning', 'error', or 'success'."""
     st.session_state.popup_message = message
@@ -218,19 +513,7 @@ def get_popup_html():
 # ============================================================
 # BADGE SYSTEM
 # ============================================================
-BADGES = {
-    "first_quiz": {"emoji": "🎯", "name": "First Quiz!", "desc": "Complete your first quiz"},
-    "five_quizzes": {"emoji": "📚", "name": "Quiz Explorer", "desc": "Complete 5 quizzes"},
-    "ten_quizzes": {"emoji": "🏅", "name": "Quiz Master", "desc": "Complete 10 quizzes"},
-    "points_50": {"emoji": "⭐", "name": "50 Points!", "desc": "Earn 50 total points"},
-    "points_100": {"emoji": "🌟", "name": "100 Points!", "desc": "Earn 100 total points"},
-    "points_200": {"emoji": "💫", "name": "200 Points!", "desc": "Earn 200 total points"},
-    "points_500": {"emoji": "🔥", "name": "500 Points!", "desc": "Earn 500 total points"},
-    "perfect_score": {"emoji": "💯", "name": "Perfect Score!", "desc": "Get 5/5 on a quiz"},
-    "three_perfects": {"emoji": "🏆", "name": "Perfectionist", "desc": "Get 3 perfect scores"},
-    "level_5": {"emoji": "👑", "name": "Level 5 Hero", "desc": "Reach Level 5"},
-}
-
+profiling.section("badge_system")
 ENCOURAGEMENTS = [
     "You're leveling up your brain! 🧠✨",
     "Every question makes you smarter! 💪",
@@ -248,511 +531,26 @@ LOADING_MESSAGES = [
     "🔥 Almost ready to challenge you...",
 ]
 
-QUESTION_EMOJIS = ["🔢", "🧮", "🎯", "🌟", "🏆", "📚", "💡", "🔬", "🌍", "🎨", "🚀", "⭐", "🎓", "🧠", "✨"]
-
 
 def check_and_award_badges():
     """Check and award any new badges based on current stats."""
-    new_badges = []
-    
-    badge_conditions = [
-        ("first_quiz", st.session_state.quizzes_completed >= 1),
-        ("five_quizzes", st.session_state.quizzes_completed >= 5),
-        ("ten_quizzes", st.session_state.quizzes_completed >= 10),
-        ("points_50", st.session_state.total_score >= 50),
-        ("points_100", st.session_state.total_score >= 100),
-        ("points_200", st.session_state.total_score >= 200),
-        ("points_500", st.session_state.total_score >= 500),
-        ("perfect_score", st.session_state.perfect_scores >= 1),
-        ("three_perfects", st.session_state.perfect_scores >= 3),
-        ("level_5", calculate_level(st.session_state.total_score) >= 5),
-    ]
-    
-    for badge_id, condition in badge_conditions:
-        if condition and badge_id not in st.session_state.badges:
-            st.session_state.badges.append(badge_id)
-            new_badges.append(badge_id)
-    
+    new_badges = find_new_badges(
+        st.session_state.quizzes_completed,
+        st.session_state.total_score,
+        st.session_state.perfect_scores,
+        st.session_state.badges,
+    )
+    st.session_state.badges.extend(new_badges)
     return new_badges
 
 
-def xp_required_for_level(level: int) -> int:
-    """Get total XP required to reach a specific level.
-    Level 1: 0 XP, Level 2: 50 XP, Level 3: 125 XP (50+75), Level 4: 225 XP (50+75+100), etc.
-    Each level requires 25 more XP than the previous."""
-    if level <= 1:
-        return 0
-    total = 0
-    for lvl in range(2, level + 1):
-        total += 50 + (lvl - 2) * 25  # Level 2 needs 50, Level 3 needs 75, etc.
-    return total
-
-
-def calculate_level(total_points: int) -> int:
-    """Calculate player level based on total points (progressive XP requirements)."""
-    level = 1
-    while xp_required_for_level(level + 1) <= total_points:
-        level += 1
-    return level
-
-
-def get_points_for_next_level(total_points: int) -> tuple:
-    """Get progress toward next level."""
-    current_level = calculate_level(total_points)
-    xp_at_current_level = xp_required_for_level(current_level)
-    xp_for_next_level = xp_required_for_level(current_level + 1)
-    points_into_level = total_points - xp_at_current_level
-    xp_needed = xp_for_next_level - xp_at_current_level
-    return points_into_level, xp_needed
-
-
-def get_level_title(level: int) -> str:
-    """Get fun title based on level."""
-    titles = {
-        1: "Curious Beginner 🌱",
-        2: "Knowledge Seeker 📖",
-        3: "Quiz Explorer 🗺️",
-        4: "Brain Builder 🧱",
-        5: "Study Champion 🏅",
-        6: "Wisdom Warrior ⚔️",
-        7: "Master Learner 🎓",
-        8: "Knowledge Knight 🛡️",
-        9: "Quiz Legend 🌟",
-        10: "Ultimate Genius 👑"
-    }
-    if level >= 10:
-        return titles[10]
-    return titles.get(level, f"Level {level} Hero 🦸")
-
-# Level perks - what each level unlocks
-LEVEL_PERKS = {
-    1: "Start your learning journey!",
-    2: "Unlock Quiz History tracking",
-    3: "Unlock Timed Challenge Mode",
-    4: "Unlock AI Study Notes",
-    5: "Earn the Study Champion badge!",
-    6: "Get +5% bonus Experience Points on all quizzes",
-    7: "Get +10% bonus Experience Points on all quizzes",
-    8: "Get +15% bonus Experience Points on all quizzes",
-    9: "Get +20% bonus Experience Points on all quizzes",
-    10: "Maximum +25% bonus Experience Points + all features unlocked!"
-}
-
-def get_level_perk(level: int) -> str:
-    """Get the perk for a specific level."""
-    if level >= 10:
-        return LEVEL_PERKS[10]
-    return LEVEL_PERKS.get(level, "Keep learning!")
-
-
-def strip_answers_from_quiz(quiz_text: str) -> str:
-    """Remove answers and explanations from quiz text."""
-    quiz_text = re.sub(r'✅\s*\*\*Correct Answer:.*?\*\*\s*\n?', '', quiz_text)
-    quiz_text = re.sub(r'>\s*💡\s*\*\*Explanation:\*\*.*?(?=\n\n|---|\n###|$)', '', quiz_text, flags=re.DOTALL)
-    quiz_text = re.sub(r'##\s*🎊\s*Quiz Complete!.*$', '', quiz_text, flags=re.DOTALL)
-    quiz_text = re.sub(r'\n{3,}', '\n\n', quiz_text)
-    return quiz_text.strip()
-
-
 def get_random_encouragement():
     """Get a random encouraging message."""
     return random.choice(ENCOURAGEMENTS)
 
 
-def get_emoji_for_answer(answer_text: str) -> str:
-    """Get a descriptive emoji based on answer content."""
-    text = answer_text.lower()
-    
-    emoji_keywords = {
-        "🏛️": ["roman", "rome", "empire", "ancient", "greek", "greece", "egypt", "pyramid", "pharaoh", "temple", "civilization"],
-        "🌍": ["earth", "world", "globe", "planet", "continent", "geography", "country", "nation"],
-        "🌊": ["ocean", "sea", "water", "wave", "marine", "fish", "whale", "dolphin", "beach", "river", "lake"],
-        "🌋": ["volcano", "lava", "eruption", "magma", "tectonic"],
-        "🔬": ["science", "experiment", "laboratory", "research", "scientist", "microscope", "cell", "bacteria"],
-        "⚗️": ["chemistry", "chemical", "element", "atom", "molecule", "compound", "reaction"],
-        "🧬": ["dna", "gene", "genetic", "biology", "evolution", "species"],
-        "🔭": ["space", "star", "planet", "galaxy", "universe", "astronaut", "nasa", "telescope", "moon", "sun", "solar", "astronomy"],
-        "🚀": ["rocket", "spacecraft", "launch", "mission", "orbit"],
-        "🧮": ["math", "number", "calculate", "equation", "formula", "algebra", "geometry", "fraction", "decimal", "percent"],
-        "📐": ["angle", "triangle", "square", "rectangle", "circle", "shape", "polygon"],
-        "💻": ["computer", "technology", "digital", "software", "internet", "code", "programming", "algorithm"],
-        "📱": ["phone", "mobile", "app", "device", "smart"],
-        "🎨": ["art", "paint", "draw", "color", "artist", "museum", "sculpture", "creative"],
-        "🎵": ["music", "song", "melody", "instrument", "orchestra", "band", "rhythm", "note"],
-        "📚": ["book", "read", "library", "literature", "author", "novel", "story", "write"],
-        "🏰": ["castle", "medieval", "knight", "king", "queen", "royal", "kingdom", "palace"],
-        "⚔️": ["war", "battle", "fight", "army", "soldier", "military", "weapon"],
-        "🦖": ["dinosaur", "fossil", "prehistoric", "extinct", "jurassic"],
-        "🐾": ["animal", "mammal", "wildlife", "zoo", "pet", "dog", "cat", "bird"],
-        "🌱": ["plant", "tree", "forest", "flower", "garden", "grow", "seed", "leaf", "nature"],
-        "☀️": ["sun", "sunny", "solar", "light", "bright", "heat", "warm", "summer"],
-        "❄️": ["ice", "snow", "cold", "winter", "freeze", "arctic", "polar", "glacier"],
-        "⚡": ["electric", "energy", "power", "lightning", "current", "voltage", "battery"],
-        "🧲": ["magnet", "magnetic", "force", "field", "attract"],
-        "🎭": ["theater", "drama", "play", "actor", "performance", "stage"],
-        "🏆": ["win", "champion", "victory", "first", "best", "gold", "trophy"],
-        "🎮": ["game", "video", "play", "player", "gaming"],
-        "⚽": ["soccer", "football", "sport", "ball", "goal", "team"],
-        "🏀": ["basketball", "nba", "court", "dunk"],
-        "🍎": ["food", "fruit", "apple", "eat", "nutrition", "healthy", "diet"],
-        "🧠": ["brain", "think", "mind", "memory", "intelligence", "smart", "learn"],
-        "❤️": ["heart", "love", "blood", "pump", "cardiovascular"],
-        "🦴": ["bone", "skeleton", "body", "muscle", "organ"],
-        "💰": ["money", "economy", "bank", "finance", "dollar", "currency", "trade", "business"],
-        "🗳️": ["vote", "election", "government", "president", "congress", "democracy", "political"],
-        "📜": ["constitution", "law", "document", "declaration", "rights", "amendment"],
-        "🗽": ["america", "american", "usa", "united states", "liberty", "freedom"],
-        "🎪": ["circus", "carnival", "fun", "entertainment"],
-        "🌈": ["rainbow", "color", "spectrum", "light", "prism"],
-    }
-    
-    for emoji, keywords in emoji_keywords.items():
-        for keyword in keywords:
-            if keyword in text:
-                return emoji
-    
-    # Use deterministic selection based on text hash to prevent emojis changing on rerun
-    fun_defaults = ["✨", "🎯", "💫", "🌟", "🔮", "💎", "🎲", "🧩"]
-    text_hash = sum(ord(c) for c in text)
-    return fun_defaults[text_hash % len(fun_defaults)]
-
-
-def sanitize_topic(topic: str) -> str:
-    """Clean and validate topic input."""
-    topic = topic.strip()
-    topic = re.sub(r'[<>{}|\[\]\\^`]', '', topic)
-    return topic[:100] if len(topic) > 100 else topic
-
-
-def parse_quiz_answers(quiz_text: str) -> tuple:
-    """Parse correct answers and explanations from quiz text."""
-    correct_answers = []
-    explanations = []
-    
-    answer_pattern = r"✅\s*\*\*Correct Answer:\s*([A-Da-d])\s*\*\*"
-    explanation_pattern = r">\s*💡\s*\*\*Explanation:\*\*\s*(.+?)(?=\n\n|---|\n###|$)"
-    
-    answer_matches = re.findall(answer_pattern, quiz_text, re.IGNORECASE)
-    for match in answer_matches:
-        correct_answers.append(match.upper())
-    
-    explanation_matches = re.findall(explanation_pattern, quiz_text, re.DOTALL)
-    for match in explanation_matches:
-        explanations.append(match.strip())
-    
-    return correct_answers, explanations
-
-
-def validate_quiz_data(correct_answers: list, explanations: list, expected_count: int = 5) -> bool:
-    """Validate that quiz data is complete."""
-    if len(correct_answers) < expected_count:
-        return False
-    if len(explanations) < expected_count:
-        while len(explanations) < expected_count:
-            explanations.append("Great effort! Keep learning and you'll master this topic.")
-    for ans in correct_answers[:expected_count]:
-        if ans not in ['A', 'B', 'C', 'D']:
-            return False
-    return True
-
-
-def parse_individual_questions(quiz_text: str) -> list:
-    """Parse quiz into individual questions with their options."""
-    questions = []
-    
-    question_blocks = re.split(r'###\s*Question\s*', quiz_text)
-    
-    for block in question_blocks[1:]:
-        try:
-            first_line_match = re.match(r'(\d+)\s*([^\n]*)', block)
-            if not first_line_match:
-                continue
-            
-            q_num = first_line_match.group(1)
-            emoji = first_line_match.group(2).strip()
-            
-            q_text = ""
-            skip_phrases = ['correct answer', 'explanation', 'great job', 'quiz complete', 
-                           'good job', 'well done', 'keep learning', 'keep going', 
-                           'congratulations', 'awesome work', 'nice work']
-            bold_matches = re.findall(r'\*\*([^*]+)\*\*', block)
-            for match in bold_matches:
-                match_lower = match.lower().strip()
-                if any(phrase in match_lower for phrase in skip_phrases):
-                    continue
-                if len(match) > 10 and '?' in match:
-                    q_text = match.strip()
-                    break
-            
-            if not q_text:
-                lines = block.split('\n')
-                for line in lines[1:6]:
-                    line = line.strip()
-                    if line and not line.startswith('-') and not line.startswith('*') and '✅' not in line and '💡' not in line:
-                        if len(line) > 10:
-                            q_text = line.replace('**', '').strip()
-                            break
-            
-            if not q_text:
-                q_text = f"Question {q_num}"
-            
-            options = {}
-            option_patterns = [
-                r'-\s*([A-Da-d])\)\s*(.+?)(?=\n-\s*[A-Da-d]\)|\n\n|✅|$)',
-                r'\*\s*([A-Da-d])\)\s*(.+?)(?=\n\*\s*[A-Da-d]\)|\n\n|✅|$)',
-                r'([A-Da-d])\)\s*(.+?)(?=\n[A-Da-d]\)|\n\n|✅|$)',
-            ]
-            
-            for pattern in option_patterns:
-                option_matches = re.findall(pattern, block, re.DOTALL)
-                if len(option_matches) >= 4:
-                    for opt_match in option_matches[:4]:
-                        letter = opt_match[0].upper()
-                        text = opt_match[1].strip().rstrip('\n').strip()
-                        options[letter] = text
-                    break
-            
-            if len(options) == 4:
-                questions.append({
-                    'number': int(q_num),
-                    'emoji': emoji,
-                    'text': q_text,
-                    'options': options
-                })
-        except Exception:
-            continue
-    
-    return questions
-
-
-def generate_quiz_with_gemini(topic: str, difficulty: str, weak_topics: list = None, grade_level: str = None, num_questions: int = 5) -> str:
-    """Generate a quiz using Gemini AI."""
-    clean_difficulty = difficulty.split()[0]
-    
-    adaptive_section = ""
-    if weak_topics and len(weak_topics) > 0:
-        weak_topics_str = ", ".join(weak_topics[-5:])
-        adaptive_section = f"""
-ADAPTIVE LEARNING NOTE:
-The student has struggled with these topics recently: {weak_topics_str}
-If any of these topics relate to {topic}, please include 1-2 gentle review questions to help reinforce their understanding. Make these questions encouraging and supportive!
-"""
-    
-    grade_section = ""
-    age_description = "a 14-year-old student"
-    if grade_level and grade_level != "None (Skip)":
-        grade_section = f"\nGrade Level: {grade_level}"
-        if grade_level == "Pre-K":
-            age_description = "a Pre-K student (ages 3-5)"
-        elif grade_level == "Kindergarten":
-            age_description = "a Kindergarten student (ages 5-6)"
-        elif "1st" in grade_level:
-            age_description = "a 1st grade student (ages 6-7)"
-        elif "2nd" in grade_level:
-            age_description = "a 2nd grade student (ages 7-8)"
-        elif "3rd" in grade_level:
-            age_description = "a 3rd grade student (ages 8-9)"
-        elif "4th" in grade_level:
-            age_description = "a 4th grade student (ages 9-10)"
-        elif "5th" in grade_level:
-            age_description = "a 5th grade student (ages 10-11)"
-        elif "6th" in grade_level:
-            age_description = "a 6th grade student (ages 11-12)"
-        elif "7th" in grade_level:
-            age_description = "a 7th grade student (ages 12-13)"
-        elif "8th" in grade_level:
-            age_description = "an 8th grade student (ages 13-14)"
-        elif "9th" in grade_level:
-            age_description = "a 9th grade student (ages 14-15)"
-        elif "10th" in grade_level:
-            age_description = "a 10th grade student (ages 15-16)"
-        elif "11th" in grade_level:
-            age_description = "an 11th grade student (ages 16-17)"
-        elif "12th" in grade_level:
-            age_description = "a 12th grade student (ages 17-18)"
-    
-    questions_template = ""
-    for i in range(1, num_questions + 1):
-        emoji = QUESTION_EMOJIS[(i - 1) % len(QUESTION_EMOJIS)]
-        questions_template += f"""
-### Question {i} {emoji}
-**[Question text here]**
-
-- A) [Option A]
-- B) [Option B]
-- C) [Option C]
-- D) [Option D]
-
-✅ **Correct Answer: [Single Letter A, B, C, or D]**
-
-> 💡 **Explanation:** [Short, friendly explanation]
-
----
-"""
-    
-    prompt = f"""You are a fun and encouraging teacher creating a quiz for {age_description}.
-
-Create a {num_questions}-question multiple-choice quiz about: {topic}
-Difficulty level: {clean_difficulty}{grade_section}
-{adaptive_section}
-Guidelines:
-- Make questions appropriate for {age_description}
-- For Easy: Basic concepts, straightforward questions
-- For Medium: Requires some thinking, applies concepts
-- For Hard: Challenging questions that require deeper understanding
-- Use friendly, encouraging language with emojis
-- Make it fun and engaging!
-
-CRITICAL QUESTION FORMAT RULES:
-- Each question MUST be a real question that ends with a question mark (?)
-- Questions should start with words like: What, Which, Who, When, Where, Why, How, Is, Are, Do, Does, Can, etc.
-- DO NOT write definitions, statements, or descriptions as questions
-- BAD example: "The Libertarian Party believes in limited government" (this is a statement, NOT a question)
-- GOOD example: "What is a core belief of the Libertarian Party?" (this IS a proper question)
-
-IMPORTANT: You MUST follow this EXACT format for each question. Do not deviate!
-
-## 📝 Your {clean_difficulty} Quiz on {topic}!
-{questions_template}
-## 🎊 Quiz Complete!
-
-**Great job working through this quiz!** Keep learning and growing! 🌟
-"""
-    
-    response = client.models.generate_content(
-        model="gemini-2.5-flash",
-        contents=prompt
-    )
-    
-    if not response.text:
-        raise ValueError("No response received from AI. Please try again!")
-    
-    return response.text
-
-
-def generate_quiz_from_image(image_bytes: bytes, difficulty: str, grade_level: str = None, num_questions: int = 5, mime_type: str = "image/jpeg") -> tuple:
-    """Generate a quiz from an uploaded image using Gemini vision."""
-    from io import BytesIO
-    
-    # Preprocess image: convert to RGB with white background for transparent areas
-    try:
-        img = Image.open(BytesIO(image_bytes))
-        
-        # If image has alpha channel (transparency), composite onto white background
-        if img.mode in ('RGBA', 'LA', 'P'):
-            # Create a white background
-            background = Image.new('RGB', img.size, (255, 255, 255))
-            # Convert to RGBA if needed
-            if img.mode == 'P':
-                img = img.convert('RGBA')
-            elif img.mode == 'LA':
-                img = img.convert('RGBA')
-            # Paste the image onto white background using alpha as mask
-            if img.mode == 'RGBA':
-                background.paste(img, mask=img.split()[3])  # Use alpha channel as mask
-            else:
-                background.paste(img)
-            img = background
-        elif img.mode != 'RGB':
-            img = img.convert('RGB')
-        
-        # Save as JPEG for consistent results
-        output_buffer = BytesIO()
-        img.save(output_buffer, format='JPEG', quality=95)
-        image_bytes = output_buffer.getvalue()
-        mime_type = "image/jpeg"
-    except Exception as e:
-        print(f"Image preprocessing warning: {e}")
-        # If preprocessing fails, continue with original bytes
-    
-    clean_difficulty = difficulty.split()[0]
-    
-    grade_section = ""
-    age_description = "a 14-year-old student"
-    if grade_level and grade_level != "None (Skip)":
-        grade_section = f"\nGrade Level: {grade_level}"
-        grade_ages = {
-            "Pre-K": "a 4-year-old", "Kindergarten": "a 5-year-old",
-            "1st Grade": "a 6-year-old", "2nd Grade": "a 7-year-old",
-            "3rd Grade": "an 8-year-old", "4th Grade": "a 9-year-old",
-            "5th Grade": "a 10-year-old", "6th Grade": "an 11-year-old",
-            "7th Grade": "a 12-year-old", "8th Grade": "a 13-year-old",
-            "9th Grade": "a 14-year-old", "10th Grade": "a 15-year-old",
-            "11th Grade": "a 16-year-old", "12th Grade": "a 17-year-old"
-        }
-        age_description = grade_ages.get(grade_level, "a 14-year-old student")
-    
-    questions_template = ""
-    for i in range(1, num_questions + 1):
-        questions_template += f"""
-### Question {i} 🔢
-
-[Question based on the image]?
-
-- A) [Option A]
-- B) [Option B]
-- C) [Option C]
-- D) [Option D]
-
-✅ **Correct Answer: [Single Letter A, B, C, or D]**
-
-> 💡 **Explanation:** [Short, friendly explanation]
-
----
-"""
-    
-    prompt = f"""You are analyzing an educational image to create a quiz for {age_description}.
-
-First, describe what you see in this image briefly (1-2 sentences).
-Then create a {num_questions}-question multiple-choice quiz based on what's shown in the image.
-Difficulty level: {clean_difficulty}{grade_section}
-
-Guidelines:
-- Make questions directly related to what's visible in the image
-- Questions should test understanding of the image content
-- Make questions appropriate for {age_description}
-- Use friendly, encouraging language with emojis
-- Make it fun and engaging!
-
-CRITICAL: Each question MUST end with a question mark (?) and be a real question.
-
-Start your response with:
-**📸 Image Topic: [Brief description of what the image shows]**
-
-Then format the quiz EXACTLY like this:
-
-## 📝 Your {clean_difficulty} Quiz!
-{questions_template}
-## 🎊 Quiz Complete!
-
-**Great job working through this quiz!** Keep learning and growing! 🌟
-"""
-    
-    from google.genai import types
-    
-    response = client.models.generate_content(
-        model="gemini-2.5-flash",
-        contents=[
-            prompt,
-            types.Part(
-                inline_data=types.Blob(
-                    mime_type=mime_type,
-                    data=image_bytes
-                )
-            )
-        ]
-    )
-    
-    if not response.text:
-        raise ValueError("No response received from AI. Please try again!")
-    
-    text = response.text
-    topic_match = re.search(r'\*\*📸 Image Topic:\s*(.+?)\*\*', text)
-    detected_topic = topic_match.group(1).strip() if topic_match else "Image Analysis"
-    
-    return text, detected_topic
-
-
+@profiling.profiled("llm")
+@telemetry.traced_generator
 def generate_quiz_summary(topic: str, correct_count: int, total_questions: int, 
                           parsed_questions: list, user_answers: list, correct_answers: list) -> str:
     """Generate an AI-powered summary of quiz performance."""
@@ -797,20 +595,29 @@ Keep it friendly, supportive, and age-appropriate for a student. Use 1-2 emojis
 IMPORTANT: Use plain text only. Do NOT use any HTML tags, markdown formatting, or special formatting."""
 
     try:
-        response = client.models.generate_content(
+        response = gemini_gateway.generate_content(
+            client,
             model="gemini-2.5-flash",
-            contents=prompt
+            contents=prompt,
+            function="generate_quiz_summary",
+            requester=current_requester(),
+            max_output_tokens=300,
+            cache="prefer",
         )
         
         if response.text:
             return response.text
         return "Great effort on this quiz! Keep practicing and you'll keep improving! 🌟"
-    except Exception:
+    except Exception as e:
+        telemetry.record_fallback(e)
         return "Great effort on this quiz! Keep practicing and you'll keep improving! 🌟"
 
 
+@profiling.profiled("llm")
+@telemetry.traced_generator
 def generate_study_notes(topic: str, correct_count: int, total_questions: int,
-                         parsed_questions: list, correct_answers: list, explanations: list) -> str:
+                         parsed_questions: list, correct_answers: list, explanations: list,
+                         requester: Requester = None) -> str:
     """Generate AI-powered study notes based on quiz content."""
     
     # Build summary of all questions and their key concepts
@@ -839,227 +646,527 @@ Make it engaging for a student. Use simple language.
 IMPORTANT: Use plain text only. Do NOT use any HTML tags or special formatting. Use simple dashes for bullet points."""
 
     try:
-        response = client.models.generate_content(
+        response = gemini_gateway.generate_content(
+            client,
             model="gemini-2.5-flash",
-            contents=prompt
+            contents=prompt,
+            function="generate_study_notes",
+            requester=requester or current_requester(),
+            max_output_tokens=800,
+            cache="prefer",
         )
         
         if response.text:
             return response.text
         return "Study notes could not be generated. Review the explanations above for key concepts!"
-    except Exception:
+    except Exception as e:
+        telemetry.record_fallback(e)
         return "Study notes could not be generated. Review the explanations above for key concepts!"
 
 
+@profiling.profiled("pil")
+@telemetry.traced()
 def generate_certificate_image(student_name: str) -> bytes:
-    """Generate a certificate image using Pillow and return as bytes."""
-    from PIL import Image, ImageDraw, ImageFont
-    from datetime import datetime
-    from io import BytesIO
-    
-    level = calculate_level(st.session_state.total_score)
-    title = get_level_title(level)
-    total_xp = st.session_state.total_score
-    quizzes = st.session_state.quizzes_completed
-    perfect_scores = st.session_state.perfect_scores
-    badges_earned = len(st.session_state.badges)
-    total_badges = len(BADGES)
-    date_str = datetime.now().strftime("%B %d, %Y")
-    
-    width, height = 800, 600
-    img = Image.new('RGB', (width, height), color='#667eea')
-    draw = ImageDraw.Draw(img)
-    
-    draw.rectangle([20, 20, width-20, height-20], outline='#ffd700', width=8)
-    draw.rectangle([30, 30, width-30, height-30], outline='#ffd700', width=2)
-    
-    try:
-        title_font = ImageFont.truetype("/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf", 36)
-        subtitle_font = ImageFont.truetype("/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf", 24)
-        name_font = ImageFont.truetype("/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf", 32)
-        text_font = ImageFont.truetype("/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf", 18)
-        small_font = ImageFont.truetype("/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf", 14)
-    except:
-        title_font = ImageFont.load_default()
-        subtitle_font = ImageFont.load_default()
-        name_font = ImageFont.load_default()
-        text_font = ImageFont.load_default()
-        small_font = ImageFont.load_default()
-    
-    draw.text((width//2, 60), "CERTIFICATE OF ACHIEVEMENT", fill='white', font=title_font, anchor='mm')
-    draw.text((width//2, 100), "Study Buddy Quest", fill='#ffd700', font=subtitle_font, anchor='mm')
-    
-    draw.text((width//2, 160), "This certifies that", fill='white', font=text_font, anchor='mm')
-    display_name = student_name if student_name else "Study Champion"
-    draw.text((width//2, 200), display_name, fill='#ffd700', font=name_font, anchor='mm')
-    draw.text((width//2, 240), "has achieved the rank of", fill='white', font=text_font, anchor='mm')
-    
-    title_clean = title.replace('🌱', '').replace('📖', '').replace('🗺️', '').replace('🧱', '').replace('🏅', '').replace('⚔️', '').replace('🎓', '').replace('🛡️', '').replace('🌟', '').replace('👑', '').replace('🦸', '').strip()
-    draw.text((width//2, 280), f"Level {level} - {title_clean}", fill='white', font=subtitle_font, anchor='mm')
-    
-    stats_y = 340
-    draw.text((200, stats_y), f"Experience Points: {total_xp}", fill='white', font=text_font, anchor='mm')
-    draw.text((600, stats_y), f"Quizzes: {quizzes}", fill='white', font=text_font, anchor='mm')
-    draw.text((200, stats_y + 30), f"Perfect Scores: {perfect_scores}", fill='white', font=text_font, anchor='mm')
-    draw.text((600, stats_y + 30), f"Badges: {badges_earned}/{total_badges}", fill='white', font=text_font, anchor='mm')
-    
-    draw.text((width//2, 500), f"Awarded on {date_str}", fill='white', font=small_font, anchor='mm')
-    draw.text((width//2, 540), "Presidential AI Challenge", fill='#ffd700', font=text_font, anchor='mm')
-    
-    buffer = BytesIO()
-    img.save(buffer, format='PNG')
-    buffer.seek(0)
-    return buffer.getvalue()
+    """Generate a certificate image using Pillow and return as bytes (see certificates.py)."""
+    stats = certificate_stats(
+        student_name,
+        st.session_state.total_score,
+        st.session_state.quizzes_completed,
+        st.session_state.perfect_scores,
+        st.session_state.badges,
+    )
+    return render_certificate_png(stats)
 
 
+@telemetry.traced()
 def generate_certificate_html(student_name: str) -> str:
     """Generate a beautiful certificate HTML for the student."""
-    from datetime import datetime
-    
-    level = calculate_level(st.session_state.total_score)
-    title = get_level_title(level)
-    total_xp = st.session_state.total_score
-    quizzes = st.session_state.quizzes_completed
-    perfect_scores = st.session_state.perfect_scores
-    badges_earned = len(st.session_state.badges)
-    total_badges = len(BADGES)
-    date_str = datetime.now().strftime("%B %d, %Y")
-    
-    badge_emojis = " ".join([BADGES[b]["emoji"] for b in st.session_state.badges]) if st.session_state.badges else "🎯"
+    stats = certificate_stats(
+        student_name,
+        st.session_state.total_score,
+        st.session_state.quizzes_completed,
+        st.session_state.perfect_scores,
+        st.session_state.badges,
+    )
+    return render_certificate_html(stats)
+
+
+@profiling.profiled("llm")
+@telemetry.traced_generator
+def generate_deep_explanation(topic: str, question: dict, correct_ans: str, user_ans: str,
+                              explanation: str, requester: Requester = None) -> str:
+    """Generate a longer explanation of one missed question."""
+    options = question.get('options', {})
+    options_text = "\n".join(f"{letter}) {options.get(letter, '')}" for letter in ['A', 'B', 'C', 'D'])
     
-    certificate_html = f"""
-    <div id="certificate" style="
-        background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-        border: 8px solid #ffd700;
-        border-radius: 20px;
-        padding: 40px;
-        text-align: center;
-        color: white;
-        font-family: 'Georgia', serif;
-        max-width: 600px;
-        margin: 20px auto;
-        box-shadow: 0 10px 40px rgba(0,0,0,0.3);
-    ">
-        <div style="font-size: 3rem; margin-bottom: 10px;">🏆</div>
-        <div style="font-size: 2rem; font-weight: bold; text-transform: uppercase; letter-spacing: 3px; margin-bottom: 5px;">
-            Certificate of Achievement
-        </div>
-        <div style="font-size: 1rem; opacity: 0.9; margin-bottom: 20px;">
-            Study Buddy Quest 🧠
-        </div>
-        
-        <div style="border-top: 2px solid rgba(255,255,255,0.3); border-bottom: 2px solid rgba(255,255,255,0.3); padding: 20px; margin: 20px 0;">
-            <div style="font-size: 1rem; opacity: 0.8;">This certifies that</div>
-            <div style="font-size: 2rem; font-weight: bold; margin: 10px 0; color: #ffd700;">
-                {student_name if student_name else "Study Champion"}
-            </div>
-            <div style="font-size: 1rem; opacity: 0.8;">has achieved the rank of</div>
-            <div style="font-size: 1.5rem; font-weight: bold; margin: 10px 0;">
-                Level {level} - {title}
-            </div>
-        </div>
-        
-        <div style="display: grid; grid-template-columns: repeat(2, 1fr); gap: 15px; margin: 20px 0; text-align: center;">
-            <div style="background: rgba(255,255,255,0.15); padding: 15px; border-radius: 20px;">
-                <div style="font-size: 1.8rem; font-weight: bold;">{total_xp}</div>
-                <div style="font-size: 0.9rem; opacity: 0.8;">Experience Points</div>
-            </div>
-            <div style="background: rgba(255,255,255,0.15); padding: 15px; border-radius: 20px;">
-                <div style="font-size: 1.8rem; font-weight: bold;">{quizzes}</div>
-                <div style="font-size: 0.9rem; opacity: 0.8;">Quizzes Completed</div>
-            </div>
-            <div style="background: rgba(255,255,255,0.15); padding: 15px; border-radius: 20px;">
-                <div style="font-size: 1.8rem; font-weight: bold;">{perfect_scores}</div>
-                <div style="font-size: 0.9rem; opacity: 0.8;">Perfect Scores</div>
-            </div>
-            <div style="background: rgba(255,255,255,0.15); padding: 15px; border-radius: 20px;">
-                <div style="font-size: 1.8rem; font-weight: bold;">{badges_earned}/{total_badges}</div>
-                <div style="font-size: 0.9rem; opacity: 0.8;">Badges Earned</div>
-            </div>
-        </div>
-        
-        <div style="font-size: 1.5rem; margin: 15px 0;">{badge_emojis}</div>
+    prompt = f"""You are a friendly tutor. A student taking a quiz about "{topic}" missed this question:
+
+{question.get('text', 'Question')}
+{options_text}
+
+They picked: {user_ans}) {options.get(user_ans, '')}
+Correct answer: {correct_ans}) {options.get(correct_ans, '')}
+Short explanation they already saw: {explanation}
+
+Explain it more deeply in 2 short paragraphs:
+1. Why the correct answer is right, with a simple example or memory trick
+2. Why their choice is a common mix-up and how to tell the difference next time
+
+Use simple, encouraging, age-appropriate language.
+IMPORTANT: Use plain text only. Do NOT use any HTML tags, markdown formatting, or special formatting."""
+
+    try:
+        response = gemini_gateway.generate_content(
+            client,
+            model="gemini-2.5-flash",
+            contents=prompt,
+            function="generate_deep_explanation",
+            requester=requester or current_requester(),
+            max_output_tokens=250,
+            cache="prefer",
+        )
         
-        <div style="margin-top: 20px; font-size: 0.9rem; opacity: 0.8;">
-            Awarded on {date_str}
-        </div>
-        <div style="margin-top: 10px; font-size: 0.8rem; opacity: 0.6;">
-            🏛️ Presidential AI Challenge 🇺🇸
-        </div>
-    </div>
-    """
-    return certificate_html
+        if response.text:
+            return response.text
+        return explanation
+    except Exception as e:
+        telemetry.record_fallback(e)
+        return explanation
 
 
-def generate_tutor_response(user_question: str, topic: str, wrong_questions: list, 
-                            parsed_questions: list, correct_answers: list, explanations: list,
-                            got_perfect_score: bool = False) -> str:
-    """Generate an AI tutor response to help the student understand concepts."""
+@profiling.profiled("llm")
+@telemetry.traced_generator
+def generate_review_bundle(topic: str, correct_count: int, total_questions: int,
+                           parsed_questions: list, user_answers: list, correct_answers: list,
+                           explanations: list, wrong_questions: list, include_notes: bool = True,
+                           requester: Requester = None) -> dict:
+    """Generate the summary, study notes and a tip per missed question in one structured call."""
+    from google.genai import types
     
-    # Build context from quiz content
-    quiz_context = []
-    for i in range(min(len(parsed_questions), 5)):
+    question_lines = []
+    for i in range(min(len(user_answers), len(correct_answers), len(parsed_questions))):
         q = parsed_questions[i]
-        correct_ans = correct_answers[i] if i < len(correct_answers) else "?"
-        explanation = explanations[i] if i < len(explanations) else ""
-        quiz_context.append(f"Q{i+1}: {q.get('text', 'Question')}\nAnswer: {correct_ans}) {q.get('options', {}).get(correct_ans, '')}\nExplanation: {explanation}")
+        options = q.get('options', {})
+        user_ans = (user_answers[i] or '').upper()
+        correct_ans = (correct_answers[i] or '').upper()
+        if i + 1 in wrong_questions:
+            explanation = explanations[i] if i < len(explanations) else ''
+            question_lines.append(f"Q{i+1} (missed): {q.get('text', '')}\n"
+                                  f"  Student answered: {user_ans}) {options.get(user_ans, 'Unknown')}\n"
+                                  f"  Correct answer: {correct_ans}) {options.get(correct_ans, 'Unknown')}\n"
+                                  f"  Explanation: {explanation}")
+        else:
+            question_lines.append(f"Q{i+1} (correct): {q.get('text', '')} → {correct_ans}) {options.get(correct_ans, '')}")
     
-    context_text = "\n\n".join(quiz_context) if quiz_context else "General topic discussion."
+    notes_instruction = ("3-5 KEY CONCEPTS, 2-3 IMPORTANT FACTS and 2 RELATED TOPICS to explore next, "
+                         "under 200 words, simple dashes for bullet points") if include_notes else "an empty string"
     
-    if got_perfect_score:
-        score_context = "The student got a PERFECT SCORE! They're curious to learn more about the topic."
-    else:
-        wrong_context = []
-        for wq in wrong_questions[:5]:
-            # Handle both integer question numbers and dict format
-            if isinstance(wq, dict):
-                q_idx = wq.get('question_num', 0) - 1
-            else:
-                q_idx = int(wq) - 1
-            if 0 <= q_idx < len(parsed_questions):
-                q = parsed_questions[q_idx]
-                wrong_context.append(f"- Q{q_idx+1}: {q.get('text', 'Question')}")
-        score_context = f"The student got some questions wrong:\n" + "\n".join(wrong_context) if wrong_context else "The student wants to understand the topic better."
+    prompt = f"""You are an encouraging study buddy. A student just finished a quiz. Write their REVIEW BUNDLE.
+
+Topic: {topic}
+Score: {correct_count}/{total_questions}
+
+Questions:
+{chr(10).join(question_lines)}
+
+Return JSON with these fields:
+- "summary": a SHORT personalized summary (3-5 sentences). Congratulate what they got right, gently name concepts to review, end with an encouraging next step. 1-2 emojis max.
+- "study_notes": {notes_instruction}.
+- "question_tips": for EACH missed question, {{"question": <number>, "tip": "<2 short paragraphs: why the correct answer is right with a memory trick, and how to avoid their mix-up next time>"}}.
+
+Use simple, age-appropriate language.
+IMPORTANT: Use plain text only inside every field. Do NOT use any HTML tags or markdown formatting."""
+
+    try:
+        response = gemini_gateway.generate_content(
+            client,
+            model="gemini-2.5-flash",
+            contents=prompt,
+            function="generate_review_bundle",
+            requester=requester or current_requester(),
+            max_output_tokens=300 + (300 if include_notes else 0) + 250 * len(wrong_questions),
+            cache="prefer",
+            config=types.GenerateContentConfig(
+                response_mime_type="application/json",
+                response_schema=REVIEW_BUNDLE_SCHEMA,
+            ),
+        )
+        bundle = parse_review_bundle(response.text, wrong_questions)
+        if not bundle['summary']:
+            telemetry.PARSE_FAILURES.inc(stage="review_bundle")
+        return bundle
+    except Exception as e:
+        telemetry.record_fallback(e)
+        return parse_review_bundle("", wrong_questions)
+
+
+def get_review_bundle(wait: bool = True) -> dict:
+    """This quiz's review bundle, waiting for the call started at submit if it's still running.
     
-    prompt = f"""You are a friendly, encouraging AI tutor helping a student who just took a quiz about "{topic}".
+    Empty fields mean the bundle wasn't available (or isn't ready yet with wait=False);
+    callers fall back to the separate generators.
+    """
+    if st.session_state.review_bundle is None:
+        task = st.session_state.background_tasks.get("review_bundle")
+        if not wait and task is not None and not task.done():
+            return {'summary': '', 'study_notes': '', 'tips': {}}
+        bundle = st.session_state.background_tasks.result("review_bundle", timeout=REVIEW_BUNDLE_TIMEOUT_S)
+        st.session_state.review_bundle = bundle or {'summary': '', 'study_notes': '', 'tips': {}}
+    return st.session_state.review_bundle
 
-Quiz content covered:
-{context_text}
 
-Student performance: {score_context}
+def start_post_quiz_prefetch():
+    """Right after submit, start writing study notes and deep explanations in the background.
+    
+    Reads everything it needs from session state now, because background threads can't.
+    """
+    tasks = st.session_state.background_tasks
+    requester = current_requester()
+    topic = st.session_state.current_topic
+    parsed_questions = st.session_state.parsed_questions
+    correct_answers = st.session_state.correct_answers
+    explanations = st.session_state.explanations
+    user_answers = st.session_state.user_answers
+    
+    wrong_questions = st.session_state.wrong_questions
+    notes_unlocked = calculate_level(st.session_state.total_score) >= 4
+    
+    if REVIEW_BUNDLE_MODE:
+        # One structured call for the summary, notes and every missed-question tip
+        tasks.submit("review_bundle", generate_review_bundle, topic, len(user_answers) - len(wrong_questions),
+                     len(user_answers), parsed_questions, user_answers, correct_answers, explanations,
+                     list(wrong_questions), include_notes=notes_unlocked, requester=requester)
+        return
+    
+    # Study notes unlock at Level 4, so only spend tokens on them once they can be shown
+    if notes_unlocked:
+        correct_count = len(user_answers) - len(st.session_state.wrong_questions)
+        tasks.submit("study_notes", generate_study_notes, topic, correct_count, len(user_answers),
+                     parsed_questions, correct_answers, explanations, requester=requester)
+    
+    for q_num in st.session_state.wrong_questions:
+        i = q_num - 1
+        if i < len(parsed_questions) and i < len(correct_answers):
+            explanation = explanations[i] if i < len(explanations) else ""
+            tasks.submit(f"explain_q{q_num}", generate_deep_explanation, topic, parsed_questions[i],
+                         correct_answers[i].upper(), (user_answers[i] or "").upper(), explanation,
+                         requester=requester, kind="deep_explanation")
+
+
+def prepare_quiz(topic: str, difficulty: str, grade_level: str, quiz_length: int, weak_topics: list,
+                 topic_accuracy: float = None, requester: Requester = None, priority: str = "prefetch",
+                 wait=None) -> dict:
+    """Quiz text from the item bank or Gemini; safe to run in a background thread.
+    
+    Gemini calls go through the generation queue at `priority`; `wait(job)` returns the
+    job's result (default: block on it). Returns {'quiz_content', 'source' ("bank" or
+    "gemini"), 'bank_items'}.
+    """
+    requester = requester or current_requester()
+    bank_items = assemble_quiz_from_bank(canonical_topic_key(topic), difficulty, grade_level, quiz_length, requester)
+    if bank_items:
+        return {'quiz_content': format_quiz_text(topic, difficulty.split()[0], bank_items),
+                'source': "bank", 'bank_items': bank_items}
+    job = GENERATION_QUEUE.submit(generate_quiz_with_gemini, topic, difficulty, weak_topics, grade_level, quiz_length,
+                                  topic_accuracy=topic_accuracy, requester=requester, priority=priority)
+    quiz_content = wait(job) if wait else job.result()
+    return {'quiz_content': quiz_content, 'source': "gemini", 'bank_items': None}
+
+
+def next_quiz_options() -> dict:
+    """Likely next quizzes after this one: {"same": params, "harder": params}, params = (topic, difficulty, grade, length)."""
+    if st.session_state.get('quiz_source') not in ("gemini", "bank") or not st.session_state.current_topic_key:
+        return {}
+    difficulty = st.session_state.get('current_difficulty', 'Medium 🌿')
+    base = (st.session_state.current_topic, difficulty,
+            st.session_state.get('current_grade_level', 'None (Skip)'), st.session_state.quiz_length)
+    options = {"same": base}
+    if difficulty in HARDER_DIFFICULTY:
+        options["harder"] = (base[0], HARDER_DIFFICULTY[difficulty]) + base[2:]
+    return options
+
+
+def keep_prefetch_job(jobs: dict, name: str, tasks, generation: int):
+    """prepare_quiz `wait` for a prefetch: keeps its queued job in `jobs` so it can be promoted or cancelled."""
+    def wait(job):
+        jobs[name] = job
+        if tasks.generation != generation:
+            # Discarded while this prefetch was still checking the item bank
+            job.cancel()
+        return job.result()
+    return wait
+
+
+def discard_next_quizzes():
+    """Drop every prefetched quiz, taking queued Gemini jobs out of the generation queue."""
+    st.session_state.next_quiz_tasks.cancel_all()
+    for job in st.session_state.next_quiz_jobs.values():
+        job.cancel()
+    st.session_state.next_quiz_jobs = {}
+
+
+def start_next_quiz_prefetch():
+    """After submit, prepare the likely next quizzes in the background within the session's prefetch budget."""
+    tasks = st.session_state.next_quiz_tasks
+    discard_next_quizzes()
+    st.session_state.next_quiz_params = {}
+    jobs = st.session_state.next_quiz_jobs
+    requester = current_requester()
+    weak_topics = weak_topic_labels()
+    spent_at = [t for t in st.session_state.next_quiz_spent_at if time.time() - t < NEXT_QUIZ_BUDGET_WINDOW_S]
+    st.session_state.next_quiz_spent_at = spent_at
+    for name, params in next_quiz_options().items():
+        if len(spent_at) >= NEXT_QUIZ_BUDGET:
+            background.SPECULATIVE_TASKS.inc(task="next_quiz", outcome="over_budget")
+            break
+        topic, difficulty, grade_level, quiz_length = params
+        # Prefetches charge the student's own rate limits, so keep one real quiz's worth spare
+        if not LIMITER.has_headroom(requester, (len(st.session_state.next_quiz_params) + 2) * quiz_token_estimate(quiz_length)):
+            background.SPECULATIVE_TASKS.inc(task="next_quiz", outcome="rate_limited")
+            break
+        accuracy = st.session_state.mastery.accuracy(st.session_state.current_topic_key, difficulty.split()[0])
+        tasks.submit(name, prepare_quiz, topic, difficulty, grade_level, quiz_length, weak_topics, accuracy,
+                     requester, wait=keep_prefetch_job(jobs, name, tasks, tasks.generation), kind="next_quiz")
+        st.session_state.next_quiz_params[name] = params
+        spent_at.append(time.time())
+
+
+def start_next_quiz(params: tuple):
+    """Button callback: generate the chosen next quiz (params as in next_quiz_options)."""
+    st.session_state.next_quiz_choice = params
+    st.session_state.tutor_chat_history = []
+    st.session_state.tutor_session = None
+    st.session_state.tutor_panel_open = False
+    for i in range(1, 16):
+        if f"q{i}" in st.session_state:
+            del st.session_state[f"q{i}"]
+    st.session_state.quiz_generating = True
+
+
+def take_prefetched_quiz(name: str, priority: str, placeholder) -> dict:
+    """One prefetched quiz, now that the student wants it, or None to generate it afresh.
+    
+    A Gemini job still waiting in line is moved up to the student's own priority, and the
+    wait shows the usual place-in-line loader.
+    """
+    tasks = st.session_state.next_quiz_tasks
+    jobs = st.session_state.next_quiz_jobs
+    task = tasks.get(name)
+    if task is None or task.cancel():
+        # Never got a background worker: generating it now is no slower
+        return None
+    while not task.done() and name not in jobs:
+        # Still checking the item bank, which takes milliseconds
+        time.sleep(0.01)
+    job = jobs.get(name)
+    if job is None:
+        return tasks.result(name, timeout=NEXT_QUIZ_WAIT_S)
+    try:
+        if job.cancel():
+            job = GENERATION_QUEUE.submit(job.fn, *job.args, priority=priority, **job.kwargs)
+        quiz_content = wait_for_generation(job, placeholder)
+    except Exception:
+        return None
+    return {'quiz_content': quiz_content, 'source': "gemini", 'bank_items': None}
 
-The student is now asking: "{user_question}"
 
-Respond as a helpful tutor:
-1. Answer their specific question directly and clearly
-2. Use simple, age-appropriate language
-3. Give examples if helpful
-4. Be encouraging and supportive
-5. Keep your response concise (2-4 short paragraphs max)
-6. If they ask something unrelated to the topic, gently guide them back to the quiz topic
+def claim_prefetched_quiz(params: tuple, priority: str = "text", placeholder=None) -> dict:
+    """The prefetched quiz for these settings (waiting for it if still running), or None.
+    
+    Every other prefetched quiz is discarded.
+    """
+    prefetched = st.session_state.next_quiz_params
+    st.session_state.next_quiz_params = {}
+    wanted = next((name for name, task_params in prefetched.items() if params is not None and task_params == params), None)
+    for name in prefetched:
+        if name != wanted:
+            # Free the others' places in line before waiting for the wanted one
+            for pending in (st.session_state.next_quiz_tasks.get(name), st.session_state.next_quiz_jobs.get(name)):
+                if pending is not None:
+                    pending.cancel()
+            background.SPECULATIVE_TASKS.inc(task="next_quiz", outcome="discarded")
+    prepared = None
+    if wanted is not None:
+        prepared = take_prefetched_quiz(wanted, priority, placeholder)
+        background.SPECULATIVE_TASKS.inc(task="next_quiz", outcome="used" if prepared else "failed")
+    discard_next_quizzes()
+    return prepared
+
+
+# ============================================================
+# CLASSROOM ROOMS - A teacher publishes one quiz to a room code
+# and the class takes it from the shared store (see rooms.py)
+# ============================================================
+ROOM_POLL_S = 5
+
+
+def publish_to_room():
+    """Button callback: share the quiz on screen with this session's room, opening one first."""
+    session_id = st.session_state.session_id
+    if not st.session_state.teaching_room or not ROOMS.exists(st.session_state.teaching_room):
+        st.session_state.teaching_room = ROOMS.create(session_id)
+    explanations = st.session_state.explanations
+    items = [dict(q, answer=answer, explanation=explanations[i] if i < len(explanations) else "")
+             for i, (q, answer) in enumerate(zip(st.session_state.parsed_questions, st.session_state.correct_answers))]
+    version = ROOMS.publish(st.session_state.teaching_room, session_id, st.session_state.current_topic,
+                            st.session_state.get('current_difficulty', 'Medium 🌿'),
+                            st.session_state.get('current_grade_level', 'None (Skip)'), items,
+                            shuffle=st.session_state.get('room_shuffle', True))
+    if version:
+        show_popup(f"📡 Shared with room {st.session_state.teaching_room}!", "success")
+
+
+def join_room():
+    """Button callback: join the room typed into the room code box."""
+    code = normalize_room_code(st.session_state.get('room_code_input', ''))
+    if ROOMS.exists(code):
+        st.session_state.room_code = code
+    else:
+        show_popup("🤔 There's no room with that code. Check it with your teacher!", "warning")
+
+
+def leave_room():
+    st.session_state.room_code = None
+
+
+def close_room():
+    ROOMS.close(st.session_state.teaching_room, st.session_state.session_id)
+    st.session_state.teaching_room = None
+
+
+def start_room_quiz():
+    """Take the room's published quiz (same resets as starting a next quiz)."""
+    st.session_state.room_quiz_requested = True
+    start_next_quiz(None)
+
+
+def record_room_result(user_answers: list, correct_answers: list):
+    """Add this student's result to their room's live totals, in the published question order."""
+    room_quiz = st.session_state.get('room_quiz')
+    if not room_quiz:
+        return
+    order = room_quiz['order']
+    flags = [False] * len(order)
+    for position, original in enumerate(order):
+        if position < len(user_answers) and position < len(correct_answers):
+            flags[original] = (user_answers[position] or "").upper() == correct_answers[position].upper()
+    ROOMS.submit(room_quiz['code'], room_quiz['version'], current_requester().student, flags)
+
+
+# ============================================================
+# LEADERBOARD - Every submit moves the student on their boards
+# ============================================================
+def record_leaderboard(xp: int):
+    """Add a finished quiz's XP to the student's leaderboards (global and, with ?classroom=, their class).
+    
+    The student's name is only shown on their class's board; everyone else sees a "Player NNNN" nickname.
+    """
+    LEADERBOARDS.record(current_requester().student, xp, classroom=st.query_params.get("classroom"),
+                        name=st.session_state.student_name or None)
 
-Remember: You're helping them LEARN, not just giving answers. Explain the "why" behind concepts!
-IMPORTANT: Use plain text only. Do NOT use any HTML tags, markdown formatting, or special formatting."""
 
+def get_tutor_session(topic: str, wrong_questions: list, parsed_questions: list,
+                      correct_answers: list, explanations: list, got_perfect_score: bool = False) -> TutorSession:
+    """Get this quiz's tutor session, building its context only when the quiz changes."""
+    tutor = st.session_state.get('tutor_session')
+    if tutor is None or tutor.fingerprint != quiz_fingerprint(topic, parsed_questions, correct_answers):
+        tutor = TutorSession(topic, parsed_questions, correct_answers, explanations,
+                             wrong_questions, got_perfect_score)
+        st.session_state.tutor_session = tutor
+    return tutor
+
+
+@profiling.profiled("llm")
+@telemetry.traced_generator
+def generate_tutor_response(tutor: TutorSession, user_question: str, chat_history: list) -> str:
+    """Generate an AI tutor response to help the student understand concepts."""
+    from google.genai import types
+    
+    contents = tutor.build_contents(chat_history, user_question)
+    
     try:
-        response = client.models.generate_content(
+        response = gemini_gateway.generate_content(
+            client,
             model="gemini-2.0-flash-lite",
-            contents=prompt
+            contents=contents,
+            function="generate_tutor_response",
+            requester=current_requester(),
+            max_output_tokens=300,
+            config=types.GenerateContentConfig(system_instruction=tutor.system_instruction),
         )
         
         if response.text:
             return response.text
         return "I'm here to help! Could you rephrase your question? I want to make sure I understand what you're asking. 🤔"
+    except RateLimitedError as e:
+        telemetry.record_fallback(e)
+        return f"Whoa, lots of questions! 😅 Give me {e.retry_after} seconds to catch my breath, then ask again. 💭"
     except Exception as e:
         print(f"Tutor API error: {type(e).__name__}: {e}")
+        telemetry.record_fallback(e)
         return f"I'm having a little trouble right now. Error: {str(e)[:100]}. Try again in a moment! 💭"
 
 
+@profiling.profiled("llm")
+@telemetry.traced_generator
+def stream_tutor_response(tutor: TutorSession, user_question: str, chat_history: list):
+    """Stream an AI tutor response as text chunks (same fallbacks as generate_tutor_response)."""
+    from google.genai import types
+    
+    contents = tutor.build_contents(chat_history, user_question)
+    streamed = False
+    
+    try:
+        for text in gemini_gateway.generate_content_stream(
+            client,
+            model="gemini-2.0-flash-lite",
+            contents=contents,
+            function="stream_tutor_response",
+            requester=current_requester(),
+            max_output_tokens=300,
+            config=types.GenerateContentConfig(system_instruction=tutor.system_instruction),
+        ):
+            streamed = True
+            yield text
+        if not streamed:
+            yield "I'm here to help! Could you rephrase your question? I want to make sure I understand what you're asking. 🤔"
+    except RateLimitedError as e:
+        telemetry.record_fallback(e)
+        yield f"Whoa, lots of questions! 😅 Give me {e.retry_after} seconds to catch my breath, then ask again. 💭"
+    except Exception as e:
+        print(f"Tutor API error: {type(e).__name__}: {e}")
+        telemetry.record_fallback(e)
+        prefix = "\n\n" if streamed else ""
+        yield f"{prefix}I'm having a little trouble right now. Error: {str(e)[:100]}. Try again in a moment! 💭"
+
+
+def render_tutor_message(role: str, content: str, target=None):
+    """Draw one tutor chat bubble (into `target`, e.g. an st.empty() being streamed into)."""
+    target = target or st
+    safe_content = html.escape(content).replace('\n', '<br>')
+    if role == "user":
+        target.markdown(f"""
+        <div style="background: #e0e7ff; padding: 12px 16px; border-radius: 20px; 
+                    margin: 8px 0; max-width: 85%; margin-left: auto; text-align: right;">
+            <strong>You:</strong> {safe_content}
+        </div>
+        """, unsafe_allow_html=True)
+    else:
+        target.markdown(f"""
+        <div style="background: linear-gradient(135deg, #818cf8 0%, #6366f1 100%); 
+                    color: white; padding: 12px 16px; border-radius: 20px; 
+                    margin: 8px 0; max-width: 85%;">
+            <strong>🤖 Tutor:</strong> {safe_content}
+        </div>
+        """, unsafe_allow_html=True)
+
+
 
 
 # ============================================================
 # CUSTOM STYLING - Teen-Friendly & Mobile-First! 🎨
 # ============================================================
+profiling.section("custom_styling_css")
 reduce_anims = st.session_state.get('reduce_animations', False)
 
 # Base CSS with optional animations
@@ -2376,6 +2483,7 @@ components.html("""
 # ============================================================
 # MAIN TITLE AND WELCOME
 # ============================================================
+profiling.section("title_welcome")
 st.markdown('<h1 class="mega-title">📚 Study Buddy Quest 🧠</h1>', unsafe_allow_html=True)
 st.markdown('<p class="subtitle">Level up your knowledge, one quiz at a time! 🚀</p>', unsafe_allow_html=True)
 
@@ -2439,6 +2547,7 @@ with st.expander("📖 How to Use Study Buddy Quest & Level Up!"):
 # ============================================================
 # BADGE DISPLAY
 # ============================================================
+profiling.section("badge_display")
 if st.session_state.badges:
     badge_emojis = " ".join([BADGES[b]["emoji"] for b in st.session_state.badges if b in BADGES])
     st.markdown(f"""
@@ -2458,6 +2567,7 @@ if st.session_state.badges:
 # ============================================================
 # LEVEL & STATS DISPLAY
 # ============================================================
+profiling.section("level_stats")
 current_level = calculate_level(st.session_state.total_score)
 level_title = get_level_title(current_level)
 points_into_level, points_needed = get_points_for_next_level(st.session_state.total_score)
@@ -2486,9 +2596,10 @@ st.markdown(f"<center><small>{points_into_level}/{points_needed} Experience Poin
 # ============================================================
 # WEAK TOPICS DISPLAY
 # ============================================================
-if st.session_state.weak_topics:
-    unique_weak_topics = list(dict.fromkeys(st.session_state.weak_topics))
-    topics_list = "".join([f'<div class="practice-item">📌 {topic}</div>' for topic in unique_weak_topics[-5:]])
+profiling.section("weak_topics")
+weakest_topics = st.session_state.mastery.weakest()
+if weakest_topics:
+    topics_list = "".join([f'<div class="practice-item">📌 {topic} · {accuracy:.0%}</div>' for topic, accuracy in weakest_topics])
     st.markdown(f"""
     <div class="practice-areas">
         <div class="practice-title">📖 Areas to Level Up</div>
@@ -2502,6 +2613,7 @@ st.markdown("---")
 # ============================================================
 # ACCESSIBILITY CONTROLS - Font Size
 # ============================================================
+profiling.section("accessibility_css")
 font_sizes = {"small": "0.85rem", "medium": "1rem", "large": "1.25rem"}
 current_font = font_sizes.get(st.session_state.font_size, "1rem")
 
@@ -2611,6 +2723,7 @@ if st.session_state.get('compact_mode', False):
 # ============================================================
 # QUIZ HISTORY
 # ============================================================
+profiling.section("quiz_history")
 if st.session_state.quiz_history:
     with st.expander(f"📜 Quiz History ({len(st.session_state.quiz_history)} quizzes)"):
         for i, quiz in enumerate(reversed(st.session_state.quiz_history[-10:])):
@@ -2628,6 +2741,7 @@ if st.session_state.quiz_history:
 # ============================================================
 # PROGRESS ANALYTICS DASHBOARD
 # ============================================================
+profiling.section("analytics_dashboard")
 if st.session_state.quiz_history and len(st.session_state.quiz_history) >= 2:
     with st.expander("📊 Progress Analytics Dashboard"):
         st.markdown("### 📈 Your Learning Journey")
@@ -2651,11 +2765,23 @@ if st.session_state.quiz_history and len(st.session_state.quiz_history) >= 2:
         
         st.markdown("---")
         
+        # Chart data covers the whole history at a fixed point budget; rebuilt only when a submit grows it
+        frames_key = (len(st.session_state.xp_history), len(st.session_state.quiz_score_history))
+        cached_frames = st.session_state.get('chart_frames')
+        if cached_frames is None or cached_frames[0] != frames_key:
+            with telemetry.trace_span("chart_frames", quizzes=frames_key[1]):
+                cached_frames = (frames_key, chart_frames(st.session_state.xp_history, st.session_state.quiz_score_history))
+            st.session_state.chart_frames = cached_frames
+        frames = cached_frames[1]
+        
         # Score trend chart
         st.markdown("#### 📉 Score Trend")
         scores = [q.get('percentage', round((q['score']/q['total'])*100)) for q in quiz_data[-15:]]
         if len(scores) >= 2:
-            st.line_chart(scores)
+            score_frame = frames['scores']
+            st.line_chart(score_frame['data'], x="When", y="Score %")
+            if score_frame['resolution'] == "day":
+                st.caption(f"Daily averages across all {len(st.session_state.quiz_score_history)} quizzes ({score_frame['points']} points)")
             
             # Calculate improvement
             first_half_avg = sum(scores[:len(scores)//2]) / (len(scores)//2) if len(scores) >= 2 else 0
@@ -2673,9 +2799,10 @@ if st.session_state.quiz_history and len(st.session_state.quiz_history) >= 2:
         
         # XP Progress chart
         st.markdown("#### 💎 XP Progress")
-        xp_earned = [q.get('xp_earned', q['score'] * 10) for q in quiz_data[-15:]]
-        if len(xp_earned) >= 2:
-            st.bar_chart(xp_earned)
+        if len(st.session_state.xp_history) >= 2:
+            xp_frame = frames['xp']
+            st.bar_chart(xp_frame['data'], x="When", y="XP")
+            st.caption(f"XP earned per {xp_frame['resolution']}" + (" (downsampled)" if xp_frame['sampled'] else ""))
         
         st.markdown("---")
         
@@ -2726,9 +2853,50 @@ if st.session_state.quiz_history and len(st.session_state.quiz_history) >= 2:
                     st.markdown(f"**{emoji} {diff}**")
                     st.markdown("No quizzes yet")
 
+# ============================================================
+# LEADERBOARD - XP earned today, this week and overall, for
+# the student's class and everyone (see leaderboard.py)
+# ============================================================
+profiling.section("leaderboard")
+LEADERBOARD_WINDOWS = {"Today": "today", "This Week": "week", "All Time": "all"}
+LEADERBOARD_MEDALS = {1: "🥇", 2: "🥈", 3: "🥉"}
+
+with st.expander("🏆 Leaderboard"):
+    board_student = current_requester().student
+    board_classroom = st.query_params.get("classroom")
+    board_col1, board_col2 = st.columns(2)
+    with board_col1:
+        board_window = st.radio("When", list(LEADERBOARD_WINDOWS), horizontal=True, key="leaderboard_window")
+    with board_col2:
+        board_scope = st.radio("Who", (["My Class"] if board_classroom else []) + ["Everyone"],
+                               horizontal=True, key="leaderboard_scope")
+    board_window = LEADERBOARD_WINDOWS[board_window]
+    board_scope = board_classroom if board_scope == "My Class" and board_classroom else GLOBAL_SCOPE
+    
+    board_rows = LEADERBOARDS.top(board_scope, board_window)
+    if not board_rows:
+        st.caption("No quizzes finished yet. Be the first on the board! 🚀")
+    else:
+        board_lines = []
+        for row in board_rows:
+            place = LEADERBOARD_MEDALS.get(row['rank']) or f"#{row['rank']}"
+            name = html.escape(row['name'])
+            if row['student'] == board_student:
+                name = f"<strong>{name} (you)</strong>"
+            board_lines.append(f"{place} {name} · {row['xp']} XP")
+        st.markdown("<br>".join(board_lines), unsafe_allow_html=True)
+        standing = LEADERBOARDS.standing(board_student, board_scope, board_window)
+        if standing['rank'] is not None:
+            st.markdown(f"📍 You're **#{standing['rank']}** of {standing['players']} with **{standing['xp']} XP**")
+        else:
+            st.caption("Finish a quiz to join this board!")
+        if board_scope == GLOBAL_SCOPE:
+            st.caption("🕶️ Everyone shows player nicknames, never real names.")
+
 # ============================================================
 # USER INPUT SECTION
 # ============================================================
+profiling.section("user_input")
 st.markdown("### 🎯 Choose Your Quest!")
 
 example_topics = [
@@ -2785,17 +2953,15 @@ with col3:
     retake_len = st.session_state.get('retake_length', default_length)
     quiz_length = st.selectbox(
         "📝 Number of Questions",
-        options=[5, 10, 15],
-        index=[5, 10, 15].index(retake_len) if retake_len in [5, 10, 15] else 0,
+        options=QUIZ_LENGTHS,
+        index=QUIZ_LENGTHS.index(retake_len) if retake_len in QUIZ_LENGTHS else 0,
         help="Choose how many questions you want!"
     )
     if 'retake_length' in st.session_state:
         del st.session_state['retake_length']
 
 with col4:
-    grade_levels = ["None (Skip)", "Pre-K", "Kindergarten", "1st Grade", "2nd Grade", "3rd Grade", 
-                    "4th Grade", "5th Grade", "6th Grade", "7th Grade", "8th Grade", 
-                    "9th Grade", "10th Grade", "11th Grade", "12th Grade"]
+    grade_levels = GRADE_LEVELS
     
     retake_grade = st.session_state.get('retake_grade', 'None (Skip)')
     grade_index = 0
@@ -2919,9 +3085,65 @@ if timed_mode:
     </div>
     """, unsafe_allow_html=True)
 
+# ============================================================
+# CLASSROOM ROOM - Join a teacher's room or share a quiz with one
+# ============================================================
+profiling.section("classroom_room")
+
+
+@st.fragment(run_every=ROOM_POLL_S)
+def room_live_panel():
+    """Refreshes on its own: the teacher's live results and the student's 'new class quiz' notice."""
+    if st.session_state.teaching_room:
+        summary = ROOMS.summary(st.session_state.teaching_room)
+        if summary is None:
+            st.session_state.teaching_room = None
+        elif summary['topic'] is None:
+            st.caption("Share a quiz to start the class.")
+        else:
+            average = "–" if summary['average_percent'] is None else f"{summary['average_percent']}%"
+            st.markdown(f"**{summary['topic']}** · {summary['submissions']} submitted · class average {average}")
+            if summary['submissions']:
+                st.caption("  ".join(f"Q{i + 1}: {pct}%" for i, pct in enumerate(summary['question_percent'])))
+    if st.session_state.room_code:
+        current = ROOMS.current(st.session_state.room_code)
+        taken = st.session_state.room_quiz
+        if current is None:
+            st.caption("⏳ Waiting for your teacher to share a quiz...")
+        elif taken and taken['code'] == st.session_state.room_code and taken['version'] == current[0]:
+            st.caption(f"✅ You're on the class quiz: {current[1]['topic']}")
+        elif not st.session_state.quiz_generating and st.button(
+                f"📥 START THE CLASS QUIZ: {current[1]['topic']}", use_container_width=True, key="room_start"):
+            start_room_quiz()
+            st.rerun()
+
+
+with st.expander("🏫 Class Room", expanded=bool(st.session_state.room_code or st.session_state.teaching_room)):
+    join_col, teach_col = st.columns(2)
+    with join_col:
+        if st.session_state.room_code:
+            st.markdown(f"🎒 You're in room **{st.session_state.room_code}**")
+            st.button("🚪 Leave room", on_click=leave_room, key="room_leave")
+        else:
+            st.text_input("Room code from your teacher", key="room_code_input", max_chars=8, placeholder="e.g. K7QX2")
+            st.button("🎒 Join room", on_click=join_room, key="room_join")
+    with teach_col:
+        if st.session_state.teaching_room:
+            st.markdown(f"📡 Your room code: **{st.session_state.teaching_room}**")
+        if st.session_state.quiz_generated and st.session_state.parsed_questions:
+            st.checkbox("🔀 Shuffle questions for each student", value=True, key="room_shuffle")
+            st.button("📡 Share this quiz with my class", on_click=publish_to_room, key="room_publish")
+        elif not st.session_state.teaching_room:
+            st.caption("Teachers: make a quiz, then share it here with a room code.")
+        if st.session_state.teaching_room:
+            st.button("🔒 Close room", on_click=close_room, key="room_close")
+    if st.session_state.room_code or st.session_state.teaching_room:
+        room_live_panel()
+
 # ============================================================
 # GENERATE QUIZ BUTTON
 # ============================================================
+profiling.section("generate_quiz")
 st.markdown("")
 
 # Initialize generating state if not exists
@@ -2996,11 +3218,35 @@ if not st.session_state.quiz_generating and not should_auto_regenerate:
             # Set generating state
             st.session_state.quiz_generating = True
             st.rerun()
+    
+    # Review quiz from spaced-repetition cards that are due (no Gemini call)
+    due_cards = st.session_state.review_scheduler.due()
+    if due_cards:
+        review_label = f"🔁 REVIEW {len(due_cards)} DUE QUESTION{'S' if len(due_cards) != 1 else ''}"
+        if st.button(review_label, use_container_width=True):
+            st.session_state.review_quiz_requested = True
+            st.session_state.quiz_generating = True
+            st.rerun()
 
 # Handle the actual quiz generation after rerun
 if st.session_state.get('quiz_generating', False):
     # Get the values we need
-    is_image_quiz = st.session_state.get('image_quiz_mode', False) and st.session_state.get('uploaded_image')
+    is_review_quiz = st.session_state.pop('review_quiz_requested', False)
+    is_room_quiz = st.session_state.pop('room_quiz_requested', False) and not is_review_quiz
+    next_quiz_choice = st.session_state.pop('next_quiz_choice', None)
+    is_image_quiz = not (is_review_quiz or is_room_quiz or next_quiz_choice) and st.session_state.get('image_quiz_mode', False) and st.session_state.get('uploaded_image')
+    
+    # The form's settings, saved for auto-regeneration even when a review or
+    # "same topic" quiz uses different ones
+    form_params = {
+        'topic': topic,
+        'category': selected_category,
+        'difficulty': difficulty,
+        'quiz_length': quiz_length,
+        'grade_level': grade_level,
+        'timed_mode': timed_mode,
+        'image_mode': st.session_state.get('image_quiz_mode', False)
+    }
     
     # Combine category with topic if a category is selected
     if selected_category and selected_category != "Any Topic":
@@ -3012,8 +3258,10 @@ if st.session_state.get('quiz_generating', False):
         full_topic = topic
     
     clean_topic = sanitize_topic(full_topic) if full_topic else ""
+    if next_quiz_choice:
+        clean_topic, difficulty, grade_level, quiz_length = next_quiz_choice
     
-    if is_image_quiz or clean_topic:
+    if is_review_quiz or is_room_quiz or is_image_quiz or clean_topic:
         st.session_state.answers_submitted = False
         st.session_state.balloons_shown = False
         st.session_state.correct_answers = []
@@ -3029,108 +3277,132 @@ if st.session_state.get('quiz_generating', False):
         st.session_state.timed_mode = timed_mode
         st.session_state.quiz_start_time = time.time() if timed_mode else None
         st.session_state.study_notes = None
+        st.session_state.deep_explanations = {}
+        st.session_state.review_bundle = None
+        st.session_state.background_tasks.cancel_all()
         st.session_state.time_bonus = 0
         st.session_state.base_score = 0
         st.session_state.level_bonus = 0
-        st.session_state.question_timer_start = None
-        st.session_state.last_answered_count = 0
-        st.session_state.timer_initialized_for_quiz = False
+        st.session_state.quiz_shown_at = None
+        st.session_state.answer_times = {}
+        st.session_state.room_quiz = None
         
         status_text = st.empty()
         
         try:
-            # Animated loading text with cycling words
-            status_text.markdown("""
-            <style>
-            @import url('https://fonts.googleapis.com/css2?family=Nunito:wght@600&display=swap');
-            .loading-card {
-                display: flex;
-                justify-content: center;
-                margin: 20px auto;
-                max-width: 380px;
-            }
-            .word-loader {
-                color: #a0a0b0;
-                font-family: 'Nunito', sans-serif;
-                font-weight: 600;
-                font-size: 24px;
-                height: 40px;
-                padding: 10px 10px;
-                display: flex;
-                border-radius: 20px;
-            }
-            .cycling-words {
-                overflow: hidden;
-                position: relative;
-            }
-            .cycling-word {
-                display: block;
-                height: 100%;
-                padding-left: 8px;
-                color: #8b5cf6;
-                animation: spin_words 5s infinite;
-            }
-            @keyframes spin_words {
-                10% { transform: translateY(-102%); }
-                25% { transform: translateY(-100%); }
-                35% { transform: translateY(-202%); }
-                50% { transform: translateY(-200%); }
-                60% { transform: translateY(-302%); }
-                75% { transform: translateY(-300%); }
-                85% { transform: translateY(-402%); }
-                100% { transform: translateY(-400%); }
-            }
-            </style>
-            <div class="loading-card">
-                <div class="word-loader">
-                    <p>GENERATING</p>
-                    <div class="cycling-words">
-                        <span class="cycling-word">QUESTIONS</span>
-                        <span class="cycling-word">ANSWERS</span>
-                        <span class="cycling-word">EXPLANATIONS</span>
-                        <span class="cycling-word">YOUR QUIZ</span>
-                        <span class="cycling-word">QUESTIONS</span>
-                    </div>
-                </div>
-            </div>
-            """, unsafe_allow_html=True)
+            status_text.markdown(generation_loader_html(0), unsafe_allow_html=True)
             
-            # Generate quiz based on mode (image or text)
-            if is_image_quiz:
-                image_bytes = st.session_state.uploaded_image
-                image_mime = st.session_state.get('uploaded_image_type', 'image/jpeg')
-                quiz_content, detected_topic = generate_quiz_from_image(image_bytes, difficulty, grade_level, quiz_length, image_mime)
-                clean_topic = f"📸 {detected_topic}"
-                st.session_state.current_topic = clean_topic
-            else:
-                quiz_content = generate_quiz_with_gemini(clean_topic, difficulty, st.session_state.weak_topics, grade_level, quiz_length)
-                st.session_state.current_topic = clean_topic
-            
-            correct_answers, explanations = parse_quiz_answers(quiz_content)
+            telemetry.GENERATION_ATTEMPTS.inc(
+                mode="image" if is_image_quiz else "text",
+                attempt="retry" if st.session_state.get('last_generation_failed') else "first",
+            )
+            priority = job_priority("image" if is_image_quiz else "text",
+                                    retry=bool(st.session_state.get('last_generation_failed')))
             
-            if not validate_quiz_data(correct_answers, explanations, quiz_length):
-                raise ValueError("Quiz generation incomplete. Please try again!")
+            with telemetry.trace_span("quiz_pipeline", quiz_length=quiz_length, image_mode=bool(is_image_quiz)) as pipeline_span:
+                # Generate quiz based on mode (review, image or text)
+                if is_review_quiz or is_room_quiz or is_image_quiz:
+                    claim_prefetched_quiz(None)
+                room_published = None
+                if is_review_quiz:
+                    review_cards = st.session_state.review_scheduler.due()
+                    if not review_cards:
+                        raise ValueError("No questions are due for review right now!")
+                    quiz_length = len(review_cards)
+                    st.session_state.quiz_length = quiz_length
+                    review_topics = list(dict.fromkeys(card['topic'] for card in review_cards))
+                    clean_topic = "🔁 Review: " + ", ".join(review_topics[:3]) + ("…" if len(review_topics) > 3 else "")
+                    quiz_content = format_quiz_text(clean_topic, "Review", review_cards)
+                    st.session_state.current_topic = clean_topic
+                    quiz_source = "review"
+                    bank_items = None
+                elif is_room_quiz:
+                    # The teacher's published quiz: no Gemini call for anyone in the room
+                    room_published = ROOMS.current(st.session_state.room_code)
+                    if room_published is None:
+                        raise ValueError("Your teacher hasn't shared a quiz in this room yet!")
+                    room_quiz = room_published[1]
+                    clean_topic, difficulty, grade_level = room_quiz['topic'], room_quiz['difficulty'], room_quiz['grade_level']
+                    quiz_length = len(room_quiz['items'])
+                    st.session_state.quiz_length = quiz_length
+                    st.session_state.current_difficulty = difficulty
+                    st.session_state.current_grade_level = grade_level
+                    quiz_content = format_quiz_text(clean_topic, difficulty.split()[0], room_quiz['items'])
+                    st.session_state.current_topic = clean_topic
+                    quiz_source = "room"
+                    bank_items = None
+                elif is_image_quiz:
+                    image_bytes = st.session_state.uploaded_image
+                    image_mime = st.session_state.get('uploaded_image_type', 'image/jpeg')
+                    job = GENERATION_QUEUE.submit(generate_quiz_from_image, image_bytes, difficulty, grade_level, quiz_length,
+                                                  image_mime, requester=current_requester(), priority=priority)
+                    quiz_content, detected_topic = wait_for_generation(job, status_text)
+                    clean_topic = f"📸 {detected_topic}"
+                    st.session_state.current_topic = clean_topic
+                    quiz_source = "image"
+                    bank_items = None
+                else:
+                    # Use the quiz prepared while the results page was open, if it matches
+                    prepared = claim_prefetched_quiz((clean_topic, difficulty, grade_level, quiz_length),
+                                                     priority, status_text)
+                    pipeline_span.set_attribute("quiz.prefetched", prepared is not None)
+                    if prepared is None:
+                        prepared = prepare_quiz(
+                            clean_topic, difficulty, grade_level, quiz_length, weak_topic_labels(),
+                            st.session_state.mastery.accuracy(canonical_topic_key(clean_topic), difficulty.split()[0]),
+                            priority=priority, wait=lambda job: wait_for_generation(job, status_text))
+                    quiz_content, quiz_source, bank_items = prepared['quiz_content'], prepared['source'], prepared['bank_items']
+                    st.session_state.current_topic = clean_topic
+                st.session_state.current_topic_key = "" if is_review_quiz else canonical_topic_key(clean_topic)
+                pipeline_span.set_attribute("quiz.source", quiz_source)
             
-            quiz_questions_only = strip_answers_from_quiz(quiz_content)
-            parsed_questions = parse_individual_questions(quiz_content)
+                parsed_quiz = parse_generated_quiz(quiz_content, quiz_length)
+                correct_answers, explanations = parsed_quiz['correct_answers'], parsed_quiz['explanations']
+                quiz_questions_only = parsed_quiz['questions_only']
+                parsed_questions = parsed_quiz['parsed_questions']
+                
+                # Image quizzes refer to the picture, so only text quizzes are banked
+                if bank_items:
+                    quiz_item_ids = [item['id'] for item in bank_items]
+                    ITEM_BANK.mark_seen(current_requester().student, quiz_item_ids)
+                elif quiz_source == "gemini":
+                    with telemetry.trace_span("item_bank_save"):
+                        quiz_item_ids = save_quiz_to_bank(st.session_state.current_topic_key, difficulty, grade_level,
+                                                          parsed_questions, correct_answers, explanations)
+                else:
+                    quiz_item_ids = []
+                QUIZ_SOURCES.inc(source=quiz_source)
+                
+                # Rooms shuffle per student only if the teacher chose to
+                shuffle = room_published[1]['shuffle'] if room_published else QUIZ_VARIANTS
+                order = list(range(len(parsed_questions)))
+                if shuffle and len(parsed_questions) == len(correct_answers) >= quiz_length:
+                    with telemetry.trace_span("quiz_variant"):
+                        seed = variant_seed(st.session_state.session_id,
+                                            quiz_fingerprint(clean_topic, parsed_questions, correct_answers))
+                        parsed_questions, correct_answers, explanations, order = make_variant(
+                            parsed_questions, correct_answers, explanations, seed)
+                        if quiz_item_ids:
+                            quiz_item_ids = [quiz_item_ids[i] for i in order]
+                        quiz_content = format_quiz_text(clean_topic, difficulty.split()[0], [
+                            dict(q, answer=answer, explanation=explanation)
+                            for q, answer, explanation in zip(parsed_questions, correct_answers, explanations)])
+                        quiz_questions_only = strip_answers_from_quiz(quiz_content)
+                if room_published:
+                    st.session_state.room_quiz = {'code': st.session_state.room_code,
+                                                  'version': room_published[0], 'order': order}
             
             st.session_state.quiz_content = quiz_content
             st.session_state.quiz_questions_only = quiz_questions_only
             st.session_state.parsed_questions = parsed_questions
+            st.session_state.quiz_item_ids = quiz_item_ids
+            st.session_state.quiz_source = quiz_source
             st.session_state.quiz_generated = True
             st.session_state.correct_answers = correct_answers
             st.session_state.explanations = explanations
             
             # Store current parameters for auto-regeneration detection
-            st.session_state.last_quiz_params = {
-                'topic': topic,
-                'category': selected_category,
-                'difficulty': difficulty,
-                'quiz_length': quiz_length,
-                'grade_level': grade_level,
-                'timed_mode': timed_mode,
-                'image_mode': st.session_state.get('image_quiz_mode', False)
-            }
+            st.session_state.last_quiz_params = form_params
             
             # Flags to scroll and fade in quiz after generation
             st.session_state.scroll_to_quiz = True
@@ -3140,6 +3412,7 @@ if st.session_state.get('quiz_generating', False):
             
             # Reset generating state
             st.session_state.quiz_generating = False
+            st.session_state.last_generation_failed = False
             
             st.success(f"🎉 Your quiz is ready! Let's see what you know about **{clean_topic}**! Good luck! 🍀")
             st.rerun()
@@ -3147,23 +3420,23 @@ if st.session_state.get('quiz_generating', False):
         except Exception as e:
             # Reset generating state on error
             st.session_state.quiz_generating = False
+            st.session_state.last_generation_failed = True
             
             status_text.empty()
-            error_msg = str(e).lower()
-            error_type = type(e).__name__
-            print(f"Quiz generation error: {error_type}: {e}")
-            
-            # Check for network/connection errors
-            network_errors = ['connection', 'network', 'unreachable', 'refused', 'reset', 'socket', 'dns', 'resolve', 'offline', 'errno', 'urlopen']
-            is_network_error = any(term in error_msg for term in network_errors) or error_type in ['ConnectionError', 'OSError', 'TimeoutError', 'URLError', 'socket.error']
+            print(f"Quiz generation error: {type(e).__name__}: {e}")
+            error_category = classify_generation_error(e)
             
-            if is_network_error:
+            if error_category == "rate_limited":
+                show_popup(f"🚦 Lots of quizzes are being made right now! Please wait {e.retry_after} seconds and try again.", "warning")
+            elif error_category == "queue_full":
+                show_popup(f"🎟️ The quiz line is full right now! Please try again in {e.retry_after} seconds.", "warning")
+            elif error_category == "network":
                 show_popup("📡 No internet connection! Please check your network and try again.", "error")
-            elif "api_key" in error_msg or "api key" in error_msg or "invalid" in error_msg:
+            elif error_category == "api_key":
                 show_popup("🔑 There's an issue with the AI connection. Please try again or contact support!", "error")
-            elif "timeout" in error_msg:
+            elif error_category == "timeout":
                 show_popup("⏱️ The request took too long. Please check your connection and try again!", "error")
-            elif "quota" in error_msg or "limit" in error_msg:
+            elif error_category == "quota":
                 show_popup("📊 API rate limit reached. Please wait a moment and try again!", "error")
             else:
                 show_popup(f"😅 Oops! Something went wrong. Please try again!", "error")
@@ -3173,6 +3446,7 @@ if st.session_state.get('quiz_generating', False):
 # ============================================================
 # DISPLAY QUIZ WITH INLINE RADIO BUTTONS
 # ============================================================
+profiling.section("quiz_display")
 if st.session_state.quiz_generated and st.session_state.quiz_questions_only:
     
     if not st.session_state.answers_submitted:
@@ -3236,153 +3510,31 @@ if st.session_state.quiz_generated and st.session_state.quiz_questions_only:
             st.markdown(f"## 📝 Quiz Time!")
             st.markdown("*Select your answer for each question below, then click Submit!*")
             
-            # Fixed timer display in bottom right for timed mode
+            # One countdown component per quiz, pinned to the bottom right in timed mode
+            timer_report = None
             if st.session_state.get('timed_mode') and st.session_state.get('quiz_start_time'):
-                # Track answered questions to know when timer should reset
-                answered_count = sum(1 for i in range(num_questions) if st.session_state.get(f"q{i+1}") is not None)
-                
-                # Store the last answered count to detect new answers
-                if 'last_answered_count' not in st.session_state:
-                    st.session_state.last_answered_count = 0
-                
-                # Reset timer when a new question is answered
-                if answered_count > st.session_state.last_answered_count:
-                    st.session_state.question_timer_start = time.time()
-                    st.session_state.last_answered_count = answered_count
-                
-                # Initialize question timer fresh when questions are first displayed
-                # Use a flag to track if the timer has been initialized for this quiz
-                if 'timer_initialized_for_quiz' not in st.session_state or not st.session_state.timer_initialized_for_quiz:
-                    st.session_state.question_timer_start = time.time()
-                    st.session_state.timer_initialized_for_quiz = True
-                
-                question_time_limit = 8  # 8 seconds per question
-                # Timer will be shown inline with each unanswered question below
+                if st.session_state.quiz_shown_at is None:
+                    st.session_state.quiz_shown_at = time.time()
+                quiz_id = str(st.session_state.quiz_start_time)
+                timer_report = quiz_timer(quiz_id, num_questions, len(st.session_state.answer_times),
+                                          key=f"quiz_timer_{quiz_id}")
             
             st.markdown("")
             
             if 'quiz_error' not in st.session_state:
                 st.session_state.quiz_error = None
             
-            # Find the first unanswered question to show timer there
-            first_unanswered = None
-            for i in range(num_questions):
-                if st.session_state.get(f"q{i+1}") is None:
-                    first_unanswered = i
-                    break
-            
             for idx, q in enumerate(parsed_questions[:num_questions]):
                 emoji = QUESTION_EMOJIS[idx] if idx < len(QUESTION_EMOJIS) else "❓"
                 
-                # Check if this question needs the timer (first unanswered in timed mode)
-                show_timer_here = (
-                    st.session_state.get('timed_mode') and 
-                    st.session_state.get('quiz_start_time') and 
-                    idx == first_unanswered
-                )
-                
-                if show_timer_here:
-                    # Show question with timer side by side
-                    q_col, timer_col = st.columns([4, 1])
-                    with q_col:
-                        st.markdown(f"""
-<div class="question-card">
-    <div class="question-card-content">
-        <h4 class="question-card-title">Question {q['number']} {emoji}</h4>
-        <p class="question-card-text">{q['text']}</p>
-    </div>
-</div>
-                        """, unsafe_allow_html=True)
-                    with timer_col:
-                        import streamlit.components.v1 as components
-                        timer_start = st.session_state.question_timer_start
-                        question_time_limit = 8
-                        timer_html = f"""
-                        <!DOCTYPE html>
-                        <html>
-                        <head>
-                            <style>
-                                body {{ margin: 0; padding: 0; overflow: hidden; }}
-                                #timer-box {{
-                                    background: #d1fae5;
-                                    border: 3px solid #10b981;
-                                    border-radius: 20px;
-                                    padding: 10px 15px;
-                                    text-align: center;
-                                    font-family: 'Nunito', Arial, sans-serif;
-                                    box-shadow: 0 4px 20px rgba(0,0,0,0.2);
-                                    margin-top: 15px;
-                                }}
-                                .timer-label {{
-                                    font-size: 0.7rem;
-                                    font-weight: 600;
-                                    color: #374151;
-                                }}
-                                #timer-value {{
-                                    font-size: 1.8rem;
-                                    font-weight: 800;
-                                    color: #10b981;
-                                }}
-                                .timer-hint {{
-                                    font-size: 0.65rem;
-                                    color: #4b5563;
-                                }}
-                            </style>
-                        </head>
-                        <body>
-                            <div id="timer-box">
-                                <div class="timer-label">⏱️ TIMER</div>
-                                <div id="timer-value">15</div>
-                                <div class="timer-hint">seconds</div>
-                            </div>
-                            <script>
-                                var startTime = {timer_start};
-                                var timeLimit = {question_time_limit};
-                                var display = document.getElementById('timer-value');
-                                var container = document.getElementById('timer-box');
-                                
-                                function updateTimer() {{
-                                    var now = Date.now() / 1000;
-                                    var elapsed = now - startTime;
-                                    var remaining = Math.max(0, timeLimit - elapsed);
-                                    var seconds = Math.ceil(remaining);
-                                    
-                                    display.textContent = seconds;
-                                    
-                                    if (remaining > 10) {{
-                                        container.style.background = '#d1fae5';
-                                        container.style.borderColor = '#10b981';
-                                        display.style.color = '#10b981';
-                                    }} else if (remaining > 5) {{
-                                        container.style.background = '#fef3c7';
-                                        container.style.borderColor = '#f59e0b';
-                                        display.style.color = '#f59e0b';
-                                    }} else {{
-                                        container.style.background = '#fee2e2';
-                                        container.style.borderColor = '#ef4444';
-                                        display.style.color = '#ef4444';
-                                    }}
-                                    
-                                    if (remaining > 0) {{
-                                        setTimeout(updateTimer, 100);
-                                    }}
-                                }}
-                                
-                                updateTimer();
-                            </script>
-                        </body>
-                        </html>
-                        """
-                        components.html(timer_html, height=110)
-                else:
-                    st.markdown(f"""
+                st.markdown(f"""
 <div class="question-card">
     <div class="question-card-content">
         <h4 class="question-card-title">Question {q['number']} {emoji}</h4>
         <p class="question-card-text">{q['text']}</p>
     </div>
 </div>
-                    """, unsafe_allow_html=True)
+                """, unsafe_allow_html=True)
                 
                 # Text-to-Speech button for this question
                 tts_col1, tts_col2 = st.columns([1, 8])
@@ -3392,10 +3544,11 @@ if st.session_state.quiz_generated and st.session_state.quiz_questions_only:
                             options_text = ". ".join([f"{letter}: {q['options'][letter]}" for letter in ['A', 'B', 'C', 'D']])
                             full_text = f"Question {q['number']}. {q['text']}. The options are: {options_text}"
                             
-                            tts = gTTS(text=full_text, lang='en')
-                            audio_bytes = BytesIO()
-                            tts.write_to_fp(audio_bytes)
-                            audio_bytes.seek(0)
+                            with profiling.span("gtts", "tts"), telemetry.trace_span("gtts", chars=len(full_text)):
+                                tts = gTTS(text=full_text, lang='en')
+                                audio_bytes = BytesIO()
+                                tts.write_to_fp(audio_bytes)
+                                audio_bytes.seek(0)
                             audio_b64 = base64.b64encode(audio_bytes.read()).decode()
                             audio_html = f'''
                             <audio autoplay controls>
@@ -3424,7 +3577,9 @@ if st.session_state.quiz_generated and st.session_state.quiz_questions_only:
                     horizontal=True,
                     key=radio_key,
                     index=current_idx,
-                    label_visibility="collapsed"
+                    label_visibility="collapsed",
+                    on_change=record_answer_time,
+                    args=(idx,)
                 )
                 
                 if idx < num_questions - 1:
@@ -3451,62 +3606,51 @@ if st.session_state.quiz_generated and st.session_state.quiz_questions_only:
                     st.session_state.quiz_error = None
                     st.session_state.user_answers = user_answers
                     
-                    correct_count = 0
-                    wrong_questions = []
                     correct_answers = st.session_state.correct_answers
-                    
                     num_questions = min(len(user_answers), len(correct_answers))
-                    
-                    for i in range(num_questions):
-                        user_ans = user_answers[i] if user_answers[i] else ""
-                        correct_ans = correct_answers[i] if correct_answers[i] else ""
-                        if user_ans.upper() == correct_ans.upper():
-                            correct_count += 1
-                        else:
-                            wrong_questions.append(i + 1)
+                    correct_count, wrong_questions = grade_answers(user_answers, correct_answers)
                     
                     st.session_state.wrong_questions = wrong_questions
+                    update_review_queue(wrong_questions)
+                    record_room_result(user_answers, correct_answers)
                     
-                    quiz_score = correct_count * 10
-                    
-                    # Calculate time bonus for timed mode
-                    time_bonus = 0
+                    # Timed mode: bonus for time left, measured from server-verified answer times
+                    elapsed = total_time = None
                     if st.session_state.get('timed_mode') and st.session_state.get('quiz_start_time'):
                         total_time = num_questions * st.session_state.get('time_per_question', 30)
-                        elapsed = time.time() - st.session_state.quiz_start_time
-                        remaining = max(0, total_time - elapsed)
-                        
-                        if remaining > 0:
-                            # Bonus based on time remaining (up to 50% extra)
-                            time_bonus = int((remaining / total_time) * quiz_score * 0.5)
-                            st.session_state.time_bonus = time_bonus
+                        elapsed = verified_elapsed(
+                            st.session_state.quiz_shown_at or st.session_state.quiz_start_time,
+                            st.session_state.answer_times,
+                            timer_report,
+                            str(st.session_state.quiz_start_time),
+                            time.time(),
+                        )
                     
-                    # Calculate level bonus (levels 6+ get bonus XP) - use level BEFORE adding score
+                    # Level bonus uses the level BEFORE adding this quiz's score
                     pre_quiz_level = calculate_level(st.session_state.total_score)
-                    level_bonus_percent = max(0, (pre_quiz_level - 5) * 5) if pre_quiz_level >= 6 else 0
-                    level_bonus_percent = min(level_bonus_percent, 25)  # Cap at 25%
-                    level_bonus = int(quiz_score * level_bonus_percent / 100)
-                    st.session_state.level_bonus = level_bonus
+                    xp = score_quiz(correct_count, pre_quiz_level, elapsed, total_time)
+                    st.session_state.time_bonus = xp['time_bonus']
+                    st.session_state.level_bonus = xp['level_bonus']
                     st.session_state.bonus_level = pre_quiz_level  # Store the level used for bonus calculation
                     
-                    total_quiz_score = quiz_score + time_bonus + level_bonus
+                    total_quiz_score = xp['total']
                     st.session_state.score = total_quiz_score
-                    st.session_state.base_score = quiz_score
+                    st.session_state.base_score = xp['base']
                     
                     if correct_count == num_questions:
                         st.session_state.perfect_scores += 1
                     
-                    if correct_count < (num_questions // 2) and st.session_state.current_topic:
-                        if st.session_state.current_topic not in st.session_state.weak_topics:
-                            st.session_state.weak_topics.append(st.session_state.current_topic)
+                    record_mastery(correct_count, num_questions)
                     
                     st.session_state.total_score += total_quiz_score
+                    record_leaderboard(total_quiz_score)
                     st.session_state.quizzes_completed += 1
                     
                     # Save to quiz history with timestamp and XP for analytics
                     import datetime
                     st.session_state.quiz_history.append({
                         'topic': st.session_state.current_topic,
+                        'topic_key': st.session_state.current_topic_key,
                         'score': correct_count,
                         'total': num_questions,
                         'difficulty': st.session_state.get('current_difficulty', 'Medium'),
@@ -3526,12 +3670,15 @@ if st.session_state.quiz_generated and st.session_state.quiz_questions_only:
                     st.session_state.quiz_score_history.append({
                         'percentage': round((correct_count / num_questions) * 100) if num_questions > 0 else 0,
                         'topic': st.session_state.current_topic,
+                        'topic_key': st.session_state.current_topic_key,
                         'timestamp': datetime.datetime.now().isoformat()
                     })
                     
                     check_and_award_badges()
                     
                     st.session_state.answers_submitted = True
+                    start_post_quiz_prefetch()
+                    start_next_quiz_prefetch()
                     
                     st.rerun()
         else:
@@ -3563,47 +3710,38 @@ if st.session_state.quiz_generated and st.session_state.quiz_questions_only:
                     
                     st.session_state.user_answers = user_answers
                     
-                    correct_count = 0
-                    wrong_questions = []
                     correct_answers = st.session_state.correct_answers
-                    
-                    for i in range(min(len(user_answers), len(correct_answers))):
-                        if user_answers[i].upper() == correct_answers[i].upper():
-                            correct_count += 1
-                        else:
-                            wrong_questions.append(i + 1)
+                    correct_count, wrong_questions = grade_answers(user_answers, correct_answers)
                     
                     st.session_state.wrong_questions = wrong_questions
+                    update_review_queue(wrong_questions)
+                    record_room_result(user_answers, correct_answers)
                     
-                    quiz_score = correct_count * 10
-                    
-                    # Calculate level bonus (levels 6+ get bonus XP) - fallback path
+                    # Level bonus (levels 6+ get bonus XP) - fallback path
                     pre_quiz_level = calculate_level(st.session_state.total_score)
-                    level_bonus_percent = max(0, (pre_quiz_level - 5) * 5) if pre_quiz_level >= 6 else 0
-                    level_bonus_percent = min(level_bonus_percent, 25)  # Cap at 25%
-                    level_bonus = int(quiz_score * level_bonus_percent / 100)
-                    st.session_state.level_bonus = level_bonus
+                    xp = score_quiz(correct_count, pre_quiz_level)
+                    st.session_state.level_bonus = xp['level_bonus']
                     st.session_state.bonus_level = pre_quiz_level
                     
-                    total_quiz_score = quiz_score + level_bonus
+                    total_quiz_score = xp['total']
                     st.session_state.score = total_quiz_score
-                    st.session_state.base_score = quiz_score
+                    st.session_state.base_score = xp['base']
                     
                     fallback_total = min(len(user_answers), len(correct_answers))
                     if correct_count == fallback_total:
                         st.session_state.perfect_scores += 1
                     
-                    if correct_count < (fallback_total // 2) and st.session_state.current_topic:
-                        if st.session_state.current_topic not in st.session_state.weak_topics:
-                            st.session_state.weak_topics.append(st.session_state.current_topic)
+                    record_mastery(correct_count, fallback_total)
                     
                     st.session_state.total_score += total_quiz_score
+                    record_leaderboard(total_quiz_score)
                     st.session_state.quizzes_completed += 1
                     
                     # Save to quiz history (fallback form) with timestamp and XP
                     import datetime
                     st.session_state.quiz_history.append({
                         'topic': st.session_state.current_topic,
+                        'topic_key': st.session_state.current_topic_key,
                         'score': correct_count,
                         'total': fallback_total,
                         'difficulty': st.session_state.get('current_difficulty', 'Medium'),
@@ -3623,16 +3761,20 @@ if st.session_state.quiz_generated and st.session_state.quiz_questions_only:
                     st.session_state.quiz_score_history.append({
                         'percentage': round((correct_count / fallback_total) * 100) if fallback_total > 0 else 0,
                         'topic': st.session_state.current_topic,
+                        'topic_key': st.session_state.current_topic_key,
                         'timestamp': datetime.datetime.now().isoformat()
                     })
                     
                     check_and_award_badges()
                     st.session_state.answers_submitted = True
+                    start_post_quiz_prefetch()
+                    start_next_quiz_prefetch()
                     st.rerun()
     
     # ============================================================
     # SHOW RESULTS AFTER SUBMISSION
     # ============================================================
+    profiling.section("results")
     if st.session_state.answers_submitted:
         # Scroll to top using an anchor element
         st.markdown('<div id="results-top"></div>', unsafe_allow_html=True)
@@ -3689,168 +3831,87 @@ if st.session_state.quiz_generated and st.session_state.quiz_questions_only:
         old_level = calculate_level(st.session_state.total_score - score)
         leveled_up = new_level > old_level
         
-        # Determine celebration style based on performance
-        if correct_count == total_questions:
-            card_gradient = "linear-gradient(135deg, #fbbf24 0%, #f59e0b 50%, #d97706 100%)"
-            card_emoji = "🏆"
-            card_title = "PERFECT SCORE!"
-            card_message = "You're absolutely CRUSHING it! Your brain is on fire! 🔥"
-        elif correct_count >= total_questions * 0.8:
-            card_gradient = "linear-gradient(135deg, #34d399 0%, #10b981 50%, #059669 100%)"
-            card_emoji = "🎉"
-            card_title = "Amazing Job!"
-            card_message = "So close to perfect! You're a knowledge machine! 💪"
-        elif correct_count >= total_questions * 0.6:
-            card_gradient = "linear-gradient(135deg, #60a5fa 0%, #3b82f6 50%, #2563eb 100%)"
-            card_emoji = "👍"
-            card_title = "Nice Work!"
-            card_message = "You're learning and growing! Keep going! 📈"
-        else:
-            card_gradient = "linear-gradient(135deg, #a78bfa 0%, #8b5cf6 50%, #7c3aed 100%)"
-            card_emoji = "💪"
-            card_title = "Keep Practicing!"
-            card_message = "Every quiz makes you smarter! Try again! 🌱"
-        
-        # Build bonus breakdown text
-        bonus_parts = []
-        if base_score > 0:
-            bonus_parts.append(f"Base: {base_score}")
-        if time_bonus > 0:
-            bonus_parts.append(f"⚡ Speed: +{time_bonus}")
-        if level_bonus > 0:
-            bonus_parts.append(f"🌟 Level: +{level_bonus}")
-        
-        # Build XP display text
-        xp_display = f"+{score} Experience Points"
-        if len(bonus_parts) > 1:
-            bonus_text = " | ".join(bonus_parts)
-            xp_display += f"<br><span style='font-size: 0.9rem; opacity: 0.8;'>{bonus_text}</span>"
-        
-        # Main celebration card
-        st.markdown(f"""
-<div style="background: {card_gradient}; color: white; padding: 30px; border-radius: 28px; text-align: center; margin: 20px 0; box-shadow: 0 10px 40px rgba(0,0,0,0.2);">
-<div style="font-size: 4rem; margin-bottom: 10px;">{card_emoji}</div>
-<div style="font-size: 2rem; font-weight: 800; text-transform: uppercase; letter-spacing: 2px;">{card_title}</div>
-<div style="font-size: 3rem; font-weight: 700; margin: 15px 0;">{correct_count} / {total_questions}</div>
-<div style="font-size: 1.1rem; opacity: 0.9; margin-bottom: 15px;">{card_message}</div>
-<div style="background: rgba(255,255,255,0.2); padding: 15px 25px; border-radius: 20px; display: inline-block; margin-top: 10px;">
-<span style="font-size: 1.8rem; font-weight: 700;">{xp_display}</span>
-</div>
-</div>
-        """, unsafe_allow_html=True)
-        
-        # Level up notification (if applicable)
-        if leveled_up:
-            new_perk = get_level_perk(new_level)
-            new_title = get_level_title(new_level)
-            st.markdown(f"""
-            <div style="background: linear-gradient(135deg, #6366f1 0%, #8b5cf6 100%); 
-                        color: white; padding: 20px; border-radius: 28px; text-align: center; margin: 15px 0;
-                        box-shadow: 0 5px 20px rgba(99,102,241,0.3);">
-                <div style="font-size: 2rem;">🎉 LEVEL UP! 🎉</div>
-                <div style="font-size: 1.5rem; font-weight: bold;">Level {old_level} → Level {new_level}</div>
-                <div style="font-size: 1.2rem; margin-top: 8px;">{new_title}</div>
-                <div style="font-size: 1rem; margin-top: 8px; background: rgba(255,255,255,0.2); padding: 8px; border-radius: 20px;">🎁 Unlocked: {new_perk}</div>
-            </div>
-            """, unsafe_allow_html=True)
-        
-        # Topic added to practice list (for low scores)
-        if correct_count < total_questions * 0.5 and st.session_state.current_topic:
-            st.info(f"📖 **{st.session_state.current_topic}** added to your practice list!")
-        
-        # Current stats summary
-        st.markdown(f"""
-        📈 **Total: {st.session_state.total_score} Experience Points** | **Level {new_level}** ({get_level_title(new_level)})
-        """)
-        
-        new_badges = check_and_award_badges()
-        if new_badges:
-            for badge_id in new_badges:
-                if badge_id in BADGES:
-                    badge = BADGES[badge_id]
-                    st.markdown(f"""
-                    <div class="new-badge-alert">
-                        <strong>🎊 NEW BADGE UNLOCKED! 🎊</strong>
-                        <span class="new-badge-emoji">{badge['emoji']}</span>
-                        <strong style="font-size: 1.3rem;">{badge['name']}</strong><br>
-                        {badge['desc']}
-                    </div>
-                    """, unsafe_allow_html=True)
-        
-        st.markdown("---")
-        st.markdown("### 📚 Answer Review & Explanations")
-        st.markdown("*Here's the breakdown for each question:*")
-        
+        # Score card through the answer breakdown: one HTML payload, built once per (quiz, answers)
         parsed_questions = st.session_state.parsed_questions
-        
+        new_badges = check_and_award_badges()
+        results_key = (
+            quiz_fingerprint(st.session_state.current_topic, parsed_questions, correct_answers),
+            tuple(user_answers), score, st.session_state.total_score, tuple(new_badges),
+        )
+        cached_results = st.session_state.get('results_payload')
+        if cached_results is None or cached_results[0] != results_key:
+            with telemetry.trace_span("results_html", questions=total_questions):
+                practice_topic = st.session_state.current_topic if correct_count < total_questions * 0.5 else ""
+                cached_results = (results_key, results_html(
+                    correct_count=correct_count,
+                    total_questions=total_questions,
+                    score=score,
+                    base_score=base_score,
+                    time_bonus=time_bonus,
+                    level_bonus=level_bonus,
+                    old_level=old_level,
+                    new_level=new_level,
+                    new_level_title=get_level_title(new_level),
+                    new_level_perk=get_level_perk(new_level) if leveled_up else "",
+                    total_xp=st.session_state.total_score,
+                    practice_topic=practice_topic,
+                    new_badges=new_badges,
+                    parsed_questions=parsed_questions,
+                    user_answers=user_answers,
+                    correct_answers=correct_answers,
+                    explanations=explanations,
+                    flawless=not wrong_questions,
+                ))
+            st.session_state.results_payload = cached_results
+        st.markdown(cached_results[1], unsafe_allow_html=True)
+        
+        # Deeper explanations of missed questions, prefetched in the background at submit
         for i in range(min(total_questions, len(correct_answers))):
             user_ans = user_answers[i] if i < len(user_answers) else "?"
-            correct_ans = correct_answers[i] if i < len(correct_answers) else "?"
+            correct_ans = correct_answers[i]
+            if user_ans.upper() == correct_ans.upper():
+                continue
             explanation = explanations[i] if i < len(explanations) else "Great job learning!"
-            is_correct = user_ans.upper() == correct_ans.upper()
-            
-            question_text = ""
-            user_ans_text = ""
-            correct_ans_text = ""
-            if parsed_questions and i < len(parsed_questions):
-                question_text = parsed_questions[i].get('text', '')
-                options = parsed_questions[i].get('options', {})
-                user_ans_text = options.get(user_ans.upper(), "")
-                correct_ans_text = options.get(correct_ans.upper(), "")
-            
-            q_emoji = QUESTION_EMOJIS[i % len(QUESTION_EMOJIS)]
-            question_label = f"Question {i+1} {q_emoji}"
-            
-            safe_question_text = html.escape(question_text)
-            safe_user_ans_text = html.escape(user_ans_text)
-            safe_correct_ans_text = html.escape(correct_ans_text)
-            safe_explanation = html.escape(explanation)
-            
-            if is_correct:
-                st.markdown(f"""
-<div class="result-correct">
-<strong>{question_label}</strong><br>
-<em style="color: #6b7280;">{safe_question_text}</em><br><br>
-✅ You answered: <strong>{user_ans}) {safe_user_ans_text}</strong> - Correct!<br><br>
-💡 <em>{safe_explanation}</em>
-</div>
-                """, unsafe_allow_html=True)
-            else:
-                st.markdown(f"""
-<div class="result-wrong">
-<strong>{question_label}</strong><br>
-<em style="color: #6b7280;">{safe_question_text}</em><br><br>
-❌ You answered: <strong>{user_ans}) {safe_user_ans_text}</strong><br>
-✅ Correct answer: <strong>{correct_ans}) {safe_correct_ans_text}</strong><br><br>
-💡 <em>{safe_explanation}</em>
-</div>
-                """, unsafe_allow_html=True)
-        
-        if not wrong_questions:
-            st.markdown("### 🌟 FLAWLESS! You got everything right! 🌟")
+            deep_explanations = st.session_state.deep_explanations
+            task_name = f"explain_q{i+1}"
+            if task_name not in deep_explanations:
+                bundle_tip = get_review_bundle(wait=False)['tips'].get(i + 1)
+                if bundle_tip:
+                    deep_explanations[task_name] = bundle_tip
+                elif st.session_state.background_tasks.ready(task_name):
+                    deep_explanations[task_name] = st.session_state.background_tasks.result(task_name)
+            with st.expander(f"🔍 Explain Question {i+1} more"):
+                if deep_explanations.get(task_name):
+                    st.write(deep_explanations[task_name])
+                elif st.button("🔍 Explain it", key=f"explain_btn_{i+1}"):
+                    with st.spinner("Writing a deeper explanation..."):
+                        deep_text = (get_review_bundle()['tips'].get(i + 1)
+                                     or st.session_state.background_tasks.result(task_name))
+                        if not deep_text and parsed_questions and i < len(parsed_questions):
+                            deep_text = generate_deep_explanation(
+                                st.session_state.current_topic,
+                                parsed_questions[i],
+                                correct_ans.upper(),
+                                user_ans.upper(),
+                                explanation
+                            )
+                    deep_explanations[task_name] = deep_text or explanation
+                    st.write(deep_explanations[task_name])
         
         st.markdown("---")
         st.markdown("### 🤖 AI Study Summary")
         with st.spinner("Generating your personalized summary..."):
-            summary = generate_quiz_summary(
-                st.session_state.current_topic,
-                correct_count,
-                5,
-                parsed_questions,
-                user_answers,
-                correct_answers
-            )
-        safe_summary = html.escape(summary).replace('\n', '<br>')
-        st.markdown(f"""
-<div style="background: linear-gradient(135deg, #a29bfe 0%, #6c5ce7 100%); 
-            color: white; 
-            padding: 20px; 
-            border-radius: 28px; 
-            margin: 10px 0;
-            box-shadow: 0 4px 15px rgba(108, 92, 231, 0.3);">
-    {safe_summary}
-</div>
-        """, unsafe_allow_html=True)
+            summary = get_review_bundle()['summary']
+            if not summary:
+                summary = generate_quiz_summary(
+                    st.session_state.current_topic,
+                    correct_count,
+                    5,
+                    parsed_questions,
+                    user_answers,
+                    correct_answers
+                )
+        st.markdown(summary_card_html(summary), unsafe_allow_html=True)
         
         # Study Notes Section
         st.markdown("---")
@@ -3861,28 +3922,22 @@ if st.session_state.quiz_generated and st.session_state.quiz_questions_only:
             st.markdown("*Get AI-generated notes to help you remember key concepts!*")
             
             if st.session_state.get('study_notes'):
-                safe_notes = html.escape(st.session_state.study_notes or '').replace('\n', '<br>')
-                st.markdown(f"""
-<div style="background: linear-gradient(135deg, #10b981 0%, #059669 100%); 
-            color: white; 
-            padding: 20px; 
-            border-radius: 28px; 
-            margin: 10px 0;
-            box-shadow: 0 4px 15px rgba(16, 185, 129, 0.3);">
-    {safe_notes}
-</div>
-                """, unsafe_allow_html=True)
+                st.markdown(notes_card_html(st.session_state.study_notes), unsafe_allow_html=True)
             else:
                 if st.button("📚 Generate Study Notes", use_container_width=True):
                     with st.spinner("Creating your personalized study notes..."):
-                        study_notes = generate_study_notes(
-                            st.session_state.current_topic,
-                            correct_count,
-                            total_questions,
-                            parsed_questions,
-                            correct_answers,
-                            explanations
-                        )
+                        # Usually already written in the background since submit
+                        study_notes = (get_review_bundle()['study_notes']
+                                       or st.session_state.background_tasks.result("study_notes"))
+                        if not study_notes:
+                            study_notes = generate_study_notes(
+                                st.session_state.current_topic,
+                                correct_count,
+                                total_questions,
+                                parsed_questions,
+                                correct_answers,
+                                explanations
+                            )
                         st.session_state.study_notes = study_notes
                         st.rerun()
         else:
@@ -3981,25 +4036,17 @@ if st.session_state.quiz_generated and st.session_state.quiz_questions_only:
             st.button("✨ Ask AI Tutor", key="sparkle_tutor_btn", use_container_width=True, on_click=toggle_tutor)
         st.markdown('</div>', unsafe_allow_html=True)
         
-        if st.session_state.tutor_panel_open:
-            # Display chat history
-            for msg in st.session_state.tutor_chat_history:
-                safe_content = html.escape(msg["content"]).replace('\n', '<br>')
-                if msg["role"] == "user":
-                    st.markdown(f"""
-                    <div style="background: #e0e7ff; padding: 12px 16px; border-radius: 20px; 
-                                margin: 8px 0; max-width: 85%; margin-left: auto; text-align: right;">
-                        <strong>You:</strong> {safe_content}
-                    </div>
-                    """, unsafe_allow_html=True)
-                else:
-                    st.markdown(f"""
-                    <div style="background: linear-gradient(135deg, #818cf8 0%, #6366f1 100%); 
-                                color: white; padding: 12px 16px; border-radius: 20px; 
-                                margin: 8px 0; max-width: 85%;">
-                        <strong>🤖 Tutor:</strong> {safe_content}
-                    </div>
-                    """, unsafe_allow_html=True)
+        def clear_tutor_chat():
+            st.session_state.tutor_chat_history = []
+        
+        # The chat runs as a fragment so asking a question only reruns this panel
+        @st.fragment
+        def tutor_chat_panel(wrong_questions, parsed_questions, correct_answers, explanations, got_perfect):
+            # Display chat history (new messages are added to this box as they arrive)
+            chat_box = st.container()
+            with chat_box:
+                for msg in st.session_state.tutor_chat_history:
+                    render_tutor_message(msg["role"], msg["content"])
             
             # Chat input
             user_question = st.text_input(
@@ -4012,33 +4059,49 @@ if st.session_state.quiz_generated and st.session_state.quiz_questions_only:
             with col1:
                 if st.button("📤 Ask Tutor", use_container_width=True, type="primary"):
                     if user_question.strip():
+                        tutor = get_tutor_session(
+                            st.session_state.current_topic,
+                            wrong_questions,
+                            parsed_questions,
+                            correct_answers,
+                            explanations,
+                            got_perfect_score=got_perfect
+                        )
+                        
+                        with chat_box:
+                            render_tutor_message("user", user_question)
+                            if st.session_state.get('stream_tutor', True):
+                                bubble = st.empty()
+                                response = ""
+                                for chunk in stream_tutor_response(tutor, user_question, st.session_state.tutor_chat_history):
+                                    response += chunk
+                                    render_tutor_message("tutor", response + " ▌", bubble)
+                                render_tutor_message("tutor", response, bubble)
+                            else:
+                                with st.spinner("🤔 Thinking..."):
+                                    response = generate_tutor_response(
+                                        tutor,
+                                        user_question,
+                                        st.session_state.tutor_chat_history
+                                    )
+                                render_tutor_message("tutor", response)
+                        
                         st.session_state.tutor_chat_history.append({
                             "role": "user",
                             "content": user_question
                         })
-                        
-                        with st.spinner("🤔 Thinking..."):
-                            response = generate_tutor_response(
-                                user_question,
-                                st.session_state.current_topic,
-                                wrong_questions,
-                                parsed_questions,
-                                correct_answers,
-                                explanations,
-                                got_perfect_score=got_perfect
-                            )
-                        
                         st.session_state.tutor_chat_history.append({
                             "role": "tutor",
                             "content": response
                         })
-                        st.rerun()
                     else:
                         show_popup("Please type a question first!", "warning")
+                        st.rerun()
             with col2:
-                if st.button("🗑️ Clear Chat", use_container_width=True):
-                    st.session_state.tutor_chat_history = []
-                    st.rerun()
+                st.button("🗑️ Clear Chat", use_container_width=True, on_click=clear_tutor_chat)
+        
+        if st.session_state.tutor_panel_open:
+            tutor_chat_panel(wrong_questions, parsed_questions, correct_answers, explanations, got_perfect)
         
         # Achievement Showcase Section
         st.markdown("---")
@@ -4345,6 +4408,16 @@ if st.session_state.quiz_generated and st.session_state.quiz_questions_only:
             st.markdown("*Every quiz is a step forward! Ready for another round?* 🚀")
         
         st.markdown("")
+        next_options = next_quiz_options()
+        if next_options:
+            next_cols = st.columns(len(next_options))
+            with next_cols[0]:
+                st.button("🔁 SAME TOPIC AGAIN", use_container_width=True,
+                          on_click=start_next_quiz, args=(next_options["same"],))
+            if "harder" in next_options:
+                with next_cols[1]:
+                    st.button(f"🔥 SAME TOPIC, {next_options['harder'][1].split()[0].upper()}", use_container_width=True,
+                              on_click=start_next_quiz, args=(next_options["harder"],))
         if st.button("🔄 TAKE ANOTHER QUIZ!", use_container_width=True):
             st.session_state.quiz_generated = False
             st.session_state.quiz_content = None
@@ -4359,6 +4432,11 @@ if st.session_state.quiz_generated and st.session_state.quiz_questions_only:
             st.session_state.wrong_questions = []
             st.session_state.quiz_error = None
             st.session_state.tutor_chat_history = []
+            st.session_state.tutor_session = None
+            st.session_state.study_notes = None
+            st.session_state.deep_explanations = {}
+            st.session_state.review_bundle = None
+            st.session_state.background_tasks.cancel_all()
             st.session_state.tutor_panel_open = False
             for i in range(1, 16):  # Support up to 15 questions
                 if f"q{i}" in st.session_state:
@@ -4379,6 +4457,7 @@ if st.session_state.quiz_generated and st.session_state.quiz_questions_only:
 # ============================================================
 # ETHICS SECTION (Near Bottom)
 # ============================================================
+profiling.section("ethics")
 st.markdown("---")
 st.markdown("""
 <div class="pledge-card">
@@ -4407,6 +4486,7 @@ with st.expander("💡 Why Real Understanding Matters"):
 # ============================================================
 # ACCESSIBILITY SETTINGS (at bottom of page)
 # ============================================================
+profiling.section("settings")
 with st.expander("⚙️ Settings"):
     st.markdown("### Display Settings")
     
@@ -4481,10 +4561,20 @@ with st.expander("⚙️ Settings"):
     if default_timed_mode != st.session_state.default_timed_mode:
         st.session_state.default_timed_mode = default_timed_mode
         st.session_state.timed_mode = default_timed_mode
+    
+    # Tutor streaming
+    stream_tutor = st.toggle(
+        "💬 Stream Tutor Replies",
+        value=st.session_state.get('stream_tutor', True),
+        help="Show the AI tutor's answer word by word as it's written"
+    )
+    if stream_tutor != st.session_state.stream_tutor:
+        st.session_state.stream_tutor = stream_tutor
 
 # ============================================================
 # FOOTER
 # ============================================================
+profiling.section("footer")
 st.markdown("---")
 
 st.markdown("""
@@ -4508,8 +4598,73 @@ st.markdown("""
 # ============================================================
 # POPUP NOTIFICATION DISPLAY
 # ============================================================
+profiling.section("popup_display")
 popup_html = get_popup_html()
 if popup_html:
     components.html(popup_html, height=0)
 
+# ============================================================
+# ADMIN DEBUG PANEL - Rerun profiler (opt-in)
+# ============================================================
+profiling.section("admin_debug")
+if is_admin():
+    with st.expander("🛠️ Admin: Rerun Profiler"):
+        history = list(rerun_profile.history)
+        if history:
+            last_run = history[-1]
+            st.markdown(f"**Last rerun #{last_run['rerun']}:** {last_run['total_ms']:.0f} ms ({last_run['ended_by']})")
+            st.dataframe(
+                sorted(last_run['spans'], key=lambda s: s['ms'], reverse=True),
+                use_container_width=True,
+                hide_index=True
+            )
+            st.markdown("**Recent reruns (ms)**")
+            st.bar_chart([r['total_ms'] for r in history])
+        else:
+            st.caption("No completed reruns yet - interact with the app to collect timings.")
+        if profiling.PROFILE_LOG_PATH:
+            st.caption(f"Writing JSON lines to `{profiling.PROFILE_LOG_PATH}`")
+        else:
+            st.caption("Set STUDY_BUDDY_PROFILE_LOG to write one JSON line per rerun.")
+        if ITEM_BANK is not None:
+            bank_stats = ITEM_BANK.stats()
+            st.caption(f"Item bank: {bank_stats['items']} questions across {bank_stats['topics']} topics (`{ITEM_BANK.path}`)")
+
+    with st.expander("🏫 Admin: Class Certificates"):
+        st.caption("Upload a roster (CSV or JSON with name, xp, quizzes, perfect_scores and optional badges, date).")
+        roster_file = st.file_uploader("Class roster", type=["csv", "json"], key="class_roster")
+        cert_format = st.radio("Format", ["zip", "pdf"], horizontal=True, key="class_cert_format",
+                               format_func=lambda f: "ZIP (PNG + HTML each)" if f == "zip" else "PDF (one page each)")
+        if st.button("🏆 GENERATE CLASS CERTIFICATES", disabled=roster_file is None, use_container_width=True):
+            try:
+                roster = certificate_batch.read_roster(roster_file.getvalue())
+            except ValueError as e:
+                # Includes malformed JSON and files that aren't UTF-8 text
+                print(f"⚠️ Unreadable class roster: {e}")
+                show_popup("That roster couldn't be read. Upload a UTF-8 CSV or JSON file.", "error")
+            else:
+                if not roster:
+                    show_popup("No students found in that roster.", "error")
+                else:
+                    with st.spinner(f"Rendering {len(roster)} certificates..."):
+                        with telemetry.trace_span("class_certificates", students=len(roster), format=cert_format):
+                            with tempfile.TemporaryFile() as out:
+                                summary = certificate_batch.build_class_certificates(roster, out, cert_format)
+                                out.seek(0)
+                                data = out.read()
+                    print(f"🏫 Class certificates: {summary['students']} students ({cert_format}, {summary['seconds']}s)")
+                    st.session_state.class_certificates = {"format": cert_format, "data": data, **summary}
+        batch = st.session_state.get('class_certificates')
+        if batch:
+            st.download_button(
+                label=f"📥 Download {batch['students']} Certificates ({batch['format'].upper()})",
+                data=batch['data'],
+                file_name=f"class_certificates.{batch['format']}",
+                mime="application/zip" if batch['format'] == "zip" else "application/pdf",
+                use_container_width=True
+            )
+            st.caption(f"Rendered in {batch['seconds']}s")
+
+rerun_profile.finish()
+
 
@@ -0,0 +1,96 @@
+# ============================================================
+# Study Buddy Quest - Background Tasks 🧵
+# A small shared thread pool for speculative work, like writing
+# study notes while the student is still reading their results.
+# Each session owns a SessionTasks group: tasks are keyed by
+# name, started at most once, and dropped together when the
+# student starts a new quiz.
+#
+# Environment:
+#   STUDY_BUDDY_BACKGROUND_WORKERS  pool size (default 4)
+# ============================================================
+
+import os
+import threading
+from concurrent.futures import CancelledError, Future, ThreadPoolExecutor
+
+import telemetry
+
+DEFAULT_WORKERS = 4
+
+BACKGROUND_TASKS = telemetry.REGISTRY.counter(
+    "study_buddy_background_tasks_total", "Background tasks by task and outcome.")
+SPECULATIVE_TASKS = telemetry.REGISTRY.counter(
+    "study_buddy_speculative_tasks_total", "Speculative background work by task and whether it was used.")
+
+
+def _workers_from_env() -> int:
+    value = os.environ.get("STUDY_BUDDY_BACKGROUND_WORKERS", "")
+    return int(value) if value.isdigit() and int(value) > 0 else DEFAULT_WORKERS
+
+
+_executor = ThreadPoolExecutor(max_workers=_workers_from_env(), thread_name_prefix="study-buddy-bg")
+
+
+class SessionTasks:
+    """One session's background tasks, keyed by name."""
+
+    def __init__(self):
+        self.generation = 0
+        self._futures = {}
+        self._lock = threading.Lock()
+
+    def _run(self, generation: int, kind: str, fn, args, kwargs):
+        if generation != self.generation:
+            # The quiz changed while this task was still waiting for a worker
+            BACKGROUND_TASKS.inc(task=kind, outcome="skipped")
+            raise CancelledError()
+        try:
+            result = fn(*args, **kwargs)
+        except Exception:
+            BACKGROUND_TASKS.inc(task=kind, outcome="failed")
+            raise
+        BACKGROUND_TASKS.inc(task=kind, outcome="completed")
+        return result
+
+    def submit(self, name: str, fn, *args, kind: str = None, **kwargs) -> Future:
+        """Start `fn(*args, **kwargs)` in the background unless a task with this name already exists.
+
+        `kind` groups tasks for metrics (defaults to the name).
+        """
+        kind = kind or name
+        with self._lock:
+            future = self._futures.get(name)
+            if future is not None:
+                return future
+            future = _executor.submit(self._run, self.generation, kind, fn, args, kwargs)
+            self._futures[name] = future
+        BACKGROUND_TASKS.inc(task=kind, outcome="started")
+        return future
+
+    def get(self, name: str) -> Future:
+        with self._lock:
+            return self._futures.get(name)
+
+    def ready(self, name: str) -> bool:
+        """True when the task finished successfully and its result can be read without waiting."""
+        future = self.get(name)
+        return future is not None and future.done() and not future.cancelled() and future.exception() is None
+
+    def result(self, name: str, timeout: float = None, default=None):
+        """Wait for a task's result; `default` if it doesn't exist, failed or was cancelled."""
+        future = self.get(name)
+        if future is None:
+            return default
+        try:
+            return future.result(timeout=timeout)
+        except Exception:
+            return default
+
+    def cancel_all(self):
+        """Forget every task for the current quiz; calls already talking to Gemini finish but are ignored."""
+        with self._lock:
+            self.generation += 1
+            futures, self._futures = self._futures, {}
+        for future in futures.values():
+            future.cancel()
@@ -0,0 +1,166 @@
+# ============================================================
+# Study Buddy Quest - Hot-path microbenchmarks
+# Times the pure helpers that run on every rerun or every
+# generation against a corpus of realistic and malformed
+# Gemini responses. No network, no Streamlit.
+#
+#   python benchmarks/bench_hot_paths.py --save benchmarks/baseline.json
+#   python benchmarks/bench_hot_paths.py --compare benchmarks/baseline.json
+# ============================================================
+
+import argparse
+import datetime
+import itertools
+import json
+import os
+import platform
+import statistics
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+
+from quiz_logic import (
+    calculate_level,
+    find_new_badges,
+    get_emoji_for_answer,
+    parse_individual_questions,
+    parse_quiz_answers,
+    sanitize_topic,
+    strip_answers_from_quiz,
+)
+from certificates import certificate_stats, render_certificate_png
+from results_view import results_html
+from progress_series import chart_frames
+from quiz_corpus import LETTER_SWAP, SAMPLE_EXPLANATIONS, build_corpus
+from quiz_variants import remap_letters
+from leaderboard import SortedBoard
+
+SAMPLE_ANSWERS = [
+    "The Roman Empire",
+    "Photosynthesis in plant cells",
+    "A triangle with three equal sides",
+    "Thomas Jefferson",
+    "Something with no keyword at all",
+]
+
+SAMPLE_TOPICS = [
+    "Volcanoes",
+    "  Science: World War II  ",
+    "<script>alert('x')</script> ancient {Egypt}",
+    "x" * 250,
+]
+
+SAMPLE_XP_TOTALS = [0, 49, 125, 900, 1350, 25000]
+
+
+def build_benchmarks(filter_text: str = "") -> dict:
+    """Get {benchmark name: zero-argument callable}."""
+    benchmarks = {}
+    for case, text in build_corpus().items():
+        benchmarks[f"parse_quiz_answers[{case}]"] = lambda text=text: parse_quiz_answers(text)
+        benchmarks[f"parse_individual_questions[{case}]"] = lambda text=text: parse_individual_questions(text)
+        benchmarks[f"strip_answers_from_quiz[{case}]"] = lambda text=text: strip_answers_from_quiz(text)
+
+    benchmarks["get_emoji_for_answer[mixed]"] = lambda: [get_emoji_for_answer(a) for a in SAMPLE_ANSWERS]
+    benchmarks["sanitize_topic[mixed]"] = lambda: [sanitize_topic(t) for t in SAMPLE_TOPICS]
+    benchmarks["calculate_level[mixed]"] = lambda: [calculate_level(xp) for xp in SAMPLE_XP_TOTALS]
+    benchmarks["check_and_award_badges[new_player]"] = lambda: find_new_badges(1, 30, 0, [])
+    benchmarks["check_and_award_badges[veteran]"] = lambda: find_new_badges(
+        40, 2000, 5, ["first_quiz", "five_quizzes", "ten_quizzes", "points_50", "points_100"])
+
+    certificate = certificate_stats("Ada Lovelace", 480, 12, 3, ["first_quiz", "five_quizzes"], "May 01, 2026")
+    benchmarks["render_certificate_png[render]"] = lambda: render_certificate_png.__wrapped__(certificate)
+    benchmarks["render_certificate_png[memoized]"] = lambda: render_certificate_png(certificate)
+
+    questions = [{"text": f"Which of these is true about fact #{n} & <friends>?",
+                  "options": {letter: f"Option {letter} for {n}" for letter in "ABCD"}} for n in range(15)]
+    answers = ["ABCD"[n % 4] for n in range(15)]
+    results = dict(correct_count=11, total_questions=15, score=110, base_score=110, time_bonus=20, level_bonus=5,
+                   old_level=3, new_level=4, new_level_title="Brain Builder 🧱", new_level_perk="Study Notes",
+                   total_xp=480, practice_topic="", new_badges=[], parsed_questions=questions,
+                   user_answers=answers[:11] + ["A", "A", "A", "B"], correct_answers=answers,
+                   explanations=[f"Because of reason {n}." for n in range(15)], flawless=False)
+    benchmarks["results_html[15q]"] = lambda: results_html(**results)
+
+    start = datetime.datetime(2025, 9, 1)
+    stamps = [(start + datetime.timedelta(hours=6 * n)).isoformat() for n in range(1460)]  # a year, 4 quizzes a day
+    xp_history = [{"xp": 20 + n % 40, "timestamp": ts} for n, ts in enumerate(stamps)]
+    score_history = [{"percentage": (n * 37) % 100, "timestamp": ts} for n, ts in enumerate(stamps)]
+    benchmarks["chart_frames[year]"] = lambda: chart_frames(xp_history, score_history)
+    benchmarks["remap_letters[explanations]"] = lambda: [remap_letters(text, LETTER_SWAP)
+                                                         for text in SAMPLE_EXPLANATIONS]
+
+    board = SortedBoard()
+    for n in range(10000):
+        board.add(f"student-{n}", (n * 7919) % 5000)
+    submits = itertools.cycle(range(10000))
+    benchmarks["leaderboard[10k submit]"] = lambda: board.add(f"student-{next(submits)}", 30)
+    benchmarks["leaderboard[10k top10+rank]"] = lambda: (board.top(10), board.rank("student-5000"))
+
+    if filter_text:
+        benchmarks = {name: fn for name, fn in benchmarks.items() if filter_text in name}
+    return benchmarks
+
+
+def time_call(fn, repeat: int) -> dict:
+    """Time one callable; returns per-call microseconds (min/median) over `repeat` rounds."""
+    timer = timeit.Timer(fn)
+    number, _ = timer.autorange()
+    rounds = [t / number * 1e6 for t in timer.repeat(repeat=repeat, number=number)]
+    return {"min_us": round(min(rounds), 3), "median_us": round(statistics.median(rounds), 3), "loops": number}
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list:
+    """Get (name, baseline_us, current_us, ratio) for every benchmark slower than baseline*(1+tolerance)."""
+    regressions = []
+    for name, current in results.items():
+        previous = baseline.get("results", {}).get(name)
+        if not previous or not previous.get("min_us"):
+            continue
+        ratio = current["min_us"] / previous["min_us"]
+        if ratio > 1 + tolerance:
+            regressions.append((name, previous["min_us"], current["min_us"], ratio))
+    return regressions
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Microbenchmarks for quiz parsing and level/badge helpers.")
+    parser.add_argument("--filter", default="", help="Only run benchmarks whose name contains this text")
+    parser.add_argument("--repeat", type=int, default=5, help="Timing rounds per benchmark")
+    parser.add_argument("--save", help="Write results to this JSON file (e.g. a new baseline)")
+    parser.add_argument("--compare", help="Baseline JSON file to check for regressions")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="Allowed slowdown vs baseline before flagging a regression (0.25 = 25%%)")
+    args = parser.parse_args(argv)
+
+    results = {}
+    print(f"{'benchmark':<58} {'min µs':>10} {'median µs':>11}")
+    for name, fn in build_benchmarks(args.filter).items():
+        results[name] = time_call(fn, args.repeat)
+        print(f"{name:<58} {results[name]['min_us']:>10.2f} {results[name]['median_us']:>11.2f}")
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump({
+                "python": platform.python_version(),
+                "machine": platform.machine(),
+                "results": results,
+            }, f, indent=2)
+        print(f"\n💾 Saved {len(results)} results to {args.save}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print(f"\n❌ {len(regressions)} regression(s) vs {args.compare}:")
+            for name, before, after, ratio in regressions:
+                print(f"   {name}: {before:.2f}µs → {after:.2f}µs ({ratio:.2f}x)")
+            return 1
+        print(f"\n✅ No regressions vs {args.compare} (tolerance {args.tolerance:.0%})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
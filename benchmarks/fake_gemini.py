@@ -0,0 +1,152 @@
+# ============================================================
+# Stubbed Gemini backend for benchmarks and load tests
+# Mimics the small slice of google-genai that app.py uses so
+# full quiz journeys can run offline with a controllable delay.
+# ============================================================
+
+import json
+import re
+import time
+import random
+from types import SimpleNamespace
+
+# Key used to report simulated model wait back to the harness
+MODEL_WAIT_STATE_KEY = "_loadtest_model_wait_s"
+
+QUESTION_BANK = [
+    ("What is the hottest layer of the Earth?", ["Crust", "Mantle", "Outer core", "Inner core"]),
+    ("Which planet is known as the Red Planet?", ["Venus", "Mars", "Jupiter", "Saturn"]),
+    ("Who wrote the Declaration of Independence?", ["George Washington", "Thomas Jefferson", "Ben Franklin", "John Adams"]),
+    ("What gas do plants absorb from the air?", ["Oxygen", "Nitrogen", "Carbon dioxide", "Helium"]),
+    ("How many sides does a hexagon have?", ["Five", "Six", "Seven", "Eight"]),
+    ("Which ocean is the largest on Earth?", ["Atlantic", "Indian", "Arctic", "Pacific"]),
+    ("What is the boiling point of water at sea level?", ["90°C", "100°C", "110°C", "120°C"]),
+    ("Which empire built the Colosseum in Rome?", ["Greek", "Roman", "Ottoman", "Persian"]),
+]
+
+QUESTION_EMOJIS = ["🔢", "🧮", "🎯", "🌟", "🏆", "📚", "💡", "🔬", "🌍", "🎨", "🚀", "⭐", "🎓", "🧠", "✨"]
+
+
+def build_quiz_text(num_questions: int = 5, topic: str = "Volcanoes", seed: int = 0) -> str:
+    """Build a well-formed quiz in the exact markdown format the app asks Gemini for."""
+    rng = random.Random(seed)
+    parts = [f"## 📝 Your Medium Quiz on {topic}!\n"]
+    for i in range(1, num_questions + 1):
+        text, options = QUESTION_BANK[(i - 1 + seed) % len(QUESTION_BANK)]
+        answer = "ABCD"[rng.randrange(4)]
+        emoji = QUESTION_EMOJIS[(i - 1) % len(QUESTION_EMOJIS)]
+        parts.append(f"""
+### Question {i} {emoji}
+**{text}**
+
+- A) {options[0]}
+- B) {options[1]}
+- C) {options[2]}
+- D) {options[3]}
+
+✅ **Correct Answer: {answer}**
+
+> 💡 **Explanation:** The right choice is {answer} because of how {topic.lower()} works.
+
+---
+""")
+    parts.append("\n## 🎊 Quiz Complete!\n\n**Great job working through this quiz!** Keep learning and growing! 🌟\n")
+    return "".join(parts)
+
+
+class FakeResponse:
+    """Stand-in for a google-genai GenerateContentResponse."""
+
+    def __init__(self, text: str, prompt_chars: int = 0):
+        self.text = text
+        # Rough 4-chars-per-token estimate so token metrics have something to count
+        self.usage_metadata = SimpleNamespace(
+            prompt_token_count=prompt_chars // 4,
+            candidates_token_count=len(text) // 4,
+        )
+
+
+class FakeModels:
+    """Stand-in for client.models with a configurable simulated latency."""
+
+    latency = 0.0
+
+    def generate_content(self, model: str, contents, config=None):
+        prompt = _prompt_text(contents, config)
+        if self.latency:
+            time.sleep(self.latency)
+            _record_model_wait(self.latency)
+
+        quiz_match = re.search(r"Create a (\d+)-question", prompt)
+        if quiz_match:
+            topic_match = re.search(r"quiz about: (.+)", prompt)
+            topic = topic_match.group(1).strip() if topic_match else "Image Analysis"
+            quiz = build_quiz_text(int(quiz_match.group(1)), topic, seed=len(prompt))
+            if "educational image" in prompt:
+                quiz = "**📸 Image Topic: A labelled diagram**\n\n" + quiz
+            return FakeResponse(quiz, len(prompt))
+        if "REVIEW BUNDLE" in prompt:
+            missed = [int(n) for n in re.findall(r"^Q(\d+) \(missed\)", prompt, re.MULTILINE)]
+            return FakeResponse(json.dumps({
+                "summary": "Nice work on this quiz! Review the questions you missed and try again. 🌟",
+                "study_notes": "KEY CONCEPTS\n- Concept one\n- Concept two\n\nIMPORTANT FACTS\n- Fact one",
+                "question_tips": [{"question": n, "tip": f"Here is a memory trick for question {n}."} for n in missed],
+            }), len(prompt))
+        if "STUDY NOTES" in prompt:
+            return FakeResponse("KEY CONCEPTS\n- Concept one\n- Concept two\n\nIMPORTANT FACTS\n- Fact one", len(prompt))
+        if "tutor" in prompt.lower():
+            return FakeResponse("Great question! Here is the idea explained simply, with an example.", len(prompt))
+        return FakeResponse("Nice work on this quiz! Review the questions you missed and try again. 🌟", len(prompt))
+
+    def generate_content_stream(self, model: str, contents, config=None):
+        """Yield the same reply as generate_content a few words at a time; usage rides on the last chunk."""
+        reply = self.generate_content(model, contents, config)
+        words = re.findall(r'\S+\s*', reply.text)
+        pieces = ["".join(words[i:i + 4]) for i in range(0, len(words), 4)] or [""]
+        for i, piece in enumerate(pieces):
+            chunk = FakeResponse(piece)
+            chunk.usage_metadata = reply.usage_metadata if i == len(pieces) - 1 else None
+            yield chunk
+
+
+def _prompt_text(contents, config=None) -> str:
+    """Flatten a prompt string, [prompt, image part] list or chat turns into plain text."""
+    if isinstance(contents, str):
+        return contents
+    texts = [str(getattr(config, "system_instruction", None) or "")]
+    for item in contents:
+        if isinstance(item, str):
+            texts.append(item)
+        elif isinstance(item, dict):
+            texts.extend(part.get("text", "") for part in item.get("parts", []))
+    return "\n".join(texts)
+
+
+class FakeClient:
+    """Drop-in replacement for google.genai.Client."""
+
+    def __init__(self, *args, **kwargs):
+        self.models = FakeModels()
+
+
+def _record_model_wait(seconds: float):
+    """Add simulated model wait to the running session so the harness can subtract it."""
+    try:
+        import streamlit as st
+        from streamlit.runtime.scriptrunner import get_script_run_ctx
+        if get_script_run_ctx() is None:
+            return
+        st.session_state[MODEL_WAIT_STATE_KEY] = st.session_state.get(MODEL_WAIT_STATE_KEY, 0.0) + seconds
+    except Exception:
+        pass
+
+
+def install(latency: float = 0.0):
+    """Patch google.genai.Client so app.py talks to the stub instead of the network."""
+    import os
+    from google import genai
+
+    os.environ.setdefault("AI_INTEGRATIONS_GEMINI_API_KEY", "stub-key")
+    os.environ.setdefault("AI_INTEGRATIONS_GEMINI_BASE_URL", "http://localhost:0")
+    FakeModels.latency = latency
+    genai.Client = FakeClient
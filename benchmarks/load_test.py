@@ -0,0 +1,268 @@
+# ============================================================
+# Study Buddy Quest - Concurrent classroom load test
+# Drives full student journeys through app.py with Streamlit's
+# AppTest against a stubbed Gemini backend (no network, no API cost).
+#
+#   python benchmarks/load_test.py --sessions 30 --questions 10 --model-latency 0.5
+# ============================================================
+
+import argparse
+import json
+import os
+import pickle
+import statistics
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import fake_gemini
+
+APP_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "app.py")
+
+
+def percentile(values: list, pct: float) -> float:
+    """Nearest-rank percentile of a list of numbers (0 for an empty list)."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered) + 0.5)) - 1))
+    return ordered[rank]
+
+
+def current_rss_bytes() -> int:
+    """Resident set size of this process, or 0 where /proc is unavailable."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return 0
+
+
+def session_state_bytes(at) -> int:
+    """Approximate size of one session's state by pickling its values."""
+    total = 0
+    for key in at.session_state:
+        try:
+            total += len(pickle.dumps(at.session_state[key]))
+        except Exception:
+            continue
+    return total
+
+
+def serialize_script_compilation():
+    """Compile app.py under a lock; parallel ast.parse calls can crash CPython 3.11."""
+    from streamlit.runtime.scriptrunner.script_cache import ScriptCache
+
+    if getattr(ScriptCache.get_bytecode, "_serialized", False):
+        return
+    compile_lock = threading.Lock()
+    original = ScriptCache.get_bytecode
+
+    def get_bytecode(self, script_path):
+        with compile_lock:
+            return original(self, script_path)
+
+    get_bytecode._serialized = True
+    ScriptCache.get_bytecode = get_bytecode
+
+
+def keep_runtime_between_runs():
+    """AppTest clears the global Runtime after each run; keep the last one for concurrent sessions."""
+    from streamlit.runtime import Runtime
+
+    if getattr(Runtime.instance, "_pinned", False):
+        return
+    original = Runtime.instance.__func__
+    last_runtime = []
+
+    def instance(cls):
+        if cls._instance is not None:
+            last_runtime[:] = [cls._instance]
+            return cls._instance
+        if last_runtime:
+            return last_runtime[0]
+        return original(cls)
+
+    instance._pinned = True
+    Runtime.instance = classmethod(instance)
+
+
+class Journey:
+    """One simulated student: generate → answer → submit → tutor → certificate."""
+
+    def __init__(self, session_id: int, num_questions: int, timeout: float):
+        from streamlit.testing.v1 import AppTest
+
+        self.session_id = session_id
+        self.num_questions = num_questions
+        self.at = AppTest.from_file(os.path.abspath(APP_PATH), default_timeout=timeout)
+        self.steps = []  # (step name, wall seconds, server seconds)
+        self.error = None
+
+    def _model_wait(self) -> float:
+        try:
+            return self.at.session_state[fake_gemini.MODEL_WAIT_STATE_KEY]
+        except KeyError:
+            return 0.0
+
+    def _step(self, name: str, action):
+        waited_before = self._model_wait()
+        start = time.perf_counter()
+        action()
+        wall = time.perf_counter() - start
+        server = max(0.0, wall - (self._model_wait() - waited_before))
+        self.steps.append((name, wall, server))
+        if self.at.exception:
+            raise RuntimeError(f"{name}: {self.at.exception[0].message}")
+
+    def _button(self, label_part: str):
+        for button in self.at.button:
+            if label_part in button.label:
+                return button
+        raise LookupError(f"No button containing {label_part!r}")
+
+    def run(self):
+        at = self.at
+        try:
+            self._step("first_load", at.run)
+
+            at.text_input[0].input(f"Volcanoes {self.session_id}")
+            at.selectbox[1].set_value(self.num_questions)
+            self._step("generate_quiz", lambda: self._button("GENERATE QUIZ").click().run())
+            if not at.session_state["quiz_generated"]:
+                raise RuntimeError("generate_quiz: quiz was not generated")
+
+            for i in range(self.num_questions):
+                at.radio(key=f"q{i+1}").set_value("ABCD"[(i + self.session_id) % 4])
+                self._step("answer_question", at.run)
+
+            self._step("submit", lambda: self._button("SUBMIT ALL ANSWERS").click().run())
+            if not at.session_state["answers_submitted"]:
+                raise RuntimeError("submit: answers were not submitted")
+
+            self._step("open_tutor", lambda: at.button(key="sparkle_tutor_btn").click().run())
+            at.text_input(key="tutor_input").input("Can you explain question 1 again?")
+            self._step("ask_tutor", lambda: self._button("📤 Ask Tutor").click().run())
+
+            at.text_input(key="cert_name").input(f"Student {self.session_id}")
+            self._step("certificate", lambda: self._button("Generate Certificate").click().run())
+        except Exception as e:
+            self.error = f"{type(e).__name__}: {e}"
+
+
+def run_load_test(sessions: int, concurrency: int, num_questions: int, model_latency: float,
+                  timeout: float) -> dict:
+    """Run `sessions` journeys with at most `concurrency` in flight and summarise timings."""
+    fake_gemini.install(model_latency)
+    serialize_script_compilation()
+    keep_runtime_between_runs()
+
+    # Warm the import/compile caches so the first journey isn't an outlier
+    Journey(-1, num_questions, timeout).at.run()
+
+    rss_before = current_rss_bytes()
+    journeys = [Journey(i, num_questions, timeout) for i in range(sessions)]
+    lock = threading.Lock()
+    finished = []
+
+    def worker(journey):
+        journey.run()
+        with lock:
+            finished.append(journey)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(worker, journeys))
+    elapsed = time.perf_counter() - start
+    rss_after = current_rss_bytes()
+
+    ok = [j for j in finished if j.error is None]
+    walls = [wall for j in finished for _, wall, _ in j.steps]
+    servers = [server for j in finished for _, _, server in j.steps]
+
+    by_step = {}
+    for j in finished:
+        for name, wall, server in j.steps:
+            by_step.setdefault(name, {"wall": [], "server": []})
+            by_step[name]["wall"].append(wall)
+            by_step[name]["server"].append(server)
+
+    return {
+        "sessions": sessions,
+        "concurrency": concurrency,
+        "questions": num_questions,
+        "model_latency_s": model_latency,
+        "completed": len(ok),
+        "errors": [j.error for j in finished if j.error],
+        "elapsed_s": round(elapsed, 3),
+        "throughput_journeys_per_s": round(len(ok) / elapsed, 3) if elapsed else 0.0,
+        "throughput_reruns_per_s": round(len(walls) / elapsed, 3) if elapsed else 0.0,
+        "interaction_latency_ms": {
+            "p50": round(percentile(walls, 50) * 1000, 1),
+            "p95": round(percentile(walls, 95) * 1000, 1),
+            "p99": round(percentile(walls, 99) * 1000, 1),
+        },
+        "server_time_ms": {
+            "mean": round(statistics.fmean(servers) * 1000, 1) if servers else 0.0,
+            "p50": round(percentile(servers, 50) * 1000, 1),
+            "p95": round(percentile(servers, 95) * 1000, 1),
+            "p99": round(percentile(servers, 99) * 1000, 1),
+        },
+        "steps_ms": {
+            name: {
+                "count": len(t["wall"]),
+                "p50": round(percentile(t["wall"], 50) * 1000, 1),
+                "p95": round(percentile(t["wall"], 95) * 1000, 1),
+                "server_p50": round(percentile(t["server"], 50) * 1000, 1),
+            }
+            for name, t in by_step.items()
+        },
+        "memory": {
+            "rss_growth_per_session_kb": round((rss_after - rss_before) / sessions / 1024, 1) if sessions else 0.0,
+            "session_state_kb_mean": round(statistics.fmean(session_state_bytes(j.at) for j in finished) / 1024, 1)
+            if finished else 0.0,
+        },
+    }
+
+
+def print_report(report: dict):
+    """Print a human-readable summary of a load test run."""
+    print(f"\n🧪 {report['sessions']} sessions | concurrency {report['concurrency']} | "
+          f"{report['questions']} questions | model latency {report['model_latency_s']}s")
+    print(f"   completed {report['completed']}/{report['sessions']} in {report['elapsed_s']}s "
+          f"({report['throughput_journeys_per_s']} journeys/s, {report['throughput_reruns_per_s']} reruns/s)")
+    lat = report["interaction_latency_ms"]
+    srv = report["server_time_ms"]
+    print(f"   interaction latency  p50 {lat['p50']}ms  p95 {lat['p95']}ms  p99 {lat['p99']}ms")
+    print(f"   server time / rerun  p50 {srv['p50']}ms  p95 {srv['p95']}ms  p99 {srv['p99']}ms  mean {srv['mean']}ms")
+    mem = report["memory"]
+    print(f"   memory  {mem['rss_growth_per_session_kb']} KB RSS/session  {mem['session_state_kb_mean']} KB state/session")
+    print("\n   step                 count    p50 ms    p95 ms  server p50")
+    for name, s in report["steps_ms"].items():
+        print(f"   {name:<20} {s['count']:>5} {s['p50']:>9} {s['p95']:>9} {s['server_p50']:>11}")
+    for error in report["errors"][:5]:
+        print(f"   ❌ {error}")
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Simulate concurrent classroom sessions against app.py.")
+    parser.add_argument("--sessions", type=int, default=10, help="Number of student journeys to run")
+    parser.add_argument("--concurrency", type=int, default=None, help="Journeys in flight at once (default: all)")
+    parser.add_argument("--questions", type=int, default=5, choices=[5, 10, 15], help="Quiz length")
+    parser.add_argument("--model-latency", type=float, default=0.0, help="Simulated Gemini latency in seconds")
+    parser.add_argument("--timeout", type=float, default=60.0, help="Per-rerun AppTest timeout in seconds")
+    parser.add_argument("--json", dest="json_path", help="Also write the report to this JSON file")
+    args = parser.parse_args(argv)
+
+    report = run_load_test(args.sessions, args.concurrency or args.sessions, args.questions,
+                           args.model_latency, args.timeout)
+    print_report(report)
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump(report, f, indent=2)
+    return 0 if not report["errors"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,82 @@
+# ============================================================
+# Benchmark corpus of Gemini quiz responses
+# Well-formed quizzes plus the malformed shapes Gemini really
+# sends back (other bullet styles, lowercase letters, missing
+# explanations, truncation, chatty preambles, CRLF endings).
+# ============================================================
+
+import re
+
+from fake_gemini import build_quiz_text
+
+QUIZ_LENGTHS = [5, 10, 15]
+
+
+def _star_bullets(text: str) -> str:
+    return re.sub(r'^- ([A-D]\))', r'* \1', text, flags=re.MULTILINE)
+
+
+def _bare_options(text: str) -> str:
+    return re.sub(r'^- ([A-D]\))', r'\1', text, flags=re.MULTILINE)
+
+
+def _lowercase_answers(text: str) -> str:
+    return re.sub(r'Correct Answer: ([A-D])', lambda m: f"Correct Answer: {m.group(1).lower()}", text)
+
+
+def _missing_explanations(text: str) -> str:
+    return re.sub(r'> 💡 \*\*Explanation:\*\*.*\n', '', text)
+
+
+def _truncated(text: str) -> str:
+    return text[: int(len(text) * 0.6)]
+
+
+def _chatty_preamble(text: str) -> str:
+    return ("Sure! Here's a fun quiz for you. I made sure every question ends with a question mark, "
+            "and I kept the language friendly and encouraging! 😊\n\n" + text +
+            "\n\nLet me know if you want another quiz on a related topic!")
+
+
+def _crlf(text: str) -> str:
+    return text.replace("\n", "\r\n")
+
+
+def _image_quiz(text: str) -> str:
+    return "**📸 Image Topic: A labelled diagram of a volcano**\n\n" + text
+
+
+VARIANTS = {
+    "well_formed": lambda text: text,
+    "star_bullets": _star_bullets,
+    "bare_options": _bare_options,
+    "lowercase_answers": _lowercase_answers,
+    "missing_explanations": _missing_explanations,
+    "truncated": _truncated,
+    "chatty_preamble": _chatty_preamble,
+    "crlf": _crlf,
+    "image_quiz": _image_quiz,
+}
+
+
+def build_corpus() -> dict:
+    """Get {case name: quiz text} for every variant at 5, 10 and 15 questions."""
+    corpus = {}
+    for num_questions in QUIZ_LENGTHS:
+        base = build_quiz_text(num_questions, topic="Volcanoes", seed=num_questions)
+        for variant, transform in VARIANTS.items():
+            corpus[f"{variant}_{num_questions}"] = transform(base)
+    return corpus
+
+
+# Explanations that mention option letters (and capitals that aren't options), for timing remap_letters
+LETTER_SWAP = {"A": "B", "B": "A", "C": "D", "D": "C"}
+SAMPLE_EXPLANATIONS = [
+    "The answer is C because lava cools fast.",
+    "Option (B) is correct.",
+    "**C** is the best choice.",
+    "Answers A and B both describe plates moving apart.",
+    "Vitamin C is correct for treating scurvy.",
+    "Hepatitis A is correct (it spreads through food, like Hepatitis A).",
+    "A volcano is a vent in the crust.",
+]
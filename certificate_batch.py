@@ -0,0 +1,264 @@
+# ============================================================
+# Study Buddy Quest - Class Certificates 🏫
+# Renders certificates for a whole class from a roster (CSV or
+# JSON) across a pool of worker processes and streams them into
+# a ZIP (PNG + HTML per student) or a multi-page PDF. Results
+# are written as they arrive, so only the certificates still in
+# flight are ever in memory. Used by the admin panel and as a
+# command line tool:
+#   python certificate_batch.py roster.csv --out class.zip
+# ============================================================
+
+import argparse
+import csv
+import io
+import json
+import multiprocessing
+import os
+import re
+import sys
+import time
+import zipfile
+
+from certificates import (
+    HEIGHT, WIDTH, CertificateStats, certificate_stats, draw_certificate,
+    render_certificate_html, render_certificate_png,
+)
+from quiz_logic import BADGES, find_new_badges
+
+FORMATS = ("zip", "pdf")
+CHUNKSIZE = 4
+PDF_RESOLUTION = 100.0  # 800x600 px -> 8x6 in pages
+JPEG_QUALITY = 90
+
+# Roster column -> accepted header spellings (case-insensitive)
+COLUMNS = {
+    "student_name": ("student_name", "name", "student"),
+    "total_score": ("total_score", "total_xp", "xp"),
+    "quizzes": ("quizzes", "quizzes_completed"),
+    "perfect_scores": ("perfect_scores", "perfects"),
+    "badges": ("badges",),
+    "date_str": ("date", "date_str"),
+}
+
+HTML_PAGE = """<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>Certificate - {name}</title></head>
+<body style="margin: 0;">{body}</body></html>
+"""
+
+
+# ============================================================
+# ROSTERS
+# ============================================================
+def _field(row: dict, column: str):
+    for header in COLUMNS[column]:
+        value = row.get(header)
+        if value not in (None, ""):
+            return value
+    return None
+
+
+def _int(value) -> int:
+    try:
+        return max(0, int(float(value)))
+    except (TypeError, ValueError):
+        return 0
+
+
+def roster_row_stats(row: dict, date_str: str = None) -> CertificateStats:
+    """Certificate fields for one roster row.
+
+    `badges` may list badge ids (separated by ; , or spaces); without it the
+    badges are the ones the app would have awarded for those stats. Unknown ids
+    are dropped.
+    """
+    row = {str(key).strip().lower(): value for key, value in row.items() if key is not None}
+    total_score = _int(_field(row, "total_score"))
+    quizzes = _int(_field(row, "quizzes"))
+    perfect_scores = _int(_field(row, "perfect_scores"))
+    badges = _field(row, "badges")
+    if badges is None:
+        badges = find_new_badges(quizzes, total_score, perfect_scores, [])
+    elif isinstance(badges, str):
+        badges = re.split(r"[;,\s]+", badges)
+    elif not isinstance(badges, list):
+        badges = [badges]
+    name = str(_field(row, "student_name") or "").strip()
+    badges = [str(badge) for badge in badges if str(badge) in BADGES]
+    date_str = _field(row, "date_str") or date_str
+    return certificate_stats(name, total_score, quizzes, perfect_scores, badges,
+                             str(date_str) if date_str is not None else None)
+
+
+def read_roster(source, date_str: str = None) -> list:
+    """CertificateStats for every student in a CSV or JSON roster (path, text or file).
+
+    Raises ValueError (including UnicodeDecodeError) for a roster that can't be read.
+    """
+    if hasattr(source, "read"):
+        text = source.read()
+    elif os.path.exists(str(source)):
+        with open(source, encoding="utf-8-sig") as f:
+            text = f.read()
+    else:
+        text = source
+    if isinstance(text, bytes):
+        text = text.decode("utf-8-sig")
+
+    stripped = text.lstrip()
+    if stripped.startswith(("[", "{")):
+        data = json.loads(stripped)
+        rows = data.get("students", []) if isinstance(data, dict) else data
+        if not isinstance(rows, list):
+            raise ValueError("A JSON roster must be a list of students")
+    else:
+        try:
+            rows = list(csv.DictReader(io.StringIO(text)))
+        except csv.Error as e:
+            raise ValueError(f"Malformed CSV roster: {e}") from e
+    return [roster_row_stats(row, date_str) for row in rows if isinstance(row, dict)]
+
+
+# ============================================================
+# RENDERING
+# ============================================================
+def render_certificate_jpeg(stats: CertificateStats) -> bytes:
+    """JPEG bytes for a certificate (what a PDF page embeds)."""
+    buffer = io.BytesIO()
+    draw_certificate(stats).save(buffer, format="JPEG", quality=JPEG_QUALITY)
+    return buffer.getvalue()
+
+
+def render_all(roster: list, render=render_certificate_png, processes: int = None, chunksize: int = CHUNKSIZE):
+    """Yield (stats, render(stats)) in roster order, rendered across worker processes."""
+    processes = processes or min(len(roster), os.cpu_count() or 1)
+    if processes <= 1 or len(roster) <= 1:
+        for stats in roster:
+            yield stats, render(stats)
+        return
+    # spawn, not fork: the app server has threads running
+    with multiprocessing.get_context("spawn").Pool(processes) as pool:
+        yield from zip(roster, pool.imap(render, roster, chunksize))
+
+
+def certificate_filename(index: int, stats: CertificateStats) -> str:
+    """File name stem for one student's certificate: 001_Ada_Lovelace."""
+    slug = re.sub(r"[^\w-]+", "_", stats.student_name, flags=re.UNICODE).strip("_") or "champion"
+    return f"{index:03d}_{slug[:60]}"
+
+
+def write_zip(roster: list, out, processes: int = None) -> int:
+    """Stream a PNG and an HTML certificate per student into a ZIP; returns the count."""
+    count = 0
+    with zipfile.ZipFile(out, "w") as archive:
+        for index, (stats, png) in enumerate(render_all(roster, render_certificate_png, processes), start=1):
+            stem = certificate_filename(index, stats)
+            archive.writestr(f"{stem}.png", png, compress_type=zipfile.ZIP_STORED)
+            page = HTML_PAGE.format(name=stem, body=render_certificate_html(stats))
+            archive.writestr(f"{stem}.html", page, compress_type=zipfile.ZIP_DEFLATED)
+            count += 1
+    return count
+
+
+class StreamingPdf:
+    """Minimal PDF writer that emits each JPEG page as soon as it is added.
+
+    Objects 1 and 2 (catalog and page tree) are reserved up front and the
+    page tree is written last, so nothing but the page list is kept.
+    """
+
+    def __init__(self, out, width: int = WIDTH, height: int = HEIGHT):
+        self.out = out
+        self.size = (width * 72 / PDF_RESOLUTION, height * 72 / PDF_RESOLUTION)
+        self.pixels = (width, height)
+        self.offsets = {}
+        self.position = 0
+        self.pages = []
+        self._next_id = 3
+        self._write(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+
+    def _write(self, data: bytes):
+        self.out.write(data)
+        self.position += len(data)
+
+    def _object(self, number: int, body: bytes, stream: bytes = None):
+        self.offsets[number] = self.position
+        self._write(f"{number} 0 obj\n".encode() + body)
+        if stream is not None:
+            self._write(b"\nstream\n" + stream + b"\nendstream")
+        self._write(b"\nendobj\n")
+
+    def add_jpeg_page(self, jpeg: bytes):
+        image_id, content_id, page_id = self._next_id, self._next_id + 1, self._next_id + 2
+        self._next_id += 3
+        width, height = self.size
+        self._object(image_id, (
+            f"<< /Type /XObject /Subtype /Image /Width {self.pixels[0]} /Height {self.pixels[1]} "
+            f"/ColorSpace /DeviceRGB /BitsPerComponent 8 /Filter /DCTDecode /Length {len(jpeg)} >>"
+        ).encode(), jpeg)
+        content = f"q {width:.2f} 0 0 {height:.2f} 0 0 cm /Im0 Do Q".encode()
+        self._object(content_id, f"<< /Length {len(content)} >>".encode(), content)
+        self._object(page_id, (
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 {width:.2f} {height:.2f}] "
+            f"/Resources << /XObject << /Im0 {image_id} 0 R >> >> /Contents {content_id} 0 R >>"
+        ).encode())
+        self.pages.append(page_id)
+
+    def close(self):
+        kids = " ".join(f"{page} 0 R" for page in self.pages)
+        self._object(1, b"<< /Type /Catalog /Pages 2 0 R >>")
+        self._object(2, f"<< /Type /Pages /Kids [{kids}] /Count {len(self.pages)} >>".encode())
+        xref_at = self.position
+        lines = [f"xref\n0 {self._next_id}\n", "0000000000 65535 f \n"]
+        lines += [f"{self.offsets[number]:010d} 00000 n \n" for number in range(1, self._next_id)]
+        lines.append(f"trailer\n<< /Size {self._next_id} /Root 1 0 R >>\nstartxref\n{xref_at}\n%%EOF\n")
+        self._write("".join(lines).encode())
+
+
+def write_pdf(roster: list, out, processes: int = None) -> int:
+    """Stream one certificate per page into a PDF; returns the page count."""
+    pdf = StreamingPdf(out)
+    for stats, jpeg in render_all(roster, render_certificate_jpeg, processes):
+        pdf.add_jpeg_page(jpeg)
+    pdf.close()
+    return len(pdf.pages)
+
+
+def build_class_certificates(roster: list, out, fmt: str = "zip", processes: int = None) -> dict:
+    """Write a class set of certificates to `out` (path or binary file); returns a summary."""
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown certificate format: {fmt}")
+    start = time.perf_counter()
+    if isinstance(out, (str, os.PathLike)):
+        with open(out, "wb") as f:
+            count = build_class_certificates(roster, f, fmt, processes)["students"]
+    else:
+        count = (write_zip if fmt == "zip" else write_pdf)(roster, out, processes)
+    return {"students": count, "format": fmt, "seconds": round(time.perf_counter() - start, 2)}
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Render certificates for a whole class from a roster.")
+    parser.add_argument("roster", help="CSV or JSON roster (name, xp, quizzes, perfect_scores, badges, date)")
+    parser.add_argument("--out", required=True, help="Output file (.zip or .pdf)")
+    parser.add_argument("--format", choices=FORMATS, default=None, help="Output format (default: from --out)")
+    parser.add_argument("--processes", type=int, default=None, help="Worker processes (default: one per CPU)")
+    parser.add_argument("--date", default=None, help="Award date for rows without one")
+    args = parser.parse_args(argv)
+
+    fmt = args.format or ("pdf" if args.out.lower().endswith(".pdf") else "zip")
+    try:
+        roster = read_roster(args.roster, args.date)
+    except ValueError as e:
+        print(f"❌ Couldn't read {args.roster}: {e}")
+        return 1
+    if not roster:
+        print(f"❌ No students found in {args.roster}")
+        return 1
+    summary = build_class_certificates(roster, args.out, fmt, args.processes)
+    print(f"🏆 {summary['students']} certificates -> {args.out} ({fmt}, {summary['seconds']}s)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,187 @@
+# ============================================================
+# Study Buddy Quest - Certificate Rendering 🏆
+# Draws the downloadable PNG certificate and its on-screen HTML
+# version. Fonts are loaded once per process and the static
+# parts (background, gold borders, fixed headings) are drawn
+# once into a template; each certificate copies the template
+# and adds only the student's name, level and stats. Finished PNGs are memoized by their
+# inputs, so clicking "Generate" again costs a dictionary lookup.
+# No Streamlit imports here so batch tools can use it too.
+# ============================================================
+
+import html
+from collections import namedtuple
+from datetime import datetime
+from functools import lru_cache
+from io import BytesIO
+
+from quiz_logic import BADGES, calculate_level, get_level_title
+
+WIDTH, HEIGHT = 800, 600
+BACKGROUND = '#667eea'
+GOLD = '#ffd700'
+FONT_DIR = "/usr/share/fonts/truetype/dejavu"
+PNG_CACHE_SIZE = 256
+PNG_COMPRESS_LEVEL = 3  # ~40% faster to encode than the default 6 for ~15% larger files
+
+# Everything a certificate shows; hashable so it can key the PNG cache
+CertificateStats = namedtuple("CertificateStats", [
+    "student_name", "level", "title", "total_xp", "quizzes", "perfect_scores", "badges", "date_str",
+])
+
+TITLE_EMOJIS = ('🌱', '📖', '🗺️', '🧱', '🏅', '⚔️', '🎓', '🛡️', '🌟', '👑', '🦸')
+
+
+def certificate_stats(student_name: str, total_score: int, quizzes: int, perfect_scores: int,
+                      badges: list, date_str: str = None) -> CertificateStats:
+    """Collect a student's certificate fields (level and title come from their XP)."""
+    level = calculate_level(total_score)
+    return CertificateStats(
+        student_name=student_name or "Study Champion",
+        level=level,
+        title=get_level_title(level),
+        total_xp=total_score,
+        quizzes=quizzes,
+        perfect_scores=perfect_scores,
+        badges=tuple(badges),
+        date_str=date_str or datetime.now().strftime("%B %d, %Y"),
+    )
+
+
+def plain_title(title: str) -> str:
+    """Level title without its emoji (DejaVu can't draw them)."""
+    for emoji in TITLE_EMOJIS:
+        title = title.replace(emoji, '')
+    return title.strip()
+
+
+@lru_cache(maxsize=1)
+def _fonts() -> dict:
+    """Load the certificate fonts once per process."""
+    from PIL import ImageFont
+
+    sizes = {
+        'title': ("DejaVuSans-Bold.ttf", 36),
+        'subtitle': ("DejaVuSans.ttf", 24),
+        'name': ("DejaVuSans-Bold.ttf", 32),
+        'text': ("DejaVuSans.ttf", 18),
+        'small': ("DejaVuSans.ttf", 14),
+    }
+    try:
+        return {key: ImageFont.truetype(f"{FONT_DIR}/{file}", size) for key, (file, size) in sizes.items()}
+    except OSError:
+        default = ImageFont.load_default()
+        return {key: default for key in sizes}
+
+
+@lru_cache(maxsize=1)
+def _template():
+    """Background, borders and fixed headings, drawn once per process."""
+    from PIL import Image, ImageDraw
+
+    fonts = _fonts()
+    img = Image.new('RGB', (WIDTH, HEIGHT), color=BACKGROUND)
+    draw = ImageDraw.Draw(img)
+    draw.rectangle([20, 20, WIDTH - 20, HEIGHT - 20], outline=GOLD, width=8)
+    draw.rectangle([30, 30, WIDTH - 30, HEIGHT - 30], outline=GOLD, width=2)
+    draw.text((WIDTH // 2, 60), "CERTIFICATE OF ACHIEVEMENT", fill='white', font=fonts['title'], anchor='mm')
+    draw.text((WIDTH // 2, 100), "Study Buddy Quest", fill=GOLD, font=fonts['subtitle'], anchor='mm')
+    draw.text((WIDTH // 2, 160), "This certifies that", fill='white', font=fonts['text'], anchor='mm')
+    draw.text((WIDTH // 2, 240), "has achieved the rank of", fill='white', font=fonts['text'], anchor='mm')
+    draw.text((WIDTH // 2, 540), "Presidential AI Challenge", fill=GOLD, font=fonts['text'], anchor='mm')
+    return img
+
+
+def draw_certificate(stats: CertificateStats):
+    """The certificate as a PIL image: a copy of the template plus this student's fields."""
+    from PIL import ImageDraw
+
+    fonts = _fonts()
+    img = _template().copy()
+    draw = ImageDraw.Draw(img)
+    draw.text((WIDTH // 2, 200), stats.student_name, fill=GOLD, font=fonts['name'], anchor='mm')
+    draw.text((WIDTH // 2, 280), f"Level {stats.level} - {plain_title(stats.title)}", fill='white',
+              font=fonts['subtitle'], anchor='mm')
+
+    stats_y = 340
+    draw.text((200, stats_y), f"Experience Points: {stats.total_xp}", fill='white', font=fonts['text'], anchor='mm')
+    draw.text((600, stats_y), f"Quizzes: {stats.quizzes}", fill='white', font=fonts['text'], anchor='mm')
+    draw.text((200, stats_y + 30), f"Perfect Scores: {stats.perfect_scores}", fill='white', font=fonts['text'], anchor='mm')
+    draw.text((600, stats_y + 30), f"Badges: {len(stats.badges)}/{len(BADGES)}", fill='white', font=fonts['text'], anchor='mm')
+    draw.text((WIDTH // 2, 500), f"Awarded on {stats.date_str}", fill='white', font=fonts['small'], anchor='mm')
+    return img
+
+
+@lru_cache(maxsize=PNG_CACHE_SIZE)
+def render_certificate_png(stats: CertificateStats) -> bytes:
+    """PNG bytes for a certificate, memoized by its fields."""
+    buffer = BytesIO()
+    draw_certificate(stats).save(buffer, format='PNG', compress_level=PNG_COMPRESS_LEVEL)
+    return buffer.getvalue()
+
+
+def render_certificate_html(stats: CertificateStats) -> str:
+    """The on-screen HTML certificate (the PNG's printable twin)."""
+    badge_emojis = " ".join(BADGES[b]["emoji"] for b in stats.badges if b in BADGES) or "🎯"
+    
+    return f"""
+    <div id="certificate" style="
+        background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
+        border: 8px solid #ffd700;
+        border-radius: 20px;
+        padding: 40px;
+        text-align: center;
+        color: white;
+        font-family: 'Georgia', serif;
+        max-width: 600px;
+        margin: 20px auto;
+        box-shadow: 0 10px 40px rgba(0,0,0,0.3);
+    ">
+        <div style="font-size: 3rem; margin-bottom: 10px;">🏆</div>
+        <div style="font-size: 2rem; font-weight: bold; text-transform: uppercase; letter-spacing: 3px; margin-bottom: 5px;">
+            Certificate of Achievement
+        </div>
+        <div style="font-size: 1rem; opacity: 0.9; margin-bottom: 20px;">
+            Study Buddy Quest 🧠
+        </div>
+        
+        <div style="border-top: 2px solid rgba(255,255,255,0.3); border-bottom: 2px solid rgba(255,255,255,0.3); padding: 20px; margin: 20px 0;">
+            <div style="font-size: 1rem; opacity: 0.8;">This certifies that</div>
+            <div style="font-size: 2rem; font-weight: bold; margin: 10px 0; color: #ffd700;">
+                {html.escape(stats.student_name)}
+            </div>
+            <div style="font-size: 1rem; opacity: 0.8;">has achieved the rank of</div>
+            <div style="font-size: 1.5rem; font-weight: bold; margin: 10px 0;">
+                Level {stats.level} - {stats.title}
+            </div>
+        </div>
+        
+        <div style="display: grid; grid-template-columns: repeat(2, 1fr); gap: 15px; margin: 20px 0; text-align: center;">
+            <div style="background: rgba(255,255,255,0.15); padding: 15px; border-radius: 20px;">
+                <div style="font-size: 1.8rem; font-weight: bold;">{stats.total_xp}</div>
+                <div style="font-size: 0.9rem; opacity: 0.8;">Experience Points</div>
+            </div>
+            <div style="background: rgba(255,255,255,0.15); padding: 15px; border-radius: 20px;">
+                <div style="font-size: 1.8rem; font-weight: bold;">{stats.quizzes}</div>
+                <div style="font-size: 0.9rem; opacity: 0.8;">Quizzes Completed</div>
+            </div>
+            <div style="background: rgba(255,255,255,0.15); padding: 15px; border-radius: 20px;">
+                <div style="font-size: 1.8rem; font-weight: bold;">{stats.perfect_scores}</div>
+                <div style="font-size: 0.9rem; opacity: 0.8;">Perfect Scores</div>
+            </div>
+            <div style="background: rgba(255,255,255,0.15); padding: 15px; border-radius: 20px;">
+                <div style="font-size: 1.8rem; font-weight: bold;">{len(stats.badges)}/{len(BADGES)}</div>
+                <div style="font-size: 0.9rem; opacity: 0.8;">Badges Earned</div>
+            </div>
+        </div>
+        
+        <div style="font-size: 1.5rem; margin: 15px 0;">{badge_emojis}</div>
+        
+        <div style="margin-top: 20px; font-size: 0.9rem; opacity: 0.8;">
+            Awarded on {html.escape(stats.date_str)}
+        </div>
+        <div style="margin-top: 10px; font-size: 0.8rem; opacity: 0.6;">
+            🏛️ Presidential AI Challenge 🇺🇸
+        </div>
+    </div>
+    """
@@ -0,0 +1,209 @@
+# ============================================================
+# Study Buddy Quest - Gemini Gateway 🛂
+# Every Gemini call goes through generate_content() here: it
+# estimates the call's tokens, reserves them with the rate
+# limiter, settles the real usage afterwards and keeps a small
+# response cache that is served when a student is rate limited
+# (or straight away for prompts marked cache-first).
+# ============================================================
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+import telemetry
+from rate_limit import LIMITER, RateLimitedError, Requester
+
+CHARS_PER_TOKEN = 4
+IMAGE_TOKENS = 258  # Gemini bills each inline image as a fixed token block
+RESPONSE_CACHE_SIZE = 256
+RESPONSE_CACHE_TTL_S = 3600
+
+RATE_LIMITED = telemetry.REGISTRY.counter(
+    "study_buddy_rate_limited_total", "Gemini calls stopped by the rate limiter, by scope and how they were served.")
+RESPONSE_CACHE_HITS = telemetry.REGISTRY.counter(
+    "study_buddy_response_cache_hits_total", "Gemini responses served from the gateway cache, by reason.")
+
+
+class CachedResponse:
+    """A cached reply with the same `.text` attribute as a google-genai response."""
+
+    usage_metadata = None
+
+    def __init__(self, text: str):
+        self.text = text
+
+
+class ResponseCache:
+    """Thread-safe LRU of prompt hash -> response text with a time-to-live."""
+
+    def __init__(self, max_size: int = RESPONSE_CACHE_SIZE, ttl_s: float = RESPONSE_CACHE_TTL_S):
+        self.max_size = max_size
+        self.ttl_s = ttl_s
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires, text = entry
+            if expires < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return text
+
+    def put(self, key: str, text: str, ttl_s: float = None):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + (self.ttl_s if ttl_s is None else ttl_s), text)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+
+RESPONSE_CACHE = ResponseCache()
+
+
+def _parts(contents, config=None) -> list:
+    """Flatten a prompt (string, part list or chat turns) plus any system instruction into parts."""
+    parts = []
+    system_instruction = getattr(config, "system_instruction", None)
+    if system_instruction:
+        parts.append(str(system_instruction))
+    for item in [contents] if isinstance(contents, (str, dict)) else contents:
+        if isinstance(item, dict):
+            parts.extend(p.get("text", "") if isinstance(p, dict) else p for p in item.get("parts", []))
+        else:
+            parts.append(item)
+    return parts
+
+
+def estimate_tokens(contents, max_output_tokens: int, config=None) -> int:
+    """Rough token cost of a call: prompt text / 4, a fixed block per image, plus the expected reply."""
+    tokens = max_output_tokens
+    for part in _parts(contents, config):
+        if isinstance(part, str):
+            tokens += len(part) // CHARS_PER_TOKEN
+        elif getattr(part, "inline_data", None) is not None:
+            tokens += IMAGE_TOKENS
+        else:
+            tokens += len(str(part)) // CHARS_PER_TOKEN
+    return tokens
+
+
+def prompt_key(model: str, contents, config=None) -> str:
+    """Stable hash of a model + prompt (text and image bytes) for the response cache."""
+    digest = hashlib.sha256(model.encode("utf-8"))
+    for part in _parts(contents, config):
+        inline = getattr(part, "inline_data", None)
+        if isinstance(part, str):
+            digest.update(part.encode("utf-8"))
+        elif inline is not None and inline.data:
+            digest.update(inline.data)
+        else:
+            digest.update(str(part).encode("utf-8"))
+    return digest.hexdigest()
+
+
+def semantic_key(function: str, cache_key: tuple) -> str:
+    """Cache key from a caller-chosen tuple instead of the exact prompt."""
+    return hashlib.sha256(repr((function,) + tuple(cache_key)).encode("utf-8")).hexdigest()
+
+
+def _usage_tokens(response) -> int:
+    usage = getattr(response, "usage_metadata", None)
+    if usage is None:
+        return 0
+    return (getattr(usage, "prompt_token_count", None) or 0) + (getattr(usage, "candidates_token_count", None) or 0)
+
+
+def _reserve(key: str, function: str, requester: Requester, estimate: int):
+    """Reserve tokens for a call; returns cached text instead when rate limited (or re-raises)."""
+    try:
+        LIMITER.acquire(requester, estimate)
+        return None
+    except RateLimitedError as e:
+        text = RESPONSE_CACHE.get(key)
+        RATE_LIMITED.inc(function=function, scope=e.scope, served="cache" if text is not None else "rejected")
+        if text is None:
+            raise
+        RESPONSE_CACHE_HITS.inc(function=function, reason="rate_limited")
+        return text
+
+
+def generate_content(client, model: str, contents, function: str, requester: Requester,
+                     max_output_tokens: int = 1024, cache: str = "fallback", config=None,
+                     cache_key: tuple = None):
+    """Rate-limited client.models.generate_content.
+
+    cache="fallback" serves a cached reply only when the requester is rate limited;
+    cache="prefer" serves any cached reply for the same prompt without calling Gemini.
+    `cache_key` replaces the prompt hash when equivalent prompts should share an entry
+    (e.g. quizzes keyed by canonical topic rather than the exact topic text).
+    """
+    key = semantic_key(function, cache_key) if cache_key is not None else prompt_key(model, contents, config)
+    if cache == "prefer":
+        text = RESPONSE_CACHE.get(key)
+        if text is not None:
+            RESPONSE_CACHE_HITS.inc(function=function, reason="prefer")
+            return CachedResponse(text)
+
+    estimate = estimate_tokens(contents, max_output_tokens, config)
+    cached = _reserve(key, function, requester, estimate)
+    if cached is not None:
+        return CachedResponse(cached)
+
+    try:
+        if config is not None:
+            response = client.models.generate_content(model=model, contents=contents, config=config)
+        else:
+            response = client.models.generate_content(model=model, contents=contents)
+    except Exception:
+        LIMITER.release(requester, estimate)
+        raise
+
+    LIMITER.settle(requester, estimate, _usage_tokens(response) or estimate)
+    telemetry.record_token_usage(function, response)
+    if response.text:
+        RESPONSE_CACHE.put(key, response.text)
+    return response
+
+
+def generate_content_stream(client, model: str, contents, function: str, requester: Requester,
+                            max_output_tokens: int = 1024, config=None):
+    """Rate-limited client.models.generate_content_stream; yields text chunks as they arrive.
+
+    When the requester is rate limited, a cached reply for the same prompt is yielded in one piece.
+    """
+    key = prompt_key(model, contents, config)
+    estimate = estimate_tokens(contents, max_output_tokens, config)
+    cached = _reserve(key, function, requester, estimate)
+    if cached is not None:
+        yield cached
+        return
+
+    chunks = []
+    last_chunk = None
+    try:
+        if config is not None:
+            stream = client.models.generate_content_stream(model=model, contents=contents, config=config)
+        else:
+            stream = client.models.generate_content_stream(model=model, contents=contents)
+        for chunk in stream:
+            last_chunk = chunk
+            if chunk.text:
+                chunks.append(chunk.text)
+                yield chunk.text
+    except Exception:
+        if not chunks:
+            LIMITER.release(requester, estimate)
+        raise
+
+    # Gemini reports usage for the whole reply on the final chunk
+    LIMITER.settle(requester, estimate, _usage_tokens(last_chunk) or estimate)
+    telemetry.record_token_usage(function, last_chunk)
+    if chunks:
+        RESPONSE_CACHE.put(key, "".join(chunks))
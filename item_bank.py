@@ -0,0 +1,199 @@
+# ============================================================
+# Study Buddy Quest - Item Bank 🏦
+# Every validated question Gemini writes is kept in a small
+# SQLite database (text, options, answer, explanation, canonical
+# topic, difficulty, grade). Exact repeats are caught by a
+# content-hash index and reworded repeats by a word-overlap
+# check, so the bank only grows with genuinely new questions.
+# When a topic has enough questions a student hasn't seen, a
+# fresh quiz is assembled from the bank with no Gemini call.
+#
+# Environment:
+#   STUDY_BUDDY_ITEM_BANK  database path (default item_bank.db next
+#                          to this file), or "off" to disable
+# ============================================================
+
+import hashlib
+import json
+import os
+import random
+import re
+import sqlite3
+import threading
+import time
+
+import telemetry
+
+DEFAULT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "item_bank.db")
+NEAR_DUPLICATE_THRESHOLD = 0.8  # Jaccard overlap of question + answer words
+
+ITEM_BANK_EVENTS = telemetry.REGISTRY.counter(
+    "study_buddy_item_bank_events_total", "Questions offered to the item bank, by outcome.")
+QUIZ_SOURCES = telemetry.REGISTRY.counter(
+    "study_buddy_quiz_sources_total", "Quizzes served, by where their questions came from.")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS items (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    content_hash TEXT NOT NULL UNIQUE,
+    topic_key TEXT NOT NULL,
+    difficulty TEXT NOT NULL,
+    grade TEXT NOT NULL,
+    emoji TEXT NOT NULL DEFAULT '',
+    text TEXT NOT NULL,
+    options TEXT NOT NULL,
+    answer TEXT NOT NULL,
+    explanation TEXT NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS items_by_pool ON items (topic_key, difficulty, grade);
+CREATE TABLE IF NOT EXISTS seen (
+    student TEXT NOT NULL,
+    item_id INTEGER NOT NULL,
+    seen_at REAL NOT NULL,
+    PRIMARY KEY (student, item_id)
+);
+"""
+
+STOPWORDS = {"a", "an", "the", "of", "to", "in", "on", "is", "are", "was", "were", "which", "what",
+             "who", "how", "why", "when", "where", "do", "does", "did", "and", "or", "for", "by", "with"}
+
+
+def _words(text: str) -> list:
+    return re.findall(r"[a-z0-9]+", text.lower())
+
+
+def content_hash(text: str, options: dict) -> str:
+    """Exact-duplicate key: the question and its options, ignoring case, punctuation and option order."""
+    normalized_options = sorted(" ".join(_words(v)) for v in options.values())
+    payload = " ".join(_words(text)) + "|" + "|".join(normalized_options)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+
+def _signature(text: str, answer_text: str) -> frozenset:
+    """Content words of the question plus its correct answer, for near-duplicate checks."""
+    return frozenset(w for w in _words(text) + _words(answer_text) if w not in STOPWORDS)
+
+
+def _jaccard(a: frozenset, b: frozenset) -> float:
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+def _grade(grade: str) -> str:
+    return grade if grade and grade != "None (Skip)" else ""
+
+
+class ItemBank:
+    """SQLite-backed question bank shared by every session in the process."""
+
+    def __init__(self, path: str = DEFAULT_PATH):
+        self.path = path
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.executescript(SCHEMA)
+        self._lock = threading.Lock()
+        self._signatures = {}  # topic_key -> [(item id, signature)], loaded on first use
+
+    def _topic_signatures(self, topic_key: str) -> list:
+        signatures = self._signatures.get(topic_key)
+        if signatures is None:
+            rows = self._conn.execute(
+                "SELECT id, text, options, answer FROM items WHERE topic_key = ?", (topic_key,)).fetchall()
+            signatures = [(row["id"], _signature(row["text"], json.loads(row["options"]).get(row["answer"], "")))
+                          for row in rows]
+            self._signatures[topic_key] = signatures
+        return signatures
+
+    def add_quiz(self, topic_key: str, difficulty: str, grade: str, parsed_questions: list,
+                 correct_answers: list, explanations: list) -> list:
+        """Store a validated quiz's questions; returns the bank id of each question (existing id for duplicates)."""
+        item_ids = []
+        grade = _grade(grade)
+        with self._lock, self._conn:
+            signatures = self._topic_signatures(topic_key)
+            for i, q in enumerate(parsed_questions):
+                if i >= len(correct_answers):
+                    break
+                answer = correct_answers[i]
+                options = q['options']
+                digest = content_hash(q['text'], options)
+                row = self._conn.execute("SELECT id FROM items WHERE content_hash = ?", (digest,)).fetchone()
+                if row is not None:
+                    ITEM_BANK_EVENTS.inc(outcome="duplicate")
+                    item_ids.append(row["id"])
+                    continue
+
+                signature = _signature(q['text'], options.get(answer, ""))
+                near = next((item_id for item_id, other in signatures
+                             if _jaccard(signature, other) >= NEAR_DUPLICATE_THRESHOLD), None)
+                if near is not None:
+                    ITEM_BANK_EVENTS.inc(outcome="near_duplicate")
+                    item_ids.append(near)
+                    continue
+
+                cursor = self._conn.execute(
+                    "INSERT INTO items (content_hash, topic_key, difficulty, grade, emoji, text, options, answer,"
+                    " explanation, created_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (digest, topic_key, difficulty, grade, q.get('emoji', ''), q['text'], json.dumps(options),
+                     answer, explanations[i] if i < len(explanations) else "", time.time()))
+                signatures.append((cursor.lastrowid, signature))
+                ITEM_BANK_EVENTS.inc(outcome="added")
+                item_ids.append(cursor.lastrowid)
+        return item_ids
+
+    def count_unseen(self, topic_key: str, difficulty: str, grade: str, student: str) -> int:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT COUNT(*) FROM items WHERE topic_key = ? AND difficulty = ? AND grade = ?"
+                " AND id NOT IN (SELECT item_id FROM seen WHERE student = ?)",
+                (topic_key, difficulty, _grade(grade), student)).fetchone()
+        return row[0]
+
+    def assemble(self, topic_key: str, difficulty: str, grade: str, student: str, num_questions: int,
+                 rng: random.Random = None) -> list:
+        """Pick `num_questions` random questions this student hasn't seen, or None when the bank is too thin."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT * FROM items WHERE topic_key = ? AND difficulty = ? AND grade = ?"
+                " AND id NOT IN (SELECT item_id FROM seen WHERE student = ?)",
+                (topic_key, difficulty, _grade(grade), student)).fetchall()
+        if len(rows) < num_questions:
+            return None
+        picked = (rng or random).sample(rows, num_questions)
+        return [{
+            'id': row["id"],
+            'emoji': row["emoji"],
+            'text': row["text"],
+            'options': json.loads(row["options"]),
+            'answer': row["answer"],
+            'explanation': row["explanation"],
+        } for row in picked]
+
+    def mark_seen(self, student: str, item_ids: list):
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO seen (student, item_id, seen_at) VALUES (?, ?, ?)",
+                [(student, item_id, now) for item_id in item_ids])
+
+    def stats(self) -> dict:
+        with self._lock:
+            items, topics = self._conn.execute("SELECT COUNT(*), COUNT(DISTINCT topic_key) FROM items").fetchone()
+        return {'items': items, 'topics': topics}
+
+
+def open_from_env():
+    """The shared bank, or None when STUDY_BUDDY_ITEM_BANK=off or the database can't be opened."""
+    path = os.environ.get("STUDY_BUDDY_ITEM_BANK", DEFAULT_PATH)
+    if path.lower() == "off":
+        return None
+    try:
+        return ItemBank(path)
+    except sqlite3.Error as e:
+        print(f"Item bank disabled: {e}")
+        return None
+
+
+ITEM_BANK = open_from_env()
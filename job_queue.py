@@ -0,0 +1,201 @@
+# ============================================================
+# Study Buddy Quest - Generation Queue 🎟️
+# Every quiz generation (app, prefetch and JSON API) waits its
+# turn here instead of calling Gemini straight from the
+# requesting thread. A fixed set of worker threads caps how many
+# generations run at once; waiting jobs are served by priority
+# class (retries, then text, then image, then speculative
+# prefetch) and then oldest first. When too many are waiting a
+# new job is turned away with a retry hint. Workers share the
+# process's Gemini client and caches, so they are threads; the
+# waiting line sits behind a small broker interface (put / get /
+# position / len) so a local broker such as Redis could replace
+# the in-process one.
+#
+# Environment:
+#   STUDY_BUDDY_GENERATION_WORKERS  generations running at once (default 4)
+#   STUDY_BUDDY_GENERATION_QUEUE    generations allowed to wait (default 32)
+# ============================================================
+
+import heapq
+import itertools
+import math
+import os
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+
+import telemetry
+
+DEFAULT_WORKERS = 4
+DEFAULT_CAPACITY = 32
+PRIORITIES = ("retry", "text", "image", "prefetch")  # served in this order
+PREFETCH_SHARE = 0.5  # speculative jobs only join a queue less than half full
+INITIAL_JOB_SECONDS = 8.0  # duration guess until real jobs have been timed
+
+GENERATION_JOBS = telemetry.REGISTRY.counter(
+    "study_buddy_generation_jobs_total", "Quiz generation jobs by priority class and outcome.")
+GENERATION_QUEUE_WAIT = telemetry.REGISTRY.histogram(
+    "study_buddy_generation_queue_wait_seconds", "Time quiz generation jobs spent waiting for a worker.")
+
+
+class QueueFullError(Exception):
+    """Raised when the generation queue can't take another job right now."""
+
+    def __init__(self, retry_after: float):
+        self.retry_after = max(1, int(math.ceil(retry_after)))
+        super().__init__(f"Quiz generation queue is full. Try again in {self.retry_after}s.")
+
+
+def job_priority(mode: str, retry: bool = False) -> str:
+    """Priority class of a generation: 'text', 'image' or 'prefetch', promoted to 'retry' after a failure."""
+    return "retry" if retry and mode != "prefetch" else mode
+
+
+class Job:
+    """One queued call; `future` holds its result."""
+
+    def __init__(self, queue, fn, args: tuple, kwargs: dict, priority: str, seq: int):
+        self.queue = queue
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self.priority = priority
+        self.sort_key = (PRIORITIES.index(priority), seq)
+        self.future = Future()
+        self.queued_at = time.monotonic()
+
+    def position(self) -> int:
+        """1 for the next job to start, 2 for the one after, ...; 0 once it is running or done."""
+        if self.future.running() or self.future.done():
+            return 0
+        return self.queue.broker.position(self) + 1
+
+    def wait(self, timeout: float = None) -> bool:
+        """Block up to `timeout` seconds; True once the job has finished."""
+        try:
+            self.future.exception(timeout=timeout)
+        except FutureTimeout:
+            return False
+        except Exception:
+            pass
+        return True
+
+    def result(self, timeout: float = None):
+        return self.future.result(timeout=timeout)
+
+    def cancel(self) -> bool:
+        """Drop the job if it hasn't started."""
+        return self.future.cancel()
+
+
+class LocalBroker:
+    """In-process waiting line: a heap ordered by (priority class, arrival)."""
+
+    def __init__(self):
+        self._heap = []
+        self._cond = threading.Condition()
+
+    def put(self, job: Job):
+        with self._cond:
+            heapq.heappush(self._heap, (job.sort_key, job))
+            self._cond.notify()
+
+    def get(self) -> Job:
+        """The next job to run (blocks until there is one)."""
+        with self._cond:
+            while not self._heap:
+                self._cond.wait()
+            return heapq.heappop(self._heap)[1]
+
+    def position(self, job: Job) -> int:
+        """How many live jobs are ahead of `job`."""
+        with self._cond:
+            return sum(1 for key, other in self._heap if key < job.sort_key and not other.future.cancelled())
+
+    def __len__(self) -> int:
+        with self._cond:
+            return sum(1 for _, job in self._heap if not job.future.cancelled())
+
+
+class GenerationQueue:
+    """Priority queue of generation jobs served by a fixed pool of worker threads."""
+
+    def __init__(self, workers: int = DEFAULT_WORKERS, capacity: int = DEFAULT_CAPACITY, broker=None):
+        self.workers = workers
+        self.capacity = capacity
+        self.broker = broker or LocalBroker()
+        self.running = 0
+        self._seq = itertools.count()
+        self._lock = threading.Lock()
+        self._threads = []
+        self._job_seconds = INITIAL_JOB_SECONDS
+
+    def _start_workers(self):
+        # Started on first use, so tools that import this module don't spawn threads
+        with self._lock:
+            while len(self._threads) < self.workers:
+                thread = threading.Thread(target=self._work, name=f"generation-{len(self._threads)}", daemon=True)
+                self._threads.append(thread)
+                thread.start()
+
+    def _work(self):
+        while True:
+            job = self.broker.get()
+            if not job.future.set_running_or_notify_cancel():
+                GENERATION_JOBS.inc(priority=job.priority, outcome="cancelled")
+                continue
+            started = time.monotonic()
+            GENERATION_QUEUE_WAIT.observe(started - job.queued_at)
+            with self._lock:
+                self.running += 1
+            try:
+                result = job.fn(*job.args, **job.kwargs)
+            except BaseException as e:
+                job.future.set_exception(e)
+                GENERATION_JOBS.inc(priority=job.priority, outcome="failed")
+            else:
+                job.future.set_result(result)
+                GENERATION_JOBS.inc(priority=job.priority, outcome="completed")
+            finally:
+                with self._lock:
+                    self.running -= 1
+                    # Moving average of job time, for retry hints
+                    self._job_seconds = 0.8 * self._job_seconds + 0.2 * (time.monotonic() - started)
+
+    def retry_after(self) -> float:
+        """Rough seconds until the jobs already waiting have started."""
+        return self._job_seconds * max(1, len(self.broker)) / max(1, self.workers)
+
+    def submit(self, fn, *args, priority: str = "text", **kwargs) -> Job:
+        """Queue `fn(*args, **kwargs)`; raises QueueFullError when the line is too long."""
+        if priority not in PRIORITIES:
+            raise ValueError(f"Unknown priority class: {priority}")
+        limit = self.capacity * PREFETCH_SHARE if priority == "prefetch" else self.capacity
+        if len(self.broker) >= limit:
+            GENERATION_JOBS.inc(priority=priority, outcome="rejected")
+            raise QueueFullError(self.retry_after())
+        self._start_workers()
+        job = Job(self, fn, args, kwargs, priority, next(self._seq))
+        self.broker.put(job)
+        GENERATION_JOBS.inc(priority=priority, outcome="queued")
+        return job
+
+    def run(self, fn, *args, priority: str = "text", **kwargs):
+        """Queue `fn` and wait for its result."""
+        return self.submit(fn, *args, priority=priority, **kwargs).result()
+
+    def stats(self) -> dict:
+        return {"queued": len(self.broker), "running": self.running, "workers": self.workers,
+                "capacity": self.capacity}
+
+
+def _int_from_env(name: str, default: int) -> int:
+    value = os.environ.get(name, "")
+    return int(value) if value.isdigit() and int(value) > 0 else default
+
+
+GENERATION_QUEUE = GenerationQueue(
+    workers=_int_from_env("STUDY_BUDDY_GENERATION_WORKERS", DEFAULT_WORKERS),
+    capacity=_int_from_env("STUDY_BUDDY_GENERATION_QUEUE", DEFAULT_CAPACITY),
+)
@@ -0,0 +1,156 @@
+# ============================================================
+# Study Buddy Quest - Leaderboards 🏆
+# Experience Points earned per student, for everyone and for
+# each classroom, over all time, today and this week. Every
+# board is a sorted index: a list of (-xp, student) kept in
+# order with bisect, plus a student -> xp map. A submit moves
+# one entry (binary search to find it and its new place), top-k
+# is a slice, and a student's rank is one more binary search,
+# so nothing ever scans a whole board. The global boards only
+# show pseudonyms; typed names appear on a classroom's boards.
+# Boards keep their top MAX_PLAYERS, and classroom boards idle
+# for a week are dropped. No Streamlit imports.
+# ============================================================
+
+import bisect
+import threading
+import zlib
+from datetime import datetime, timedelta
+
+WINDOWS = ("today", "week", "all")
+GLOBAL_SCOPE = "global"
+DEFAULT_TOP_K = 10
+MAX_PLAYERS = 10_000  # per board; the lowest totals make way for new players
+SCOPE_TTL_S = 7 * 24 * 3600  # classroom boards idle this long are dropped
+MAX_SCOPES = 1000
+
+
+class SortedBoard:
+    """One leaderboard: students ordered by XP (highest first, then by id)."""
+
+    def __init__(self, max_players: int = MAX_PLAYERS):
+        self.max_players = max_players
+        self._order = []   # sorted (-xp, student)
+        self._xp = {}      # student -> xp
+
+    def __len__(self) -> int:
+        return len(self._order)
+
+    def add(self, student: str, xp: int) -> int:
+        """Add XP to a student's total; returns the new total."""
+        old = self._xp.get(student)
+        if old is not None:
+            del self._order[bisect.bisect_left(self._order, (-old, student))]
+        total = (old or 0) + xp
+        self._xp[student] = total
+        bisect.insort(self._order, (-total, student))
+        while len(self._order) > self.max_players:
+            # The lowest total is last: dropping it is O(1)
+            del self._xp[self._order.pop()[1]]
+        return total
+
+    def xp(self, student: str):
+        return self._xp.get(student)
+
+    def rank(self, student: str):
+        """1-based place on the board (ties share the best place), or None if not on it."""
+        xp = self._xp.get(student)
+        if xp is None:
+            return None
+        return bisect.bisect_left(self._order, (-xp,)) + 1
+
+    def top(self, k: int = DEFAULT_TOP_K) -> list:
+        """[(rank, student, xp)] for the k highest totals."""
+        rows = []
+        for i, (negative_xp, student) in enumerate(self._order[:k]):
+            rank = rows[-1][0] if rows and rows[-1][2] == -negative_xp else i + 1
+            rows.append((rank, student, -negative_xp))
+        return rows
+
+
+def window_start(window: str, now: datetime):
+    """Start of the day or week (Monday) containing `now`; None for all time."""
+    if window == "all":
+        return None
+    day = datetime(now.year, now.month, now.day)
+    return day - timedelta(days=day.weekday()) if window == "week" else day
+
+
+class Leaderboards:
+    """Every board in the process, by (scope, window); day and week boards restart when their period ends."""
+
+    def __init__(self, max_players: int = MAX_PLAYERS, scope_ttl_s: float = SCOPE_TTL_S, max_scopes: int = MAX_SCOPES):
+        self.max_players = max_players
+        self.scope_ttl_s = scope_ttl_s
+        self.max_scopes = max_scopes
+        self._boards = {}   # (scope, window) -> (period start, SortedBoard)
+        self._names = {}    # classroom -> {student: display name}
+        self._touched = {}  # classroom -> time of its last record
+        self._lock = threading.Lock()
+
+    def _prune(self, now: float):
+        expired = [scope for scope, touched in self._touched.items() if now - touched > self.scope_ttl_s]
+        if len(self._touched) - len(expired) >= self.max_scopes:
+            live = sorted((scope for scope in self._touched if scope not in expired), key=self._touched.get)
+            expired += live[:len(live) - self.max_scopes + 1]
+        for scope in expired:
+            del self._touched[scope]
+            self._names.pop(scope, None)
+            for window in WINDOWS:
+                self._boards.pop((scope, window), None)
+
+    def _board(self, scope: str, window: str, now: datetime, create: bool = False):
+        """The scope's current board for `window`; None on reads when it has no entries this period."""
+        start = window_start(window, now)
+        entry = self._boards.get((scope, window))
+        if entry is None or entry[0] != start:
+            if not create:
+                return None
+            entry = self._boards[(scope, window)] = (start, SortedBoard(self.max_players))
+        return entry[1]
+
+    def record(self, student: str, xp: int, classroom: str = None, name: str = None, now: datetime = None):
+        """Add a quiz's XP to the student's global boards and, if they have one, their classroom's.
+
+        `name` is only shown on the classroom's boards.
+        """
+        now = now or datetime.now()
+        with self._lock:
+            if classroom:
+                if classroom not in self._touched:
+                    self._prune(now.timestamp())
+                self._touched[classroom] = now.timestamp()
+                if name:
+                    self._names.setdefault(classroom, {})[student] = name
+            for scope in [GLOBAL_SCOPE] + ([classroom] if classroom else []):
+                for window in WINDOWS:
+                    self._board(scope, window, now, create=True).add(student, xp)
+            names = self._names.get(classroom)
+            if names and len(names) > 2 * self.max_players:
+                # Forget the names of students who have dropped off the class's all-time board
+                board = self._board(classroom, "all", now)
+                for gone in [s for s in names if board.xp(s) is None]:
+                    del names[gone]
+
+    def name(self, student: str, scope: str = GLOBAL_SCOPE) -> str:
+        """Display name: the typed name on a classroom board, else a stable pseudonym."""
+        return self._names.get(scope, {}).get(student) or f"Player {zlib.crc32(student.encode()) % 10000:04d}"
+
+    def top(self, scope: str = GLOBAL_SCOPE, window: str = "all", k: int = DEFAULT_TOP_K, now: datetime = None) -> list:
+        """[{'rank', 'student', 'name', 'xp'}] for the board's top k."""
+        with self._lock:
+            board = self._board(scope, window, now or datetime.now())
+            rows = board.top(k) if board is not None else []
+            return [{'rank': rank, 'student': student, 'name': self.name(student, scope), 'xp': xp}
+                    for rank, student, xp in rows]
+
+    def standing(self, student: str, scope: str = GLOBAL_SCOPE, window: str = "all", now: datetime = None) -> dict:
+        """{'rank', 'xp', 'players'} for one student (rank and xp None when they're not on the board)."""
+        with self._lock:
+            board = self._board(scope, window, now or datetime.now())
+            if board is None:
+                return {'rank': None, 'xp': None, 'players': 0}
+            return {'rank': board.rank(student), 'xp': board.xp(student), 'players': len(board)}
+
+
+LEADERBOARDS = Leaderboards()
@@ -0,0 +1,91 @@
+# ============================================================
+# Study Buddy Quest - Topic Mastery 📈
+# Tracks how well a student knows each canonical topic (and
+# each topic + difficulty) as an exponentially decayed
+# accuracy: every quiz counts, recent quizzes count the most,
+# and a topic stops being "weak" once the student improves.
+# Each submit is an O(1) update; the weakest few topics are
+# kept in a small bounded list for the adaptive prompt and the
+# "Areas to Level Up" panel.
+# ============================================================
+
+import heapq
+
+DECAY = 0.6  # weight kept by older quizzes each time the topic is quizzed again
+WEAK_THRESHOLD = 0.5  # decayed accuracy below this marks a topic as weak
+MIN_EVIDENCE = 3  # decayed question count needed before judging a topic
+TOP_K = 5
+
+
+class TopicStat:
+    """Decayed correct/total counts for one topic (or topic + difficulty)."""
+
+    __slots__ = ("correct", "total", "quizzes")
+
+    def __init__(self):
+        self.correct = 0.0
+        self.total = 0.0
+        self.quizzes = 0
+
+    def record(self, correct: int, total: int):
+        self.correct = self.correct * DECAY + correct
+        self.total = self.total * DECAY + total
+        self.quizzes += 1
+
+    @property
+    def accuracy(self) -> float:
+        return self.correct / self.total if self.total else 0.0
+
+
+class MasteryTracker:
+    """Per-session mastery by canonical topic key, with a bounded list of the weakest topics."""
+
+    def __init__(self, top_k: int = TOP_K):
+        self.top_k = top_k
+        self.topics = {}  # topic_key -> TopicStat
+        self.by_difficulty = {}  # (topic_key, difficulty) -> TopicStat
+        self.labels = {}  # topic_key -> topic as the student last typed it
+        self._weakest = []  # up to top_k (accuracy, topic_key), weakest first
+        self._weak_outside = 0  # weak topics that didn't fit in _weakest
+
+    def _is_weak(self, stat: TopicStat) -> bool:
+        return stat.total >= MIN_EVIDENCE and stat.accuracy < WEAK_THRESHOLD
+
+    def record(self, topic_key: str, label: str, difficulty: str, correct: int, total: int):
+        """Add one quiz result (O(1): two counter updates and a top_k-sized list edit)."""
+        if not topic_key or total <= 0:
+            return
+        was_weak = topic_key in self.topics and self._is_weak(self.topics[topic_key])
+        stat = self.topics.setdefault(topic_key, TopicStat())
+        stat.record(correct, total)
+        self.by_difficulty.setdefault((topic_key, difficulty), TopicStat()).record(correct, total)
+        self.labels[topic_key] = label
+
+        listed = any(key == topic_key for _, key in self._weakest)
+        if listed:
+            self._weakest = [entry for entry in self._weakest if entry[1] != topic_key]
+        elif was_weak:
+            self._weak_outside -= 1
+        if self._is_weak(stat):
+            self._weakest.append((stat.accuracy, topic_key))
+            self._weakest.sort()
+            if len(self._weakest) > self.top_k:
+                self._weakest.pop()
+                self._weak_outside += 1
+        elif listed and self._weak_outside:
+            # A listed topic recovered and others are waiting: refill (rare full scan)
+            self._rebuild()
+
+    def _rebuild(self):
+        weak = [(stat.accuracy, key) for key, stat in self.topics.items() if self._is_weak(stat)]
+        self._weakest = heapq.nsmallest(self.top_k, weak)
+        self._weak_outside = len(weak) - len(self._weakest)
+
+    def weakest(self) -> list:
+        """[(topic label, accuracy)] for up to top_k weak topics, weakest first."""
+        return [(self.labels[key], accuracy) for accuracy, key in self._weakest]
+
+    def accuracy(self, topic_key: str, difficulty: str = None):
+        """Decayed accuracy for a topic (optionally at one difficulty), or None if never quizzed."""
+        stat = self.topics.get(topic_key) if difficulty is None else self.by_difficulty.get((topic_key, difficulty))
+        return stat.accuracy if stat is not None and stat.total else None
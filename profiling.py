@@ -0,0 +1,208 @@
+# ============================================================
+# Study Buddy Quest - Rerun Profiler ⏱️
+# Lightweight timing spans for each script section and each
+# LLM / TTS / PIL call. One JSON line per rerun is appended to
+# STUDY_BUDDY_PROFILE_LOG (when set) so server time can be
+# aggregated under load:
+#
+#   python profiling.py logs/rerun_profile.jsonl
+# ============================================================
+
+import functools
+import inspect
+import json
+import os
+import sys
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime
+
+PROFILE_LOG_PATH = os.environ.get("STUDY_BUDDY_PROFILE_LOG")
+HISTORY_SIZE = 20
+
+_log_lock = threading.Lock()
+_local = threading.local()
+
+
+class RerunProfile:
+    """Timing spans collected during one run of the Streamlit script."""
+
+    def __init__(self, session_id: str = "", rerun_index: int = 0, history: deque = None):
+        self.session_id = session_id
+        self.rerun_index = rerun_index
+        self.history = history if history is not None else deque(maxlen=HISTORY_SIZE)
+        self.started_at = datetime.now().isoformat(timespec="milliseconds")
+        self.spans = []
+        self.finished = False
+        self._t0 = time.perf_counter()
+        self._last_mark = self._t0
+        self._section = None  # (name, start)
+
+    def _offset_ms(self, t: float) -> float:
+        return round((t - self._t0) * 1000, 3)
+
+    def _add_span(self, name: str, kind: str, start: float, end: float):
+        self.spans.append({
+            "name": name,
+            "kind": kind,
+            "start_ms": self._offset_ms(start),
+            "ms": round((end - start) * 1000, 3),
+        })
+        self._last_mark = end
+
+    def section(self, name: str):
+        """Close the running section (if any) and start timing a new one."""
+        now = time.perf_counter()
+        if self._section:
+            self._add_span(self._section[0], "section", self._section[1], now)
+        self._section = (name, now)
+        self._last_mark = now
+
+    @contextmanager
+    def span(self, name: str, kind: str = "call"):
+        """Time a block of work nested inside the current section."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._add_span(name, kind, start, time.perf_counter())
+
+    def finish(self, ended_by: str = "complete") -> dict:
+        """Close the profile, log it and add it to the session's history."""
+        if self.finished:
+            return None
+        # An interrupted rerun (st.rerun / st.stop) never reaches the end of the
+        # script, so the last recorded mark is the best estimate of its end.
+        end = time.perf_counter() if ended_by == "complete" else self._last_mark
+        if self._section:
+            self._add_span(self._section[0], "section", self._section[1], max(end, self._section[1]))
+            self._section = None
+        self.finished = True
+
+        record = {
+            "ts": self.started_at,
+            "session": self.session_id,
+            "rerun": self.rerun_index,
+            "ended_by": ended_by,
+            "total_ms": self._offset_ms(end),
+            "spans": self.spans,
+        }
+        self.history.append(record)
+        write_record(record)
+        return record
+
+
+def start_rerun(previous: RerunProfile = None, session_id: str = "") -> RerunProfile:
+    """Start profiling a rerun; finishes the previous profile if it was cut short by st.rerun()."""
+    history = None
+    rerun_index = 0
+    if previous is not None:
+        previous.finish(ended_by="rerun")
+        history = previous.history
+        rerun_index = previous.rerun_index + 1
+        session_id = session_id or previous.session_id
+    profile = RerunProfile(session_id, rerun_index, history)
+    _local.profile = profile
+    return profile
+
+
+def current() -> RerunProfile:
+    """Get the profile for the rerun running on this thread, if any."""
+    return getattr(_local, "profile", None)
+
+
+def section(name: str):
+    """Mark the start of a script section on the current rerun."""
+    profile = current()
+    if profile is not None:
+        profile.section(name)
+
+
+@contextmanager
+def span(name: str, kind: str = "call"):
+    """Time a block on the current rerun (no-op outside a profiled rerun)."""
+    profile = current()
+    if profile is None or profile.finished:
+        yield
+        return
+    with profile.span(name, kind):
+        yield
+
+
+def profiled(kind: str):
+    """Decorator that wraps every call of a function in a span of the given kind.
+
+    For generator functions the span lasts until the generator is exhausted.
+    """
+    def decorator(func):
+        if inspect.isgeneratorfunction(func):
+            @functools.wraps(func)
+            def stream_wrapper(*args, **kwargs):
+                with span(func.__name__, kind):
+                    yield from func(*args, **kwargs)
+            return stream_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(func.__name__, kind):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def write_record(record: dict):
+    """Append one rerun record to the JSON-lines log, if logging is enabled."""
+    if not PROFILE_LOG_PATH:
+        return
+    line = json.dumps(record, ensure_ascii=False)
+    with _log_lock:
+        directory = os.path.dirname(PROFILE_LOG_PATH)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(PROFILE_LOG_PATH, "a", encoding="utf-8") as f:
+            f.write(line + "\n")
+
+
+def summarize(path: str) -> dict:
+    """Aggregate a JSON-lines profile log into per-span totals and percentiles."""
+    per_span = {}
+    reruns = 0
+    total_ms = 0.0
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            reruns += 1
+            total_ms += record.get("total_ms", 0.0)
+            for s in record.get("spans", []):
+                per_span.setdefault((s["kind"], s["name"]), []).append(s["ms"])
+
+    rows = []
+    for (kind, name), values in per_span.items():
+        values.sort()
+        rows.append({
+            "kind": kind,
+            "name": name,
+            "count": len(values),
+            "total_ms": round(sum(values), 1),
+            "share": round(sum(values) / total_ms, 4) if total_ms else 0.0,
+            "p50_ms": values[len(values) // 2],
+            "p95_ms": values[min(len(values) - 1, int(len(values) * 0.95))],
+        })
+    rows.sort(key=lambda r: r["total_ms"], reverse=True)
+    return {"reruns": reruns, "total_ms": round(total_ms, 1), "spans": rows}
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 2:
+        print("Usage: python profiling.py <rerun_profile.jsonl>")
+        sys.exit(2)
+    summary = summarize(sys.argv[1])
+    print(f"{summary['reruns']} reruns, {summary['total_ms']} ms total server time\n")
+    print(f"{'kind':<8} {'name':<32} {'count':>6} {'total ms':>10} {'share':>7} {'p50':>9} {'p95':>9}")
+    for row in summary["spans"]:
+        print(f"{row['kind']:<8} {row['name']:<32} {row['count']:>6} {row['total_ms']:>10} "
+              f"{row['share']:>7.1%} {row['p50_ms']:>9} {row['p95_ms']:>9}")
@@ -0,0 +1,134 @@
+# ============================================================
+# Study Buddy Quest - Progress Chart Data 📈
+# Turns xp_history and quiz_score_history into the small,
+# fixed-size series the Learning Journey charts draw: scores
+# per quiz (or daily averages), XP per quiz (or per day or
+# week), and LTTB downsampling (Largest-Triangle-Three-
+# Buckets) so a year of quizzes still sends at most
+# POINT_BUDGET points per chart.
+# Frames are built once per submit and reused on other reruns.
+# ============================================================
+
+from datetime import datetime, timedelta
+
+POINT_BUDGET = 60
+
+
+def parse_timestamp(value):
+    """datetime from an ISO timestamp string (None if missing or malformed)."""
+    if isinstance(value, datetime):
+        return value
+    try:
+        return datetime.fromisoformat(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def series(history: list, field: str) -> list:
+    """[(datetime, value)] from history entries, oldest first, skipping bad rows."""
+    points = []
+    for entry in history:
+        when = parse_timestamp(entry.get('timestamp'))
+        value = entry.get(field)
+        if when is not None and isinstance(value, (int, float)):
+            points.append((when, float(value)))
+    points.sort(key=lambda point: point[0])
+    return points
+
+
+def bucket_start(when: datetime, period: str) -> datetime:
+    """Midnight at the start of the day (or Monday of the week) containing `when`."""
+    day = datetime(when.year, when.month, when.day)
+    if period == "week":
+        return day - timedelta(days=day.weekday())
+    return day
+
+
+def rollup(points: list, period: str = "day", how: str = "mean") -> list:
+    """[(bucket start, mean or sum of values)] per day or week, for time-sorted points."""
+    buckets = []
+    for when, value in points:
+        start = bucket_start(when, period)
+        if buckets and buckets[-1][0] == start:
+            buckets[-1][1].append(value)
+        else:
+            buckets.append((start, [value]))
+    combine = sum if how == "sum" else (lambda values: sum(values) / len(values))
+    return [(start, combine(values)) for start, values in buckets]
+
+
+def lttb(points: list, threshold: int) -> list:
+    """Largest-Triangle-Three-Buckets: keep `threshold` of the time-sorted points.
+
+    Keeps the first and last points, and from each bucket in between the one
+    making the biggest triangle with the point kept before it and the average
+    of the next bucket, so peaks and dips survive the downsampling.
+    """
+    if threshold >= len(points) or threshold < 3:
+        return list(points)
+    xs = [when.timestamp() for when, _ in points]
+    ys = [value for _, value in points]
+    every = (len(points) - 2) / (threshold - 2)
+    kept = [points[0]]
+    a = 0
+    for i in range(threshold - 2):
+        start = int(i * every) + 1
+        end = int((i + 1) * every) + 1
+        next_end = min(int((i + 2) * every) + 1, len(points))
+        next_x = xs[end:next_end] or [xs[-1]]
+        next_y = ys[end:next_end] or [ys[-1]]
+        avg_x = sum(next_x) / len(next_x)
+        avg_y = sum(next_y) / len(next_y)
+        best, best_area = start, -1.0
+        for j in range(start, end):
+            area = abs((xs[a] - avg_x) * (ys[j] - ys[a]) - (xs[a] - xs[j]) * (avg_y - ys[a]))
+            if area > best_area:
+                best, best_area = j, area
+        kept.append(points[best])
+        a = best
+    kept.append(points[-1])
+    return kept
+
+
+def score_frame(quiz_score_history: list, budget: int = POINT_BUDGET) -> dict:
+    """Score trend: every quiz while they fit, else daily averages, downsampled to `budget`."""
+    points = series(quiz_score_history, 'percentage')
+    resolution = "quiz"
+    if len(points) > budget:
+        points = rollup(points, "day", "mean")
+        resolution = "day"
+    shown = lttb(points, budget)
+    return {
+        "data": {"When": [when for when, _ in shown], "Score %": [round(value, 1) for _, value in shown]},
+        "resolution": resolution,
+        "points": len(shown),
+        "sampled": len(shown) < len(points),
+    }
+
+
+def xp_frame(xp_history: list, budget: int = POINT_BUDGET) -> dict:
+    """XP per quiz while they fit, else per day (or per week once the days don't fit), downsampled to `budget`."""
+    points = series(xp_history, 'xp')
+    period = "quiz"
+    buckets = points
+    if len(buckets) > budget:
+        period = "day"
+        buckets = rollup(points, period, "sum")
+    if len(buckets) > budget:
+        period = "week"
+        buckets = rollup(points, period, "sum")
+    shown = lttb(buckets, budget)
+    return {
+        "data": {"When": [when for when, _ in shown], "XP": [int(value) for _, value in shown]},
+        "resolution": period,
+        "points": len(shown),
+        "sampled": len(shown) < len(buckets),
+    }
+
+
+def chart_frames(xp_history: list, quiz_score_history: list, budget: int = POINT_BUDGET) -> dict:
+    """Both Learning Journey charts, ready for st.line_chart / st.bar_chart."""
+    return {
+        "scores": score_frame(quiz_score_history, budget),
+        "xp": xp_frame(xp_history, budget),
+    }
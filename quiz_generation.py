@@ -0,0 +1,382 @@
+# ============================================================
+# Study Buddy Quest - Quiz Generation 🤖
+# The Gemini quiz generators (topic and image), the parse and
+# validate pipeline every generated quiz goes through, and the
+# error categories shown to students. No Streamlit imports, so
+# the app and the JSON API (api.py) share one Gemini client,
+# the gateway's response cache and the rate limiter.
+# ============================================================
+
+import os
+import re
+from functools import lru_cache
+
+import gemini_gateway
+import profiling
+import telemetry
+from quiz_logic import (
+    QUESTION_EMOJIS,
+    parse_individual_questions,
+    parse_quiz_answers,
+    quiz_validation_outcome,
+    strip_answers_from_quiz,
+    validate_quiz_data,
+)
+from job_queue import QueueFullError
+from rate_limit import RateLimitedError, Requester
+from topic_index import canonical_topic_key
+
+QUIZ_TOKENS_PER_QUESTION = 150
+# Rough prompt size of a topic quiz, for budgeting a call before its prompt is built
+QUIZ_PROMPT_TOKENS = 450
+QUIZ_PROMPT_TOKENS_PER_QUESTION = 60
+
+# Budget identity for callers outside a student session (scripts, tools)
+DEFAULT_REQUESTER = Requester(session="offline", student="offline", classroom="offline")
+
+NETWORK_ERROR_TERMS = ['connection', 'network', 'unreachable', 'refused', 'reset', 'socket', 'dns', 'resolve', 'offline', 'errno', 'urlopen']
+
+
+def gemini_configured() -> bool:
+    """Whether the Replit AI Integrations settings for Gemini are present."""
+    return bool(os.environ.get("AI_INTEGRATIONS_GEMINI_API_KEY") and os.environ.get("AI_INTEGRATIONS_GEMINI_BASE_URL"))
+
+
+def quiz_token_estimate(num_questions: int) -> int:
+    """Approximate rate-limit charge of one topic quiz (prompt plus reply)."""
+    return QUIZ_PROMPT_TOKENS + (QUIZ_PROMPT_TOKENS_PER_QUESTION + QUIZ_TOKENS_PER_QUESTION) * num_questions
+
+
+def quiz_cache_key(topic: str, difficulty: str, grade_level: str, num_questions: int) -> tuple:
+    """Response cache key of a topic quiz; quiz packs seed the cache under the same key."""
+    return ("quiz", canonical_topic_key(topic), difficulty.split()[0], grade_level, num_questions)
+
+
+@lru_cache(maxsize=1)
+def get_client():
+    """The process-wide Gemini client (one connection pool for the app and the API)."""
+    from google import genai
+
+    return genai.Client(
+        api_key=os.environ.get("AI_INTEGRATIONS_GEMINI_API_KEY"),
+        http_options={
+            'api_version': '',
+            'base_url': os.environ.get("AI_INTEGRATIONS_GEMINI_BASE_URL")
+        }
+    )
+
+
+@profiling.profiled("llm")
+@telemetry.traced_generator
+def generate_quiz_with_gemini(topic: str, difficulty: str, weak_topics: list = None, grade_level: str = None, num_questions: int = 5,
+                              topic_accuracy: float = None, requester: Requester = None) -> str:
+    """Generate a quiz using Gemini AI. `topic_accuracy` is the student's recent accuracy on this topic and difficulty."""
+    clean_difficulty = difficulty.split()[0]
+    
+    adaptive_section = ""
+    if weak_topics and len(weak_topics) > 0:
+        weak_topics_str = ", ".join(weak_topics[:5])
+        adaptive_section = f"""
+ADAPTIVE LEARNING NOTE:
+The student has struggled with these topics recently: {weak_topics_str}
+If any of these topics relate to {topic}, please include 1-2 gentle review questions to help reinforce their understanding. Make these questions encouraging and supportive!
+"""
+    if topic_accuracy is not None:
+        if topic_accuracy < 0.5:
+            pacing = "Start with a couple of confidence-building questions before the harder ones."
+        elif topic_accuracy >= 0.85:
+            pacing = "They know this well, so lean toward the challenging end of this difficulty."
+        else:
+            pacing = "Keep a balanced mix of questions."
+        if not adaptive_section:
+            adaptive_section = "\nADAPTIVE LEARNING NOTE:"
+        adaptive_section += f"""
+The student's recent accuracy on {topic} at {clean_difficulty} difficulty is about {topic_accuracy:.0%}. {pacing}
+"""
+    
+    grade_section = ""
+    age_description = "a 14-year-old student"
+    if grade_level and grade_level != "None (Skip)":
+        grade_section = f"\nGrade Level: {grade_level}"
+        if grade_level == "Pre-K":
+            age_description = "a Pre-K student (ages 3-5)"
+        elif grade_level == "Kindergarten":
+            age_description = "a Kindergarten student (ages 5-6)"
+        elif "1st" in grade_level:
+            age_description = "a 1st grade student (ages 6-7)"
+        elif "2nd" in grade_level:
+            age_description = "a 2nd grade student (ages 7-8)"
+        elif "3rd" in grade_level:
+            age_description = "a 3rd grade student (ages 8-9)"
+        elif "4th" in grade_level:
+            age_description = "a 4th grade student (ages 9-10)"
+        elif "5th" in grade_level:
+            age_description = "a 5th grade student (ages 10-11)"
+        elif "6th" in grade_level:
+            age_description = "a 6th grade student (ages 11-12)"
+        elif "7th" in grade_level:
+            age_description = "a 7th grade student (ages 12-13)"
+        elif "8th" in grade_level:
+            age_description = "an 8th grade student (ages 13-14)"
+        elif "9th" in grade_level:
+            age_description = "a 9th grade student (ages 14-15)"
+        elif "10th" in grade_level:
+            age_description = "a 10th grade student (ages 15-16)"
+        elif "11th" in grade_level:
+            age_description = "an 11th grade student (ages 16-17)"
+        elif "12th" in grade_level:
+            age_description = "a 12th grade student (ages 17-18)"
+    
+    questions_template = ""
+    for i in range(1, num_questions + 1):
+        emoji = QUESTION_EMOJIS[(i - 1) % len(QUESTION_EMOJIS)]
+        questions_template += f"""
+### Question {i} {emoji}
+**[Question text here]**
+
+- A) [Option A]
+- B) [Option B]
+- C) [Option C]
+- D) [Option D]
+
+✅ **Correct Answer: [Single Letter A, B, C, or D]**
+
+> 💡 **Explanation:** [Short, friendly explanation]
+
+---
+"""
+    
+    prompt = f"""You are a fun and encouraging teacher creating a quiz for {age_description}.
+
+Create a {num_questions}-question multiple-choice quiz about: {topic}
+Difficulty level: {clean_difficulty}{grade_section}
+{adaptive_section}
+Guidelines:
+- Make questions appropriate for {age_description}
+- For Easy: Basic concepts, straightforward questions
+- For Medium: Requires some thinking, applies concepts
+- For Hard: Challenging questions that require deeper understanding
+- Use friendly, encouraging language with emojis
+- Make it fun and engaging!
+
+CRITICAL QUESTION FORMAT RULES:
+- Each question MUST be a real question that ends with a question mark (?)
+- Questions should start with words like: What, Which, Who, When, Where, Why, How, Is, Are, Do, Does, Can, etc.
+- DO NOT write definitions, statements, or descriptions as questions
+- BAD example: "The Libertarian Party believes in limited government" (this is a statement, NOT a question)
+- GOOD example: "What is a core belief of the Libertarian Party?" (this IS a proper question)
+
+IMPORTANT: You MUST follow this EXACT format for each question. Do not deviate!
+
+## 📝 Your {clean_difficulty} Quiz on {topic}!
+{questions_template}
+## 🎊 Quiz Complete!
+
+**Great job working through this quiz!** Keep learning and growing! 🌟
+"""
+    
+    response = gemini_gateway.generate_content(
+        get_client(),
+        model="gemini-2.5-flash",
+        contents=prompt,
+        function="generate_quiz_with_gemini",
+        requester=requester or DEFAULT_REQUESTER,
+        max_output_tokens=QUIZ_TOKENS_PER_QUESTION * num_questions,
+        # "WW2" and "World War II" share a cache entry (served when rate limited)
+        cache_key=quiz_cache_key(topic, difficulty, grade_level, num_questions),
+    )
+    
+    if not response.text:
+        raise ValueError("No response received from AI. Please try again!")
+    
+    return response.text
+
+
+@profiling.profiled("llm")
+@telemetry.traced_generator
+def generate_quiz_from_image(image_bytes: bytes, difficulty: str, grade_level: str = None, num_questions: int = 5, mime_type: str = "image/jpeg",
+                             requester: Requester = None) -> tuple:
+    """Generate a quiz from an uploaded image using Gemini vision."""
+    from io import BytesIO
+    from PIL import Image
+    
+    # Preprocess image: convert to RGB with white background for transparent areas
+    with profiling.span("image_preprocess", "pil"):
+        try:
+            img = Image.open(BytesIO(image_bytes))
+        
+            # If image has alpha channel (transparency), composite onto white background
+            if img.mode in ('RGBA', 'LA', 'P'):
+                # Create a white background
+                background = Image.new('RGB', img.size, (255, 255, 255))
+                # Convert to RGBA if needed
+                if img.mode == 'P':
+                    img = img.convert('RGBA')
+                elif img.mode == 'LA':
+                    img = img.convert('RGBA')
+                # Paste the image onto white background using alpha as mask
+                if img.mode == 'RGBA':
+                    background.paste(img, mask=img.split()[3])  # Use alpha channel as mask
+                else:
+                    background.paste(img)
+                img = background
+            elif img.mode != 'RGB':
+                img = img.convert('RGB')
+        
+            # Save as JPEG for consistent results
+            output_buffer = BytesIO()
+            img.save(output_buffer, format='JPEG', quality=95)
+            image_bytes = output_buffer.getvalue()
+            mime_type = "image/jpeg"
+        except Exception as e:
+            print(f"Image preprocessing warning: {e}")
+            # If preprocessing fails, continue with original bytes
+    
+    clean_difficulty = difficulty.split()[0]
+    
+    grade_section = ""
+    age_description = "a 14-year-old student"
+    if grade_level and grade_level != "None (Skip)":
+        grade_section = f"\nGrade Level: {grade_level}"
+        grade_ages = {
+            "Pre-K": "a 4-year-old", "Kindergarten": "a 5-year-old",
+            "1st Grade": "a 6-year-old", "2nd Grade": "a 7-year-old",
+            "3rd Grade": "an 8-year-old", "4th Grade": "a 9-year-old",
+            "5th Grade": "a 10-year-old", "6th Grade": "an 11-year-old",
+            "7th Grade": "a 12-year-old", "8th Grade": "a 13-year-old",
+            "9th Grade": "a 14-year-old", "10th Grade": "a 15-year-old",
+            "11th Grade": "a 16-year-old", "12th Grade": "a 17-year-old"
+        }
+        age_description = grade_ages.get(grade_level, "a 14-year-old student")
+    
+    questions_template = ""
+    for i in range(1, num_questions + 1):
+        questions_template += f"""
+### Question {i} 🔢
+
+[Question based on the image]?
+
+- A) [Option A]
+- B) [Option B]
+- C) [Option C]
+- D) [Option D]
+
+✅ **Correct Answer: [Single Letter A, B, C, or D]**
+
+> 💡 **Explanation:** [Short, friendly explanation]
+
+---
+"""
+    
+    prompt = f"""You are analyzing an educational image to create a quiz for {age_description}.
+
+First, describe what you see in this image briefly (1-2 sentences).
+Then create a {num_questions}-question multiple-choice quiz based on what's shown in the image.
+Difficulty level: {clean_difficulty}{grade_section}
+
+Guidelines:
+- Make questions directly related to what's visible in the image
+- Questions should test understanding of the image content
+- Make questions appropriate for {age_description}
+- Use friendly, encouraging language with emojis
+- Make it fun and engaging!
+
+CRITICAL: Each question MUST end with a question mark (?) and be a real question.
+
+Start your response with:
+**📸 Image Topic: [Brief description of what the image shows]**
+
+Then format the quiz EXACTLY like this:
+
+## 📝 Your {clean_difficulty} Quiz!
+{questions_template}
+## 🎊 Quiz Complete!
+
+**Great job working through this quiz!** Keep learning and growing! 🌟
+"""
+    
+    from google.genai import types
+    
+    response = gemini_gateway.generate_content(
+        get_client(),
+        model="gemini-2.5-flash",
+        contents=[
+            prompt,
+            types.Part(
+                inline_data=types.Blob(
+                    mime_type=mime_type,
+                    data=image_bytes
+                )
+            )
+        ],
+        function="generate_quiz_from_image",
+        requester=requester or DEFAULT_REQUESTER,
+        max_output_tokens=QUIZ_TOKENS_PER_QUESTION * num_questions,
+    )
+    
+    if not response.text:
+        raise ValueError("No response received from AI. Please try again!")
+    
+    text = response.text
+    topic_match = re.search(r'\*\*📸 Image Topic:\s*(.+?)\*\*', text)
+    detected_topic = topic_match.group(1).strip() if topic_match else "Image Analysis"
+    
+    return text, detected_topic
+
+
+def parse_generated_quiz(quiz_content: str, quiz_length: int) -> dict:
+    """Parse and validate a generated quiz; raises ValueError when it is incomplete.
+
+    Returns {'correct_answers', 'explanations', 'questions_only', 'parsed_questions'}.
+    """
+    with telemetry.trace_span("parse_quiz_answers"):
+        correct_answers, explanations = parse_quiz_answers(quiz_content)
+    
+    with telemetry.trace_span("validate_quiz_data") as span:
+        outcome = quiz_validation_outcome(correct_answers, explanations, quiz_length)
+        span.set_attribute("validation.outcome", outcome)
+        telemetry.QUIZ_VALIDATIONS.inc(outcome=outcome)
+        if not validate_quiz_data(correct_answers, explanations, quiz_length):
+            raise ValueError("Quiz generation incomplete. Please try again!")
+    
+    questions_only = strip_answers_from_quiz(quiz_content)
+    with telemetry.trace_span("parse_individual_questions") as span:
+        parsed_questions = parse_individual_questions(quiz_content)
+        span.set_attribute("parser.questions", len(parsed_questions))
+        for q in parsed_questions:
+            telemetry.PARSER_OPTION_PATTERNS.inc(pattern=q['option_format'])
+        if len(parsed_questions) < quiz_length:
+            telemetry.PARSE_FAILURES.inc(stage="questions")
+    
+    return {
+        'correct_answers': correct_answers,
+        'explanations': explanations,
+        'questions_only': questions_only,
+        'parsed_questions': parsed_questions,
+    }
+
+
+def classify_generation_error(e: Exception) -> str:
+    """Category of a failed generation, counted in telemetry and shown to the student."""
+    error_msg = str(e).lower()
+    error_type = type(e).__name__
+    
+    # Check for network/connection errors
+    is_network_error = any(term in error_msg for term in NETWORK_ERROR_TERMS) or error_type in ['ConnectionError', 'OSError', 'TimeoutError', 'URLError', 'socket.error']
+    
+    if isinstance(e, RateLimitedError):
+        error_category = "rate_limited"
+    elif isinstance(e, QueueFullError):
+        error_category = "queue_full"
+    elif is_network_error:
+        error_category = "network"
+    elif "api_key" in error_msg or "api key" in error_msg or "invalid" in error_msg:
+        error_category = "api_key"
+    elif "timeout" in error_msg:
+        error_category = "timeout"
+    elif "quota" in error_msg or "limit" in error_msg:
+        error_category = "quota"
+    else:
+        error_category = "other"
+    telemetry.GENERATION_ERRORS.inc(error_type=error_type, category=error_category)
+    return error_category
@@ -0,0 +1,433 @@
+# ============================================================
+# Study Buddy Quest - Quiz Logic 🧩
+# Pure helpers shared by the app, benchmarks and tools:
+# parsing Gemini quiz text, levels/XP and badge rules.
+# No Streamlit imports here so everything can run headless.
+# ============================================================
+
+import json
+import re
+
+# ============================================================
+# BADGES, QUIZ OPTIONS & QUESTION EMOJIS
+# ============================================================
+BADGES = {
+    "first_quiz": {"emoji": "🎯", "name": "First Quiz!", "desc": "Complete your first quiz"},
+    "five_quizzes": {"emoji": "📚", "name": "Quiz Explorer", "desc": "Complete 5 quizzes"},
+    "ten_quizzes": {"emoji": "🏅", "name": "Quiz Master", "desc": "Complete 10 quizzes"},
+    "points_50": {"emoji": "⭐", "name": "50 Points!", "desc": "Earn 50 total points"},
+    "points_100": {"emoji": "🌟", "name": "100 Points!", "desc": "Earn 100 total points"},
+    "points_200": {"emoji": "💫", "name": "200 Points!", "desc": "Earn 200 total points"},
+    "points_500": {"emoji": "🔥", "name": "500 Points!", "desc": "Earn 500 total points"},
+    "perfect_score": {"emoji": "💯", "name": "Perfect Score!", "desc": "Get 5/5 on a quiz"},
+    "three_perfects": {"emoji": "🏆", "name": "Perfectionist", "desc": "Get 3 perfect scores"},
+    "level_5": {"emoji": "👑", "name": "Level 5 Hero", "desc": "Reach Level 5"},
+}
+
+GRADE_LEVELS = ["None (Skip)", "Pre-K", "Kindergarten", "1st Grade", "2nd Grade", "3rd Grade",
+                "4th Grade", "5th Grade", "6th Grade", "7th Grade", "8th Grade",
+                "9th Grade", "10th Grade", "11th Grade", "12th Grade"]
+QUIZ_LENGTHS = [5, 10, 15]
+
+QUESTION_EMOJIS = ["🔢", "🧮", "🎯", "🌟", "🏆", "📚", "💡", "🔬", "🌍", "🎨", "🚀", "⭐", "🎓", "🧠", "✨"]
+
+
+def find_new_badges(quizzes_completed: int, total_score: int, perfect_scores: int, owned_badges: list) -> list:
+    """Get badge ids whose conditions are met but haven't been awarded yet."""
+    badge_conditions = [
+        ("first_quiz", quizzes_completed >= 1),
+        ("five_quizzes", quizzes_completed >= 5),
+        ("ten_quizzes", quizzes_completed >= 10),
+        ("points_50", total_score >= 50),
+        ("points_100", total_score >= 100),
+        ("points_200", total_score >= 200),
+        ("points_500", total_score >= 500),
+        ("perfect_score", perfect_scores >= 1),
+        ("three_perfects", perfect_scores >= 3),
+        ("level_5", calculate_level(total_score) >= 5),
+    ]
+    return [badge_id for badge_id, condition in badge_conditions if condition and badge_id not in owned_badges]
+
+
+# ============================================================
+# LEVELS & EXPERIENCE POINTS
+# ============================================================
+def xp_required_for_level(level: int) -> int:
+    """Get total XP required to reach a specific level.
+    Level 1: 0 XP, Level 2: 50 XP, Level 3: 125 XP (50+75), Level 4: 225 XP (50+75+100), etc.
+    Each level requires 25 more XP than the previous."""
+    if level <= 1:
+        return 0
+    total = 0
+    for lvl in range(2, level + 1):
+        total += 50 + (lvl - 2) * 25  # Level 2 needs 50, Level 3 needs 75, etc.
+    return total
+
+
+def calculate_level(total_points: int) -> int:
+    """Calculate player level based on total points (progressive XP requirements)."""
+    level = 1
+    while xp_required_for_level(level + 1) <= total_points:
+        level += 1
+    return level
+
+
+def get_points_for_next_level(total_points: int) -> tuple:
+    """Get progress toward next level."""
+    current_level = calculate_level(total_points)
+    xp_at_current_level = xp_required_for_level(current_level)
+    xp_for_next_level = xp_required_for_level(current_level + 1)
+    points_into_level = total_points - xp_at_current_level
+    xp_needed = xp_for_next_level - xp_at_current_level
+    return points_into_level, xp_needed
+
+
+def get_level_title(level: int) -> str:
+    """Get fun title based on level."""
+    titles = {
+        1: "Curious Beginner 🌱",
+        2: "Knowledge Seeker 📖",
+        3: "Quiz Explorer 🗺️",
+        4: "Brain Builder 🧱",
+        5: "Study Champion 🏅",
+        6: "Wisdom Warrior ⚔️",
+        7: "Master Learner 🎓",
+        8: "Knowledge Knight 🛡️",
+        9: "Quiz Legend 🌟",
+        10: "Ultimate Genius 👑"
+    }
+    if level >= 10:
+        return titles[10]
+    return titles.get(level, f"Level {level} Hero 🦸")
+
+# Level perks - what each level unlocks
+LEVEL_PERKS = {
+    1: "Start your learning journey!",
+    2: "Unlock Quiz History tracking",
+    3: "Unlock Timed Challenge Mode",
+    4: "Unlock AI Study Notes",
+    5: "Earn the Study Champion badge!",
+    6: "Get +5% bonus Experience Points on all quizzes",
+    7: "Get +10% bonus Experience Points on all quizzes",
+    8: "Get +15% bonus Experience Points on all quizzes",
+    9: "Get +20% bonus Experience Points on all quizzes",
+    10: "Maximum +25% bonus Experience Points + all features unlocked!"
+}
+
+def get_level_perk(level: int) -> str:
+    """Get the perk for a specific level."""
+    if level >= 10:
+        return LEVEL_PERKS[10]
+    return LEVEL_PERKS.get(level, "Keep learning!")
+
+
+# ============================================================
+# GRADING & QUIZ EXPERIENCE POINTS
+# ============================================================
+POINTS_PER_CORRECT = 10
+
+
+def grade_answers(user_answers: list, correct_answers: list) -> tuple:
+    """Grade a submitted quiz: (correct count, 1-based numbers of the missed questions)."""
+    correct_count = 0
+    wrong_questions = []
+    for i in range(min(len(user_answers), len(correct_answers))):
+        user_ans = user_answers[i] if user_answers[i] else ""
+        correct_ans = correct_answers[i] if correct_answers[i] else ""
+        if user_ans.upper() == correct_ans.upper():
+            correct_count += 1
+        else:
+            wrong_questions.append(i + 1)
+    return correct_count, wrong_questions
+
+
+def score_quiz(correct_count: int, pre_quiz_level: int, elapsed: float = None, total_time: float = None) -> dict:
+    """Experience Points for a graded quiz: {'base', 'time_bonus', 'level_bonus', 'total'}.
+
+    Timed quizzes (elapsed and total_time given) earn up to 50% extra for time left;
+    levels 6+ earn 5% more per level, capped at 25%, using the level before this quiz.
+    """
+    base = correct_count * POINTS_PER_CORRECT
+    time_bonus = 0
+    if elapsed is not None and total_time:
+        remaining = max(0, total_time - elapsed)
+        time_bonus = int((remaining / total_time) * base * 0.5)
+    level_bonus_percent = min(max(0, (pre_quiz_level - 5) * 5), 25)
+    level_bonus = int(base * level_bonus_percent / 100)
+    return {'base': base, 'time_bonus': time_bonus, 'level_bonus': level_bonus,
+            'total': base + time_bonus + level_bonus}
+
+
+# ============================================================
+# QUIZ TEXT PARSING
+# ============================================================
+def strip_answers_from_quiz(quiz_text: str) -> str:
+    """Remove answers and explanations from quiz text."""
+    quiz_text = re.sub(r'✅\s*\*\*Correct Answer:.*?\*\*\s*\n?', '', quiz_text)
+    quiz_text = re.sub(r'>\s*💡\s*\*\*Explanation:\*\*.*?(?=\n\n|---|\n###|$)', '', quiz_text, flags=re.DOTALL)
+    quiz_text = re.sub(r'##\s*🎊\s*Quiz Complete!.*$', '', quiz_text, flags=re.DOTALL)
+    quiz_text = re.sub(r'\n{3,}', '\n\n', quiz_text)
+    return quiz_text.strip()
+
+
+def get_emoji_for_answer(answer_text: str) -> str:
+    """Get a descriptive emoji based on answer content."""
+    text = answer_text.lower()
+    
+    emoji_keywords = {
+        "🏛️": ["roman", "rome", "empire", "ancient", "greek", "greece", "egypt", "pyramid", "pharaoh", "temple", "civilization"],
+        "🌍": ["earth", "world", "globe", "planet", "continent", "geography", "country", "nation"],
+        "🌊": ["ocean", "sea", "water", "wave", "marine", "fish", "whale", "dolphin", "beach", "river", "lake"],
+        "🌋": ["volcano", "lava", "eruption", "magma", "tectonic"],
+        "🔬": ["science", "experiment", "laboratory", "research", "scientist", "microscope", "cell", "bacteria"],
+        "⚗️": ["chemistry", "chemical", "element", "atom", "molecule", "compound", "reaction"],
+        "🧬": ["dna", "gene", "genetic", "biology", "evolution", "species"],
+        "🔭": ["space", "star", "planet", "galaxy", "universe", "astronaut", "nasa", "telescope", "moon", "sun", "solar", "astronomy"],
+        "🚀": ["rocket", "spacecraft", "launch", "mission", "orbit"],
+        "🧮": ["math", "number", "calculate", "equation", "formula", "algebra", "geometry", "fraction", "decimal", "percent"],
+        "📐": ["angle", "triangle", "square", "rectangle", "circle", "shape", "polygon"],
+        "💻": ["computer", "technology", "digital", "software", "internet", "code", "programming", "algorithm"],
+        "📱": ["phone", "mobile", "app", "device", "smart"],
+        "🎨": ["art", "paint", "draw", "color", "artist", "museum", "sculpture", "creative"],
+        "🎵": ["music", "song", "melody", "instrument", "orchestra", "band", "rhythm", "note"],
+        "📚": ["book", "read", "library", "literature", "author", "novel", "story", "write"],
+        "🏰": ["castle", "medieval", "knight", "king", "queen", "royal", "kingdom", "palace"],
+        "⚔️": ["war", "battle", "fight", "army", "soldier", "military", "weapon"],
+        "🦖": ["dinosaur", "fossil", "prehistoric", "extinct", "jurassic"],
+        "🐾": ["animal", "mammal", "wildlife", "zoo", "pet", "dog", "cat", "bird"],
+        "🌱": ["plant", "tree", "forest", "flower", "garden", "grow", "seed", "leaf", "nature"],
+        "☀️": ["sun", "sunny", "solar", "light", "bright", "heat", "warm", "summer"],
+        "❄️": ["ice", "snow", "cold", "winter", "freeze", "arctic", "polar", "glacier"],
+        "⚡": ["electric", "energy", "power", "lightning", "current", "voltage", "battery"],
+        "🧲": ["magnet", "magnetic", "force", "field", "attract"],
+        "🎭": ["theater", "drama", "play", "actor", "performance", "stage"],
+        "🏆": ["win", "champion", "victory", "first", "best", "gold", "trophy"],
+        "🎮": ["game", "video", "play", "player", "gaming"],
+        "⚽": ["soccer", "football", "sport", "ball", "goal", "team"],
+        "🏀": ["basketball", "nba", "court", "dunk"],
+        "🍎": ["food", "fruit", "apple", "eat", "nutrition", "healthy", "diet"],
+        "🧠": ["brain", "think", "mind", "memory", "intelligence", "smart", "learn"],
+        "❤️": ["heart", "love", "blood", "pump", "cardiovascular"],
+        "🦴": ["bone", "skeleton", "body", "muscle", "organ"],
+        "💰": ["money", "economy", "bank", "finance", "dollar", "currency", "trade", "business"],
+        "🗳️": ["vote", "election", "government", "president", "congress", "democracy", "political"],
+        "📜": ["constitution", "law", "document", "declaration", "rights", "amendment"],
+        "🗽": ["america", "american", "usa", "united states", "liberty", "freedom"],
+        "🎪": ["circus", "carnival", "fun", "entertainment"],
+        "🌈": ["rainbow", "color", "spectrum", "light", "prism"],
+    }
+    
+    for emoji, keywords in emoji_keywords.items():
+        for keyword in keywords:
+            if keyword in text:
+                return emoji
+    
+    # Use deterministic selection based on text hash to prevent emojis changing on rerun
+    fun_defaults = ["✨", "🎯", "💫", "🌟", "🔮", "💎", "🎲", "🧩"]
+    text_hash = sum(ord(c) for c in text)
+    return fun_defaults[text_hash % len(fun_defaults)]
+
+
+def sanitize_topic(topic: str) -> str:
+    """Clean and validate topic input."""
+    topic = topic.strip()
+    topic = re.sub(r'[<>{}|\[\]\\^`]', '', topic)
+    return topic[:100] if len(topic) > 100 else topic
+
+
+def parse_quiz_answers(quiz_text: str) -> tuple:
+    """Parse correct answers and explanations from quiz text."""
+    correct_answers = []
+    explanations = []
+    
+    answer_pattern = r"✅\s*\*\*Correct Answer:\s*([A-Da-d])\s*\*\*"
+    explanation_pattern = r">\s*💡\s*\*\*Explanation:\*\*\s*(.+?)(?=\n\n|---|\n###|$)"
+    
+    answer_matches = re.findall(answer_pattern, quiz_text, re.IGNORECASE)
+    for match in answer_matches:
+        correct_answers.append(match.upper())
+    
+    explanation_matches = re.findall(explanation_pattern, quiz_text, re.DOTALL)
+    for match in explanation_matches:
+        explanations.append(match.strip())
+    
+    return correct_answers, explanations
+
+
+def quiz_validation_outcome(correct_answers: list, explanations: list, expected_count: int = 5) -> str:
+    """Describe what validate_quiz_data will decide, for metrics (doesn't modify anything)."""
+    if len(correct_answers) < expected_count:
+        return "too_few_answers"
+    if any(ans not in ['A', 'B', 'C', 'D'] for ans in correct_answers[:expected_count]):
+        return "invalid_answer_letter"
+    if len(explanations) < expected_count:
+        return "valid_padded_explanations"
+    return "valid"
+
+
+def validate_quiz_data(correct_answers: list, explanations: list, expected_count: int = 5) -> bool:
+    """Validate that quiz data is complete."""
+    if len(correct_answers) < expected_count:
+        return False
+    if len(explanations) < expected_count:
+        while len(explanations) < expected_count:
+            explanations.append("Great effort! Keep learning and you'll master this topic.")
+    for ans in correct_answers[:expected_count]:
+        if ans not in ['A', 'B', 'C', 'D']:
+            return False
+    return True
+
+
+def parse_individual_questions(quiz_text: str) -> list:
+    """Parse quiz into individual questions with their options."""
+    questions = []
+    
+    question_blocks = re.split(r'###\s*Question\s*', quiz_text)
+    
+    for block in question_blocks[1:]:
+        try:
+            first_line_match = re.match(r'(\d+)\s*([^\n]*)', block)
+            if not first_line_match:
+                continue
+            
+            q_num = first_line_match.group(1)
+            emoji = first_line_match.group(2).strip()
+            
+            q_text = ""
+            skip_phrases = ['correct answer', 'explanation', 'great job', 'quiz complete', 
+                           'good job', 'well done', 'keep learning', 'keep going', 
+                           'congratulations', 'awesome work', 'nice work']
+            bold_matches = re.findall(r'\*\*([^*]+)\*\*', block)
+            for match in bold_matches:
+                match_lower = match.lower().strip()
+                if any(phrase in match_lower for phrase in skip_phrases):
+                    continue
+                if len(match) > 10 and '?' in match:
+                    q_text = match.strip()
+                    break
+            
+            if not q_text:
+                lines = block.split('\n')
+                for line in lines[1:6]:
+                    line = line.strip()
+                    if line and not line.startswith('-') and not line.startswith('*') and '✅' not in line and '💡' not in line:
+                        if len(line) > 10:
+                            q_text = line.replace('**', '').strip()
+                            break
+            
+            if not q_text:
+                q_text = f"Question {q_num}"
+            
+            options = {}
+            option_format = None
+            option_patterns = [
+                ("dash", r'-\s*([A-Da-d])\)\s*(.+?)(?=\n-\s*[A-Da-d]\)|\n\n|✅|$)'),
+                ("star", r'\*\s*([A-Da-d])\)\s*(.+?)(?=\n\*\s*[A-Da-d]\)|\n\n|✅|$)'),
+                ("bare", r'([A-Da-d])\)\s*(.+?)(?=\n[A-Da-d]\)|\n\n|✅|$)'),
+            ]
+            
+            for pattern_name, pattern in option_patterns:
+                option_matches = re.findall(pattern, block, re.DOTALL)
+                if len(option_matches) >= 4:
+                    for opt_match in option_matches[:4]:
+                        letter = opt_match[0].upper()
+                        text = opt_match[1].strip().rstrip('\n').strip()
+                        options[letter] = text
+                    option_format = pattern_name
+                    break
+            
+            if len(options) == 4:
+                questions.append({
+                    'number': int(q_num),
+                    'emoji': emoji,
+                    'text': q_text,
+                    'options': options,
+                    'option_format': option_format
+                })
+        except Exception:
+            continue
+    
+    return questions
+
+
+def format_quiz_text(topic: str, difficulty: str, questions: list) -> str:
+    """Write questions ({'text', 'options', 'answer', 'explanation', 'emoji'}) in Gemini's quiz format,
+    so a quiz put together locally goes through the same parsers as a generated one."""
+    parts = [f"## 📝 Your {difficulty} Quiz on {topic}!\n"]
+    for i, q in enumerate(questions, 1):
+        emoji = q.get('emoji') or QUESTION_EMOJIS[(i - 1) % len(QUESTION_EMOJIS)]
+        options = "\n".join(f"- {letter}) {' '.join(q['options'][letter].split())}" for letter in "ABCD")
+        explanation = " ".join(q.get('explanation', '').split())
+        parts.append(f"""
+### Question {i} {emoji}
+**{' '.join(q['text'].split())}**
+
+{options}
+
+✅ **Correct Answer: {q['answer']}**
+
+> 💡 **Explanation:** {explanation}
+
+---
+""")
+    parts.append("\n## 🎊 Quiz Complete!\n\n**Great job working through this quiz!** Keep learning and growing! 🌟\n")
+    return "".join(parts)
+
+
+# ============================================================
+# REVIEW BUNDLE - One structured post-quiz response
+# ============================================================
+REVIEW_BUNDLE_SCHEMA = {
+    "type": "OBJECT",
+    "properties": {
+        "summary": {"type": "STRING"},
+        "study_notes": {"type": "STRING"},
+        "question_tips": {
+            "type": "ARRAY",
+            "items": {
+                "type": "OBJECT",
+                "properties": {
+                    "question": {"type": "INTEGER"},
+                    "tip": {"type": "STRING"},
+                },
+                "required": ["question", "tip"],
+            },
+        },
+    },
+    "required": ["summary", "study_notes", "question_tips"],
+}
+
+
+def parse_review_bundle(response_text: str, wrong_questions: list) -> dict:
+    """Parse the JSON review bundle into {'summary', 'study_notes', 'tips': {question number: tip}}.
+
+    Missing or malformed fields come back empty so callers can fall back to separate calls.
+    """
+    bundle = {'summary': '', 'study_notes': '', 'tips': {}}
+    text = (response_text or '').strip()
+    # Tolerate a ```json fence around the object
+    fence = re.match(r'^```(?:json)?\s*(.*?)\s*```$', text, re.DOTALL)
+    if fence:
+        text = fence.group(1)
+    try:
+        data = json.loads(text)
+    except ValueError:
+        return bundle
+    if not isinstance(data, dict):
+        return bundle
+    
+    for field in ('summary', 'study_notes'):
+        if isinstance(data.get(field), str):
+            bundle[field] = data[field].strip()
+    
+    wanted = {int(q) for q in wrong_questions}
+    for item in data.get('question_tips') or []:
+        if not isinstance(item, dict) or not isinstance(item.get('tip'), str):
+            continue
+        try:
+            q_num = int(item.get('question'))
+        except (TypeError, ValueError):
+            continue
+        if q_num in wanted and item['tip'].strip():
+            bundle['tips'][q_num] = item['tip'].strip()
+    return bundle
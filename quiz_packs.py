@@ -0,0 +1,344 @@
+# ============================================================
+# Study Buddy Quest - Quiz Packs 📦
+# Prebuilds quizzes offline for upcoming units: every topic ×
+# difficulty × grade × length in a matrix is generated through
+# the app's own Gemini generator (a few at a time), parsed and
+# validated like a live quiz, and appended to a JSONL pack.
+# The pack is its own checkpoint: rerunning the same command
+# skips what is already in it. Quizzes go into the item bank as
+# they are written, and the app loads packs into the response
+# cache at startup, so daytime quizzes rarely need Gemini.
+#
+#   python quiz_packs.py build --topics "Volcanoes,Fractions" \
+#       --difficulties easy,medium --grades "5th Grade" --lengths 5,10 \
+#       --out packs/unit4.jsonl
+#   python quiz_packs.py seed packs/unit4.jsonl
+#
+# Environment:
+#   STUDY_BUDDY_QUIZ_PACKS  pack files to load at app startup
+#                           (separated by the OS path separator)
+# ============================================================
+
+import argparse
+import itertools
+import json
+import os
+import sys
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import gemini_gateway
+import telemetry
+from item_bank import ITEM_BANK
+from quiz_generation import (
+    classify_generation_error,
+    gemini_configured,
+    generate_quiz_with_gemini,
+    parse_generated_quiz,
+    quiz_cache_key,
+)
+from quiz_logic import GRADE_LEVELS, QUIZ_LENGTHS
+from rate_limit import RateLimitedError, Requester
+from topic_index import canonical_topic_key
+
+DIFFICULTIES = {"easy": "Easy 🌱", "medium": "Medium 🌿", "hard": "Hard 🌳"}
+DEFAULT_CONCURRENCY = 4
+DEFAULT_RETRIES = 2
+PACK_CACHE_TTL_S = 24 * 3600  # pack quizzes outlive live replies in the response cache
+
+PACK_CLASSROOM = "quiz-pack"
+
+PACK_QUIZZES = telemetry.REGISTRY.counter(
+    "study_buddy_pack_quizzes_total", "Quiz pack generations by outcome.")
+
+# One quiz to build; `copy` tells apart several quizzes for the same settings
+PackCell = namedtuple("PackCell", ["topic", "difficulty", "grade_level", "num_questions", "copy"])
+
+
+# ============================================================
+# MATRIX
+# ============================================================
+def _split(value: str) -> list:
+    return [part.strip() for part in value.split(",") if part.strip()]
+
+
+def parse_difficulty(value: str) -> str:
+    """'easy' / 'Easy' / 'Easy 🌱' -> the app's difficulty label."""
+    key = value.split()[0].lower() if value.strip() else ""
+    if key not in DIFFICULTIES:
+        raise ValueError(f"Unknown difficulty {value!r} (use easy, medium or hard)")
+    return DIFFICULTIES[key]
+
+
+def parse_grade(value: str) -> str:
+    """'none' / '5' / '5th' / '5th Grade' / 'pre-k' -> the app's grade label."""
+    wanted = value.strip().lower()
+    if wanted in ("", "none", "skip"):
+        return GRADE_LEVELS[0]
+    for grade in GRADE_LEVELS:
+        first = grade.lower().split()[0]
+        if wanted in (grade.lower(), first, first.rstrip("stndrh")):
+            return grade
+    raise ValueError(f"Unknown grade {value!r} (use one of: {', '.join(GRADE_LEVELS)})")
+
+
+def parse_length(value: str) -> int:
+    length = int(value)
+    if length not in QUIZ_LENGTHS:
+        raise ValueError(f"Quiz length must be one of {QUIZ_LENGTHS}, not {length}")
+    return length
+
+
+def build_matrix(topics: list, difficulties: list, grades: list, lengths: list, copies: int = 1) -> list:
+    """Every topic × difficulty × grade × length cell, `copies` quizzes each (build_pack drops duplicate ids)."""
+    return [PackCell(*combo, copy) for combo in itertools.product(topics, difficulties, grades, lengths)
+            for copy in range(copies)]
+
+
+def cell_id(cell: PackCell) -> str:
+    """Checkpoint id of a cell (topics that canonicalize the same count as one)."""
+    return "|".join([canonical_topic_key(cell.topic) or cell.topic.lower(), cell.difficulty.split()[0],
+                     cell.grade_level, str(cell.num_questions), str(cell.copy)])
+
+
+# ============================================================
+# PACK FILES - JSON lines, append-only
+# ============================================================
+def read_pack(path: str) -> list:
+    """Every complete quiz record in a pack (a torn last line is ignored)."""
+    records = []
+    if not os.path.exists(path):
+        return records
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if not line.endswith("\n"):
+                break
+            try:
+                records.append(json.loads(line))
+            except json.JSONDecodeError:
+                continue
+    return records
+
+
+def _trim_torn_line(path: str):
+    """Cut a half-written last line (from a killed run) so appends start on a fresh line."""
+    with open(path, "rb+") as f:
+        data = f.read()
+        if data and not data.endswith(b"\n"):
+            f.truncate(data.rfind(b"\n") + 1)
+
+
+def make_record(cell: PackCell, quiz_content: str) -> dict:
+    """Parse and validate a generated quiz into a pack record (ValueError if it's incomplete)."""
+    parsed = parse_generated_quiz(quiz_content, cell.num_questions)
+    if len(parsed['parsed_questions']) != cell.num_questions:
+        raise ValueError(f"Parsed {len(parsed['parsed_questions'])} of {cell.num_questions} questions")
+    return {
+        "id": cell_id(cell),
+        "topic": cell.topic,
+        "topic_key": canonical_topic_key(cell.topic),
+        "difficulty": cell.difficulty.split()[0],
+        "grade_level": cell.grade_level,
+        "num_questions": cell.num_questions,
+        "quiz_content": quiz_content,
+        "correct_answers": parsed['correct_answers'],
+        "explanations": parsed['explanations'],
+        "parsed_questions": parsed['parsed_questions'],
+        "created_at": time.time(),
+    }
+
+
+# ============================================================
+# BUILD
+# ============================================================
+def pack_requester() -> Requester:
+    """Each worker thread is its own session; together they share one classroom's budget."""
+    worker = threading.current_thread().name
+    return Requester(session=worker, student=worker, classroom=PACK_CLASSROOM)
+
+
+def generate_cell(cell: PackCell, retries: int = DEFAULT_RETRIES) -> dict:
+    """Generate and validate one cell's quiz, waiting out rate limits; raises after `retries` failures."""
+    failures = 0
+    requester = pack_requester()
+    while True:
+        try:
+            quiz_content = generate_quiz_with_gemini(cell.topic, cell.difficulty, grade_level=cell.grade_level,
+                                                     num_questions=cell.num_questions, requester=requester)
+            return make_record(cell, quiz_content)
+        except RateLimitedError as e:
+            # Backpressure, not failure: the pack shares the app's Gemini quota
+            time.sleep(e.retry_after)
+        except Exception:
+            failures += 1
+            if failures > retries:
+                raise
+            time.sleep(2 ** failures)
+
+
+def seed_item_bank(record: dict, bank=ITEM_BANK) -> int:
+    """Add a pack quiz's questions to the item bank; returns how many were offered."""
+    if bank is None or not record.get("topic_key"):
+        return 0
+    questions = record["parsed_questions"]
+    if len(questions) != len(record["correct_answers"]):
+        return 0
+    bank.add_quiz(record["topic_key"], record["difficulty"], record["grade_level"], questions,
+                  record["correct_answers"], record["explanations"])
+    return len(questions)
+
+
+def build_pack(cells: list, out: str, concurrency: int = DEFAULT_CONCURRENCY, retries: int = DEFAULT_RETRIES,
+               bank=ITEM_BANK, progress=print) -> dict:
+    """Generate every cell not already in `out`, appending each validated quiz as it finishes."""
+    if os.path.exists(out):
+        _trim_torn_line(out)
+    done = {record.get("id") for record in read_pack(out)}
+    # Topics that canonicalize the same ("WW2", "World War II") share a cell: generate it once
+    unique = {}
+    for cell in cells:
+        unique.setdefault(cell_id(cell), cell)
+    todo = [cell for key, cell in unique.items() if key not in done]
+    summary = {"cells": len(unique), "skipped": len(unique) - len(todo), "written": 0, "failed": 0}
+    if not todo:
+        return summary
+    if os.path.dirname(out):
+        os.makedirs(os.path.dirname(out), exist_ok=True)
+
+    start = time.perf_counter()
+    pending_cells = iter(todo)
+    with open(out, "a", encoding="utf-8") as f, ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="quiz-pack") as pool:
+        # Keep only a couple of cells per worker in flight, so stopping early wastes little
+        in_flight = {}
+        for cell in itertools.islice(pending_cells, concurrency * 2):
+            in_flight[pool.submit(generate_cell, cell, retries)] = cell
+        while in_flight:
+            finished, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in finished:
+                cell = in_flight.pop(future)
+                try:
+                    record = future.result()
+                except Exception as e:
+                    summary["failed"] += 1
+                    PACK_QUIZZES.inc(outcome="failed", category=classify_generation_error(e))
+                    progress(f"❌ {cell_id(cell)}: {e}")
+                else:
+                    f.write(json.dumps(record, ensure_ascii=False) + "\n")
+                    f.flush()
+                    seed_item_bank(record, bank)
+                    summary["written"] += 1
+                    PACK_QUIZZES.inc(outcome="written")
+                    progress(f"✅ {record['id']} ({summary['written'] + summary['failed']}/{len(todo)})")
+                for next_cell in itertools.islice(pending_cells, 1):
+                    in_flight[pool.submit(generate_cell, next_cell, retries)] = next_cell
+        os.fsync(f.fileno())
+    summary["seconds"] = round(time.perf_counter() - start, 1)
+    return summary
+
+
+# ============================================================
+# SEEDING - Load packs into the app's caches
+# ============================================================
+def seed_caches(paths: list, bank=ITEM_BANK, cache=gemini_gateway.RESPONSE_CACHE) -> dict:
+    """Load pack quizzes into the response cache (keyed like live quizzes) and the item bank."""
+    quizzes = questions = 0
+    for path in paths:
+        for record in read_pack(path):
+            key = quiz_cache_key(record["topic"], record["difficulty"], record["grade_level"], record["num_questions"])
+            cache.put(gemini_gateway.semantic_key("generate_quiz_with_gemini", key), record["quiz_content"],
+                      ttl_s=PACK_CACHE_TTL_S)
+            questions += seed_item_bank(record, bank)
+            quizzes += 1
+    return {"quizzes": quizzes, "questions": questions}
+
+
+_seed_lock = threading.Lock()
+_seeded = False
+
+
+def seed_from_env():
+    """Load STUDY_BUDDY_QUIZ_PACKS on a background thread, once per process."""
+    global _seeded
+    paths = [p for p in os.environ.get("STUDY_BUDDY_QUIZ_PACKS", "").split(os.pathsep) if p]
+    with _seed_lock:
+        if _seeded or not paths:
+            return
+        _seeded = True
+
+    def run():
+        try:
+            summary = seed_caches(paths)
+            print(f"Quiz packs loaded: {summary['quizzes']} quizzes, {summary['questions']} questions")
+        except (OSError, KeyError, TypeError) as e:
+            print(f"Quiz packs could not be loaded: {e}")
+
+    threading.Thread(target=run, name="quiz-pack-seed", daemon=True).start()
+
+
+# ============================================================
+# COMMAND LINE
+# ============================================================
+def _read_topics(args) -> list:
+    topics = _split(args.topics or "")
+    if args.topics_file:
+        with open(args.topics_file, encoding="utf-8") as f:
+            topics += [line.strip() for line in f if line.strip() and not line.startswith("#")]
+    return list(dict.fromkeys(topics))
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Prebuild validated quiz packs and load them into the app's caches.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    build = commands.add_parser("build", help="Generate a topics × difficulty × grade × length matrix into a pack")
+    build.add_argument("--topics", help="Comma-separated topics")
+    build.add_argument("--topics-file", help="File with one topic per line")
+    build.add_argument("--difficulties", default="easy,medium,hard")
+    build.add_argument("--grades", default="none", help="Comma-separated grades, e.g. 'none,3rd Grade,5'")
+    build.add_argument("--lengths", default="5", help=f"Comma-separated quiz lengths from {QUIZ_LENGTHS}")
+    build.add_argument("--copies", type=int, default=1, help="Quizzes per cell (more copies = more bank variety)")
+    build.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY, help="Gemini calls at once")
+    build.add_argument("--retries", type=int, default=DEFAULT_RETRIES, help="Retries per cell after a bad quiz")
+    build.add_argument("--out", required=True, help="Pack file (JSON lines); rerun to resume")
+
+    seed = commands.add_parser("seed", help="Add packs' questions to the item bank")
+    seed.add_argument("packs", nargs="+")
+
+    args = parser.parse_args(argv)
+    if args.command == "seed":
+        if ITEM_BANK is None:
+            print("❌ The item bank is off (STUDY_BUDDY_ITEM_BANK)")
+            return 1
+        summary = seed_caches(args.packs)
+        print(f"📦 {summary['quizzes']} quizzes, {summary['questions']} questions -> {ITEM_BANK.path}")
+        return 0
+
+    try:
+        topics = _read_topics(args)
+        cells = build_matrix(
+            topics,
+            [parse_difficulty(d) for d in _split(args.difficulties)],
+            [parse_grade(g) for g in _split(args.grades)],
+            [parse_length(n) for n in _split(args.lengths)],
+            max(1, args.copies),
+        )
+    except (OSError, ValueError) as e:
+        print(f"❌ {e}")
+        return 1
+    if not cells:
+        print("❌ Nothing to build: give --topics or --topics-file")
+        return 1
+    if not gemini_configured():
+        print("❌ Gemini is not configured (AI_INTEGRATIONS_GEMINI_API_KEY / _BASE_URL)")
+        return 1
+
+    summary = build_pack(cells, args.out, max(1, args.concurrency), max(0, args.retries))
+    print(f"📦 {args.out}: {summary['written']} written, {summary['skipped']} already there, "
+          f"{summary['failed']} failed of {summary['cells']} ({summary.get('seconds', 0)}s)")
+    return 1 if summary["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,52 @@
+# ============================================================
+# Study Buddy Quest - Quiz Timer ⏱️
+# Timed mode's countdown as one two-way component
+# (components/quiz_timer/index.html). It is mounted once per
+# quiz, ticks in the browser only when the shown second
+# changes, and sends the answer times back once every question
+# is answered. The speed bonus uses the server's own answer
+# timestamps, tightened by the client's report only as far as
+# network latency can explain.
+# ============================================================
+
+import os
+
+import streamlit.components.v1 as components
+
+SECONDS_PER_QUESTION = 8
+LATENCY_SLACK_S = 2.0  # how much sooner than the server saw it a client may say it finished
+
+_component = components.declare_component(
+    "quiz_timer",
+    path=os.path.join(os.path.dirname(os.path.abspath(__file__)), "components", "quiz_timer"),
+)
+
+
+def quiz_timer(quiz_id: str, num_questions: int, answered: int, key: str = None):
+    """Show the countdown; returns the client's report ({quiz_id, answers, finished}) once sent, else None."""
+    return _component(
+        quiz_id=quiz_id,
+        num_questions=num_questions,
+        answered=answered,
+        seconds_per_question=SECONDS_PER_QUESTION,
+        key=key,
+        default=None,
+    )
+
+
+def verified_elapsed(shown_at: float, answer_times: dict, report: dict, quiz_id: str, now: float) -> float:
+    """Seconds from the quiz appearing to the last answer.
+
+    The server's view (when it saw each answer) includes network latency, so it
+    is an upper bound; a report for this quiz may shave up to LATENCY_SLACK_S
+    off it but never more.
+    """
+    last_answer = max(answer_times.values()) if answer_times else now
+    server_elapsed = max(0.0, last_answer - shown_at)
+    if not isinstance(report, dict) or report.get('quiz_id') != quiz_id:
+        return server_elapsed
+    try:
+        client_elapsed = float(report.get('finished'))
+    except (TypeError, ValueError):
+        return server_elapsed
+    return min(server_elapsed, max(client_elapsed, server_elapsed - LATENCY_SLACK_S))
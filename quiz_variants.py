@@ -0,0 +1,69 @@
+# ============================================================
+# Study Buddy Quest - Quiz Variants 🔀
+# Turns one validated quiz into per-student versions: the
+# question order and the A-D options are shuffled with a seed
+# taken from the session, and the correct-answer letters and
+# any letters mentioned in explanations ("the answer is B",
+# "option (C)") are remapped to match. Same session + same
+# quiz always gives the same variant; no Gemini call needed.
+# ============================================================
+
+import hashlib
+import random
+import re
+
+LETTERS = "ABCD"
+
+# Letters inside explanations that point at an option. A bare capital letter is
+# often part of a name ("Vitamin C", "Plan B", "Hepatitis A"), so only letters
+# with a clear option marker are remapped. After "option"/"answer", a whole
+# list of letters ("A and B", "A/B", "(A), (B) or (C)") is remapped.
+LETTER_LIST = r"([A-D](?:\)?(?:\s*[,/&]\s*|\s*,?\s+(?:and|or)\s+)\(?[A-D])*)\b"
+LETTER_REFERENCES = [
+    re.compile(r"\b((?i:option|answer|choice|letter)s?(?:\s+(?:is|are|was|were))?(?:\s*:)?\s+\(?|(?i:answer)\s*:\s*\(?)"
+               + LETTER_LIST),
+    re.compile(r"(\()([A-D])(?=\))"),
+    re.compile(r"(^[ \t]*(?:[-*][ \t]+)?|[\"'*])([A-D])(?=\))", re.MULTILINE),
+    re.compile(r"(\*\*)([A-D])(?=\*\*)"),
+]
+
+
+def variant_seed(session_id: str, fingerprint: str) -> int:
+    """Stable seed for one session's copy of one quiz."""
+    return int(hashlib.sha256(f"{session_id}|{fingerprint}".encode("utf-8")).hexdigest()[:16], 16)
+
+
+def remap_letters(text: str, mapping: dict) -> str:
+    """Rewrite option letters that `text` refers to (old letter -> new letter)."""
+    def rewrite(letters):
+        return re.sub(r"[A-D]", lambda m: "\0" + mapping.get(m.group(0), m.group(0)), letters)
+
+    for pattern in LETTER_REFERENCES:
+        text = pattern.sub(lambda m: m.group(1) + rewrite(m.group(2)), text)
+    # \0 marks letters already rewritten so a later pattern can't map them twice
+    return text.replace("\0", "")
+
+
+def make_variant(parsed_questions: list, correct_answers: list, explanations: list, seed: int) -> tuple:
+    """Shuffle question and option order; returns (questions, answers, explanations, order).
+
+    `order[i]` is the original index of the question now shown at position i.
+    """
+    rng = random.Random(seed)
+    count = min(len(parsed_questions), len(correct_answers))
+    order = list(range(count))
+    rng.shuffle(order)
+
+    questions, answers, new_explanations = [], [], []
+    for position, index in enumerate(order):
+        q = parsed_questions[index]
+        shuffled = list(LETTERS)
+        rng.shuffle(shuffled)
+        # shuffled[i] is the old letter shown as LETTERS[i]
+        mapping = {old: new for new, old in zip(LETTERS, shuffled)}
+        questions.append(dict(q, number=position + 1,
+                              options={new: q['options'][old] for new, old in zip(LETTERS, shuffled)}))
+        answers.append(mapping[correct_answers[index]])
+        explanation = explanations[index] if index < len(explanations) else ""
+        new_explanations.append(remap_letters(explanation, mapping))
+    return questions, answers, new_explanations, order
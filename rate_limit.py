@@ -0,0 +1,230 @@
+# ============================================================
+# Study Buddy Quest - Gemini Rate Limiting 🚦
+# Token buckets (measured in estimated LLM tokens) per session,
+# per student and per classroom, plus one shared bucket for the
+# whole app's quota. Requests waiting on the shared bucket are
+# served round-robin across classrooms so one busy class can't
+# starve the others.
+#
+# Environment:
+#   STUDY_BUDDY_RATE_LIMITS  tokens per minute for each scope, e.g.
+#                            "session=20000,student=40000,classroom=200000,global=1000000"
+#   STUDY_BUDDY_RATE_WAIT_S  longest a request queues for the shared
+#                            bucket before it is rejected (default 10)
+# ============================================================
+
+import os
+import threading
+import time
+from collections import OrderedDict, deque, namedtuple
+
+# Tokens per minute; each bucket can burst up to one minute's worth
+DEFAULT_LIMITS = {
+    "session": 20_000,
+    "student": 40_000,
+    "classroom": 200_000,
+    "global": 1_000_000,
+}
+DEFAULT_MAX_WAIT_S = 10.0
+IDLE_BUCKET_TTL_S = 600
+
+# Who is asking; student and classroom default to the session when unknown
+Requester = namedtuple("Requester", ["session", "student", "classroom"])
+
+
+class RateLimitedError(Exception):
+    """Raised when a Gemini call is over budget and there is nothing cached to serve."""
+
+    def __init__(self, scope: str, retry_after: float):
+        self.scope = scope
+        self.retry_after = max(1, int(retry_after + 0.999))
+        super().__init__(f"Gemini rate limit reached for this {scope}. Try again in {self.retry_after}s.")
+
+
+class TokenBucket:
+    """Classic token bucket; the level may go negative when actual usage beats the estimate."""
+
+    def __init__(self, capacity: float, refill_per_s: float):
+        self.capacity = capacity
+        self.refill_per_s = refill_per_s
+        self.level = capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float):
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.refill_per_s)
+        self.updated = now
+
+    def _cost(self, tokens: float) -> float:
+        # A request bigger than the whole bucket may still run once the bucket is full
+        return min(tokens, self.capacity)
+
+    def can_consume(self, tokens: float) -> bool:
+        with self._lock:
+            self._refill(time.monotonic())
+            return self.level >= self._cost(tokens)
+
+    def try_consume(self, tokens: float) -> bool:
+        with self._lock:
+            self._refill(time.monotonic())
+            if self.level < self._cost(tokens):
+                return False
+            self.level -= tokens
+            return True
+
+    def adjust(self, tokens: float):
+        """Give back (positive) or charge extra (negative) tokens after the fact."""
+        with self._lock:
+            self._refill(time.monotonic())
+            self.level = min(self.capacity, self.level + tokens)
+
+    def seconds_until(self, tokens: float) -> float:
+        with self._lock:
+            self._refill(time.monotonic())
+            missing = self._cost(tokens) - self.level
+            return max(0.0, missing / self.refill_per_s) if self.refill_per_s else float("inf")
+
+
+class FairQueue:
+    """Waits for a shared bucket, handing out turns round-robin across classrooms."""
+
+    def __init__(self, bucket: TokenBucket):
+        self.bucket = bucket
+        self._cond = threading.Condition()
+        self._queues = OrderedDict()  # classroom -> deque of waiting tickets
+
+    def waiting(self) -> int:
+        with self._cond:
+            return sum(len(q) for q in self._queues.values())
+
+    def _head(self):
+        for queue in self._queues.values():
+            return queue[0]
+        return None
+
+    def _remove(self, classroom: str, ticket, served: bool):
+        queue = self._queues[classroom]
+        queue.remove(ticket)
+        if not queue:
+            del self._queues[classroom]
+        elif served:
+            # Next turn goes to the next classroom in line
+            self._queues.move_to_end(classroom)
+        self._cond.notify_all()
+
+    def acquire(self, classroom: str, tokens: float, timeout: float) -> bool:
+        """Take `tokens` from the shared bucket, queueing up to `timeout` seconds for a fair turn."""
+        with self._cond:
+            if not self._queues and self.bucket.try_consume(tokens):
+                return True
+            ticket = object()
+            self._queues.setdefault(classroom, deque()).append(ticket)
+            deadline = time.monotonic() + timeout
+            while True:
+                if self._head() is ticket and self.bucket.try_consume(tokens):
+                    self._remove(classroom, ticket, served=True)
+                    return True
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._remove(classroom, ticket, served=False)
+                    return False
+                wait = self.bucket.seconds_until(tokens) if self._head() is ticket else remaining
+                self._cond.wait(min(remaining, max(wait, 0.01)))
+
+
+class RateLimiter:
+    """Per-scope token buckets in front of every Gemini call."""
+
+    def __init__(self, limits: dict = None, max_wait_s: float = DEFAULT_MAX_WAIT_S):
+        self.limits = dict(DEFAULT_LIMITS, **(limits or {}))
+        self.max_wait_s = max_wait_s
+        self._buckets = {}  # (scope, key) -> TokenBucket
+        self._lock = threading.Lock()
+        self._last_prune = time.monotonic()
+        self.shared = FairQueue(self._new_bucket("global"))
+
+    def _new_bucket(self, scope: str) -> TokenBucket:
+        per_minute = self.limits[scope]
+        return TokenBucket(per_minute, per_minute / 60.0)
+
+    def _bucket(self, scope: str, key: str) -> TokenBucket:
+        with self._lock:
+            bucket = self._buckets.get((scope, key))
+            if bucket is None:
+                bucket = self._buckets[(scope, key)] = self._new_bucket(scope)
+            return bucket
+
+    def _scoped(self, requester: Requester) -> list:
+        return [
+            ("session", self._bucket("session", requester.session)),
+            ("student", self._bucket("student", requester.student or requester.session)),
+            ("classroom", self._bucket("classroom", requester.classroom or requester.session)),
+        ]
+
+    def _prune(self):
+        """Drop buckets that have refilled completely, so idle sessions don't pile up."""
+        now = time.monotonic()
+        if now - self._last_prune < IDLE_BUCKET_TTL_S:
+            return
+        with self._lock:
+            self._last_prune = now
+            for key, bucket in list(self._buckets.items()):
+                idle = now - bucket.updated
+                if idle > IDLE_BUCKET_TTL_S and bucket.level + idle * bucket.refill_per_s >= bucket.capacity:
+                    del self._buckets[key]
+
+    def acquire(self, requester: Requester, tokens: float):
+        """Reserve `tokens` for one call or raise RateLimitedError naming the exhausted scope."""
+        self._prune()
+        scoped = self._scoped(requester)
+        with self._lock:
+            # Check every personal bucket before charging any of them
+            for scope, bucket in scoped:
+                if not bucket.can_consume(tokens):
+                    raise RateLimitedError(scope, bucket.seconds_until(tokens))
+            for _, bucket in scoped:
+                bucket.adjust(-tokens)
+
+        classroom = requester.classroom or requester.session
+        if not self.shared.acquire(classroom, tokens, self.max_wait_s):
+            for _, bucket in scoped:
+                bucket.adjust(tokens)
+            raise RateLimitedError("app", self.shared.bucket.seconds_until(tokens))
+
+    def has_headroom(self, requester: Requester, tokens: float) -> bool:
+        """Whether every personal bucket could take `tokens` right now (nothing is charged)."""
+        return all(bucket.can_consume(tokens) for _, bucket in self._scoped(requester))
+
+    def settle(self, requester: Requester, estimated: float, actual: float):
+        """Correct every bucket once the real token usage of a call is known."""
+        delta = estimated - actual
+        if not delta:
+            return
+        for _, bucket in self._scoped(requester):
+            bucket.adjust(delta)
+        self.shared.bucket.adjust(delta)
+
+    def release(self, requester: Requester, tokens: float):
+        """Refund a reservation for a call that never reached Gemini."""
+        self.settle(requester, tokens, 0)
+
+
+def limits_from_env() -> dict:
+    """Parse STUDY_BUDDY_RATE_LIMITS ("scope=tokens_per_minute,...")."""
+    limits = {}
+    for part in os.environ.get("STUDY_BUDDY_RATE_LIMITS", "").split(","):
+        scope, _, value = part.partition("=")
+        scope = scope.strip()
+        if scope in DEFAULT_LIMITS and value.strip().isdigit():
+            limits[scope] = int(value)
+    return limits
+
+
+def _max_wait_from_env() -> float:
+    try:
+        return float(os.environ.get("STUDY_BUDDY_RATE_WAIT_S", DEFAULT_MAX_WAIT_S))
+    except ValueError:
+        return DEFAULT_MAX_WAIT_S
+
+
+LIMITER = RateLimiter(limits_from_env(), _max_wait_from_env())
@@ -0,0 +1,168 @@
+# ============================================================
+# Study Buddy Quest - Results Page HTML 🧾
+# Builds the top of the results page (celebration card, level
+# up banner, new badges) and the whole answer breakdown as one
+# HTML string from templates compiled at import, so it reaches
+# the browser as a single st.markdown message. app.py keeps the
+# finished string per (quiz, answers) and reuses it on every
+# later rerun. No Streamlit imports here.
+# ============================================================
+
+from html import escape
+from string import Template
+
+from quiz_logic import BADGES, QUESTION_EMOJIS
+
+# Blocks are joined with blank lines; none of the templates may contain one,
+# or Markdown would end the HTML block early
+CELEBRATION_CARD = Template("""<div style="background: $gradient; color: white; padding: 30px; border-radius: 28px; text-align: center; margin: 20px 0; box-shadow: 0 10px 40px rgba(0,0,0,0.2);">
+<div style="font-size: 4rem; margin-bottom: 10px;">$emoji</div>
+<div style="font-size: 2rem; font-weight: 800; text-transform: uppercase; letter-spacing: 2px;">$title</div>
+<div style="font-size: 3rem; font-weight: 700; margin: 15px 0;">$correct / $total</div>
+<div style="font-size: 1.1rem; opacity: 0.9; margin-bottom: 15px;">$message</div>
+<div style="background: rgba(255,255,255,0.2); padding: 15px 25px; border-radius: 20px; display: inline-block; margin-top: 10px;">
+<span style="font-size: 1.8rem; font-weight: 700;">$xp_display</span>
+</div>
+</div>""")
+
+LEVEL_UP = Template("""<div style="background: linear-gradient(135deg, #6366f1 0%, #8b5cf6 100%); color: white; padding: 20px; border-radius: 28px; text-align: center; margin: 15px 0; box-shadow: 0 5px 20px rgba(99,102,241,0.3);">
+<div style="font-size: 2rem;">🎉 LEVEL UP! 🎉</div>
+<div style="font-size: 1.5rem; font-weight: bold;">Level $old_level → Level $new_level</div>
+<div style="font-size: 1.2rem; margin-top: 8px;">$title</div>
+<div style="font-size: 1rem; margin-top: 8px; background: rgba(255,255,255,0.2); padding: 8px; border-radius: 20px;">🎁 Unlocked: $perk</div>
+</div>""")
+
+PRACTICE_NOTE = Template("""<div style="background: rgba(28, 131, 225, 0.1); color: #1e40af; padding: 16px; border-radius: 20px; margin: 10px 0;">📖 <strong>$topic</strong> added to your practice list!</div>""")
+
+STATS_LINE = Template("""<p>📈 <strong>Total: $total_xp Experience Points</strong> | <strong>Level $level</strong> ($title)</p>""")
+
+NEW_BADGE = Template("""<div class="new-badge-alert">
+<strong>🎊 NEW BADGE UNLOCKED! 🎊</strong>
+<span class="new-badge-emoji">$emoji</span>
+<strong style="font-size: 1.3rem;">$name</strong><br>
+$desc
+</div>""")
+
+BREAKDOWN_HEADER = """<hr>
+<h3>📚 Answer Review &amp; Explanations</h3>
+<p><em>Here's the breakdown for each question:</em></p>"""
+
+RESULT_CORRECT = Template("""<div class="result-correct">
+<strong>$label</strong><br>
+<em style="color: #6b7280;">$question</em><br><br>
+✅ You answered: <strong>$user_ans) $user_text</strong> - Correct!<br><br>
+💡 <em>$explanation</em>
+</div>""")
+
+RESULT_WRONG = Template("""<div class="result-wrong">
+<strong>$label</strong><br>
+<em style="color: #6b7280;">$question</em><br><br>
+❌ You answered: <strong>$user_ans) $user_text</strong><br>
+✅ Correct answer: <strong>$correct_ans) $correct_text</strong><br><br>
+💡 <em>$explanation</em>
+</div>""")
+
+FLAWLESS = "<h3>🌟 FLAWLESS! You got everything right! 🌟</h3>"
+
+SUMMARY_CARD = Template("""<div style="background: linear-gradient(135deg, #a29bfe 0%, #6c5ce7 100%); color: white; padding: 20px; border-radius: 28px; margin: 10px 0; box-shadow: 0 4px 15px rgba(108, 92, 231, 0.3);">
+$text
+</div>""")
+
+NOTES_CARD = Template("""<div style="background: linear-gradient(135deg, #10b981 0%, #059669 100%); color: white; padding: 20px; border-radius: 28px; margin: 10px 0; box-shadow: 0 4px 15px rgba(16, 185, 129, 0.3);">
+$text
+</div>""")
+
+
+def _multiline(text: str) -> str:
+    """Escape text for a card, keeping its line breaks (and no blank lines)."""
+    return escape(text or '').replace('\n', '<br>')
+
+
+def celebration_html(correct_count: int, total_questions: int, score: int,
+                     base_score: int, time_bonus: int, level_bonus: int) -> str:
+    """The big score card at the top of the results page."""
+    if correct_count == total_questions:
+        gradient = "linear-gradient(135deg, #fbbf24 0%, #f59e0b 50%, #d97706 100%)"
+        emoji, title = "🏆", "PERFECT SCORE!"
+        message = "You're absolutely CRUSHING it! Your brain is on fire! 🔥"
+    elif correct_count >= total_questions * 0.8:
+        gradient = "linear-gradient(135deg, #34d399 0%, #10b981 50%, #059669 100%)"
+        emoji, title = "🎉", "Amazing Job!"
+        message = "So close to perfect! You're a knowledge machine! 💪"
+    elif correct_count >= total_questions * 0.6:
+        gradient = "linear-gradient(135deg, #60a5fa 0%, #3b82f6 50%, #2563eb 100%)"
+        emoji, title = "👍", "Nice Work!"
+        message = "You're learning and growing! Keep going! 📈"
+    else:
+        gradient = "linear-gradient(135deg, #a78bfa 0%, #8b5cf6 50%, #7c3aed 100%)"
+        emoji, title = "💪", "Keep Practicing!"
+        message = "Every quiz makes you smarter! Try again! 🌱"
+
+    bonus_parts = []
+    if base_score > 0:
+        bonus_parts.append(f"Base: {base_score}")
+    if time_bonus > 0:
+        bonus_parts.append(f"⚡ Speed: +{time_bonus}")
+    if level_bonus > 0:
+        bonus_parts.append(f"🌟 Level: +{level_bonus}")
+    xp_display = f"+{score} Experience Points"
+    if len(bonus_parts) > 1:
+        xp_display += f"<br><span style='font-size: 0.9rem; opacity: 0.8;'>{' | '.join(bonus_parts)}</span>"
+
+    return CELEBRATION_CARD.substitute(gradient=gradient, emoji=emoji, title=title, correct=correct_count,
+                                       total=total_questions, message=message, xp_display=xp_display)
+
+
+def breakdown_html(parsed_questions: list, user_answers: list, correct_answers: list,
+                   explanations: list, total_questions: int) -> str:
+    """One card per question: the student's answer, the right one and why."""
+    cards = [BREAKDOWN_HEADER]
+    for i in range(min(total_questions, len(correct_answers))):
+        user_ans = user_answers[i] if i < len(user_answers) else "?"
+        correct_ans = correct_answers[i]
+        options = parsed_questions[i].get('options', {}) if i < len(parsed_questions) else {}
+        fields = dict(
+            label=f"Question {i+1} {QUESTION_EMOJIS[i % len(QUESTION_EMOJIS)]}",
+            question=_multiline(parsed_questions[i].get('text', '') if i < len(parsed_questions) else ""),
+            user_ans=user_ans,
+            user_text=escape(options.get(user_ans.upper(), "")),
+            explanation=_multiline(explanations[i] if i < len(explanations) else "Great job learning!"),
+        )
+        if user_ans.upper() == correct_ans.upper():
+            cards.append(RESULT_CORRECT.substitute(fields))
+        else:
+            cards.append(RESULT_WRONG.substitute(fields, correct_ans=correct_ans,
+                                                 correct_text=escape(options.get(correct_ans.upper(), ""))))
+    return "\n\n".join(cards)
+
+
+def results_html(*, correct_count: int, total_questions: int, score: int, base_score: int,
+                 time_bonus: int, level_bonus: int, old_level: int, new_level: int,
+                 new_level_title: str, new_level_perk: str, total_xp: int, practice_topic: str,
+                 new_badges: list, parsed_questions: list, user_answers: list,
+                 correct_answers: list, explanations: list, flawless: bool) -> str:
+    """The results page from the score card down to the last answer card, as one payload."""
+    blocks = [celebration_html(correct_count, total_questions, score, base_score, time_bonus, level_bonus)]
+    if new_level > old_level:
+        blocks.append(LEVEL_UP.substitute(old_level=old_level, new_level=new_level,
+                                          title=new_level_title, perk=new_level_perk))
+    if practice_topic:
+        blocks.append(PRACTICE_NOTE.substitute(topic=escape(practice_topic)))
+    blocks.append(STATS_LINE.substitute(total_xp=total_xp, level=new_level, title=new_level_title))
+    for badge_id in new_badges:
+        if badge_id in BADGES:
+            blocks.append(NEW_BADGE.substitute(BADGES[badge_id]))
+    blocks.append(breakdown_html(parsed_questions, user_answers, correct_answers, explanations, total_questions))
+    if flawless:
+        blocks.append(FLAWLESS)
+    return "\n\n".join(blocks)
+
+
+def summary_card_html(summary: str) -> str:
+    """The purple AI study summary card."""
+    return SUMMARY_CARD.substitute(text=_multiline(summary))
+
+
+def notes_card_html(notes: str) -> str:
+    """The green study notes card."""
+    return NOTES_CARD.substitute(text=_multiline(notes))
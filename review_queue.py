@@ -0,0 +1,97 @@
+# ============================================================
+# Study Buddy Quest - Spaced Repetition 🔁
+# Every missed question becomes a review card in a Leitner
+# system: a miss puts the card in box 1, each correct review
+# moves it up a box with a longer wait, and a card that clears
+# the last box is retired. Cards wait in a min-heap ordered by
+# due time, so scheduling is O(log n) and finding what's due
+# only looks at the cards that are due.
+# ============================================================
+
+import heapq
+import itertools
+import time
+
+# Wait before the next review, by Leitner box (box 1 = just missed)
+BOX_INTERVALS_S = [
+    2 * 60,
+    20 * 60,
+    24 * 3600,
+    3 * 24 * 3600,
+    7 * 24 * 3600,
+]
+REVIEW_QUIZ_MAX = 10
+
+
+class ReviewScheduler:
+    """One student's review cards, keyed by question content hash."""
+
+    def __init__(self):
+        self.cards = {}  # key -> card dict
+        self._heap = []  # (due, version, key); entries for older versions are skipped
+        self._versions = itertools.count()
+
+    def __len__(self) -> int:
+        return len(self.cards)
+
+    def _schedule(self, key: str, card: dict, now: float):
+        card['due'] = now + BOX_INTERVALS_S[card['box'] - 1]
+        card['version'] = next(self._versions)
+        heapq.heappush(self._heap, (card['due'], card['version'], key))
+        if len(self._heap) > 2 * len(self.cards) + 32:
+            # Too many stale entries: rebuild from the live cards
+            self._heap = [(c['due'], c['version'], k) for k, c in self.cards.items()]
+            heapq.heapify(self._heap)
+
+    def record_miss(self, key: str, question: dict, now: float = None):
+        """Put a missed question (text, options, answer, explanation, topic...) back in box 1.
+
+        A card keeps the question as first seen, so a review quiz doesn't relabel its topic.
+        """
+        now = time.time() if now is None else now
+        card = self.cards.get(key)
+        if card is None:
+            card = self.cards[key] = dict(question, box=1, reviews=0, lapses=0)
+        else:
+            card['box'] = 1
+        card['lapses'] += 1
+        self._schedule(key, card, now)
+
+    def record_correct(self, key: str, now: float = None):
+        """Promote a card answered correctly; cards past the last box are retired."""
+        card = self.cards.get(key)
+        if card is None:
+            return
+        now = time.time() if now is None else now
+        card['reviews'] += 1
+        card['box'] += 1
+        if card['box'] > len(BOX_INTERVALS_S):
+            del self.cards[key]
+            return
+        self._schedule(key, card, now)
+
+    def due(self, now: float = None, limit: int = REVIEW_QUIZ_MAX) -> list:
+        """Up to `limit` due cards, most overdue first (cards stay scheduled until answered)."""
+        now = time.time() if now is None else now
+        found = []
+        popped = []
+        while self._heap and self._heap[0][0] <= now and len(found) < limit:
+            entry = heapq.heappop(self._heap)
+            card = self.cards.get(entry[2])
+            if card is None or card['version'] != entry[1]:
+                continue  # stale entry
+            popped.append(entry)
+            found.append(dict(card, key=entry[2]))
+        for entry in popped:
+            heapq.heappush(self._heap, entry)
+        return found
+
+    def next_due(self) -> float:
+        """When the next card comes due (None when there are no cards)."""
+        while self._heap:
+            due, version, key = self._heap[0]
+            card = self.cards.get(key)
+            if card is not None and card['version'] == version:
+                return due
+            heapq.heappop(self._heap)
+        return None
@@ -0,0 +1,162 @@
+# ============================================================
+# Study Buddy Quest - Classroom Rooms 🏫
+# A teacher's session publishes one quiz to a short room code
+# and every student session that joins the room takes that
+# quiz: one generation serves the whole class. Rooms live in a
+# shared in-process store. Each student may get their own
+# question and option order (see quiz_variants.py); results
+# are mapped back to the published order and added to running
+# per-room totals, so the teacher's live summary costs the same
+# for three students or thirty. No Streamlit imports here.
+# ============================================================
+
+import secrets
+import threading
+import time
+
+CODE_ALPHABET = "ABCDEFGHJKLMNPQRSTUVWXYZ23456789"  # no 0/O or 1/I look-alikes
+CODE_LENGTH = 5
+ROOM_TTL_S = 8 * 3600  # rooms idle this long are dropped
+MAX_ROOMS = 1000
+
+
+def normalize_code(code: str) -> str:
+    """Room code as typed ('abc 12') -> stored form ('ABC12')."""
+    return "".join((code or "").split()).upper()
+
+
+class Room:
+    """One room: its owner, the published quiz and running results for it."""
+
+    def __init__(self, code: str, teacher: str):
+        self.code = code
+        self.teacher = teacher
+        self.quiz = None
+        self.version = 0
+        self.touched = time.time()
+        self._reset_results(0)
+
+    def _reset_results(self, num_questions: int):
+        self.submissions = 0
+        self.correct_total = 0
+        self.question_correct = [0] * num_questions
+        self.students = {}  # student -> correct flags of their latest submission (published order)
+
+    def publish(self, quiz: dict):
+        self.quiz = quiz
+        self.version += 1
+        self._reset_results(len(quiz['items']))
+
+    def record(self, student: str, flags: list):
+        """Add (or replace) one student's result; only their own flags are touched."""
+        previous = self.students.get(student)
+        if previous is None:
+            self.submissions += 1
+        else:
+            self.correct_total -= sum(previous)
+            for i, ok in enumerate(previous):
+                self.question_correct[i] -= ok
+        self.students[student] = flags
+        self.correct_total += sum(flags)
+        for i, ok in enumerate(flags):
+            self.question_correct[i] += ok
+
+    def summary(self) -> dict:
+        """Live results: submissions, average % and % correct per question (published order)."""
+        num_questions = len(self.question_correct)
+        answered = self.submissions * num_questions
+        return {
+            'code': self.code,
+            'version': self.version,
+            'topic': self.quiz['topic'] if self.quiz else None,
+            'submissions': self.submissions,
+            'average_percent': round(100 * self.correct_total / answered, 1) if answered else None,
+            'question_percent': [round(100 * c / self.submissions) if self.submissions else None
+                                 for c in self.question_correct],
+        }
+
+
+class RoomStore:
+    """Every room in the process, by code."""
+
+    def __init__(self, ttl_s: float = ROOM_TTL_S, max_rooms: int = MAX_ROOMS):
+        self.ttl_s = ttl_s
+        self.max_rooms = max_rooms
+        self._rooms = {}
+        self._lock = threading.Lock()
+
+    def _prune(self, now: float):
+        expired = [code for code, room in self._rooms.items() if now - room.touched > self.ttl_s]
+        for code in expired:
+            del self._rooms[code]
+        if len(self._rooms) >= self.max_rooms:
+            for code, _ in sorted(self._rooms.items(), key=lambda item: item[1].touched)[:len(self._rooms) - self.max_rooms + 1]:
+                del self._rooms[code]
+
+    def _get(self, code: str):
+        room = self._rooms.get(normalize_code(code))
+        if room is not None:
+            room.touched = time.time()
+        return room
+
+    def create(self, teacher: str) -> str:
+        """Open a room owned by `teacher` (a session id); returns its code."""
+        with self._lock:
+            self._prune(time.time())
+            code = "".join(secrets.choice(CODE_ALPHABET) for _ in range(CODE_LENGTH))
+            while code in self._rooms:
+                code = "".join(secrets.choice(CODE_ALPHABET) for _ in range(CODE_LENGTH))
+            self._rooms[code] = Room(code, teacher)
+            return code
+
+    def close(self, code: str, teacher: str) -> bool:
+        """Remove a room; only its teacher may."""
+        with self._lock:
+            room = self._rooms.get(normalize_code(code))
+            if room is None or room.teacher != teacher:
+                return False
+            del self._rooms[room.code]
+            return True
+
+    def exists(self, code: str) -> bool:
+        with self._lock:
+            return self._get(code) is not None
+
+    def publish(self, code: str, teacher: str, topic: str, difficulty: str, grade_level: str,
+                items: list, shuffle: bool = True) -> int:
+        """Share a quiz ({'text', 'options', 'answer', 'explanation', 'emoji'} items) with the room.
+
+        Only the room's teacher may publish; returns the new version (0 if refused).
+        """
+        with self._lock:
+            room = self._get(code)
+            if room is None or room.teacher != teacher or not items:
+                return 0
+            room.publish({'topic': topic, 'difficulty': difficulty, 'grade_level': grade_level,
+                          'items': [dict(item) for item in items], 'shuffle': shuffle})
+            return room.version
+
+    def current(self, code: str):
+        """(version, quiz) of the room's published quiz, or None."""
+        with self._lock:
+            room = self._get(code)
+            if room is None or room.quiz is None:
+                return None
+            return room.version, room.quiz
+
+    def submit(self, code: str, version: int, student: str, flags: list) -> bool:
+        """Count a student's result (correct flags in published order) if it's for the current quiz."""
+        with self._lock:
+            room = self._get(code)
+            if room is None or room.version != version or len(flags) != len(room.question_correct):
+                return False
+            room.record(student, [1 if ok else 0 for ok in flags])
+            return True
+
+    def summary(self, code: str):
+        with self._lock:
+            room = self._get(code)
+            return room.summary() if room is not None else None
+
+
+ROOMS = RoomStore()
@@ -0,0 +1,389 @@
+# ============================================================
+# Study Buddy Quest - Tracing & Metrics 📡
+# OpenTelemetry-style spans for the generate → parse → validate
+# → render pipeline, plus counters/histograms exposed in the
+# Prometheus text format. Standard library only.
+#
+# Environment:
+#   STUDY_BUDDY_TRACE_EXPORT  "console" or "file:<path>" (JSON lines,
+#                             OTLP-like span fields); unset = off
+#   STUDY_BUDDY_METRICS_PORT  serve /metrics on this local port
+# ============================================================
+
+import functools
+import inspect
+import json
+import os
+import secrets
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+SERVICE_NAME = "study-buddy-quest"
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+_local = threading.local()
+
+
+# ============================================================
+# METRICS - Counters and histograms with labels
+# ============================================================
+def _label_key(labels: dict) -> tuple:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(key: tuple, extra: tuple = ()) -> str:
+    pairs = list(key) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+
+class Counter:
+    """Monotonic counter, one value per label set."""
+
+    kind = "counter"
+
+    def __init__(self, name: str, help_text: str):
+        self.name = name
+        self.help_text = help_text
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(_label_key(labels), 0)
+
+    def render(self) -> list:
+        with self._lock:
+            items = list(self._values.items())
+        return [f"{self.name}{_format_labels(key)} {value}" for key, value in items]
+
+
+class Histogram:
+    """Cumulative-bucket histogram, one series per label set."""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, buckets: tuple = DEFAULT_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = buckets
+        self._series = {}  # key -> [bucket counts..., sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0] * len(self.buckets) + [0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def count(self, **labels) -> int:
+        series = self._series.get(_label_key(labels))
+        return series[-1] if series else 0
+
+    def render(self) -> list:
+        with self._lock:
+            items = [(key, list(series)) for key, series in self._series.items()]
+        lines = []
+        for key, series in items:
+            for bound, bucket_count in zip(self.buckets, series):
+                lines.append(f"{self.name}_bucket{_format_labels(key, (('le', str(bound)),))} {bucket_count}")
+            lines.append(f"{self.name}_bucket{_format_labels(key, (('le', '+Inf'),))} {series[-1]}")
+            lines.append(f"{self.name}_sum{_format_labels(key)} {round(series[-2], 6)}")
+            lines.append(f"{self.name}_count{_format_labels(key)} {series[-1]}")
+        return lines
+
+
+class Registry:
+    """Holds every metric and renders them in the Prometheus text format."""
+
+    def __init__(self):
+        self._metrics = {}
+
+    def counter(self, name: str, help_text: str) -> Counter:
+        return self._metrics.setdefault(name, Counter(name, help_text))
+
+    def histogram(self, name: str, help_text: str, buckets: tuple = DEFAULT_BUCKETS) -> Histogram:
+        return self._metrics.setdefault(name, Histogram(name, help_text, buckets))
+
+    def render_prometheus(self) -> str:
+        lines = []
+        for metric in self._metrics.values():
+            lines.append(f"# HELP {metric.name} {metric.help_text}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+SPAN_DURATION = REGISTRY.histogram(
+    "study_buddy_span_duration_seconds", "Duration of traced operations by span name and status.")
+GENERATION_REQUESTS = REGISTRY.counter(
+    "study_buddy_generation_requests_total", "Gemini generator calls by function and outcome.")
+GENERATION_ERRORS = REGISTRY.counter(
+    "study_buddy_generation_errors_total", "Quiz generation failures shown to students, by error type.")
+GENERATION_ATTEMPTS = REGISTRY.counter(
+    "study_buddy_quiz_generation_attempts_total", "Quiz generation attempts by mode and first try vs retry.")
+LLM_TOKENS = REGISTRY.counter(
+    "study_buddy_llm_tokens_total", "Tokens reported by Gemini usage metadata, by function and direction.")
+QUIZ_VALIDATIONS = REGISTRY.counter(
+    "study_buddy_quiz_validation_total", "validate_quiz_data outcomes.")
+PARSER_OPTION_PATTERNS = REGISTRY.counter(
+    "study_buddy_parser_option_pattern_total", "Option bullet pattern chosen by parse_individual_questions.")
+PARSE_FAILURES = REGISTRY.counter(
+    "study_buddy_parse_failures_total", "Quizzes where fewer questions were parsed than requested.")
+
+
+# ============================================================
+# TRACING - Nested spans exported as OTLP-style JSON lines
+# ============================================================
+class Span:
+    """One traced operation; field names follow the OTLP JSON span model."""
+
+    def __init__(self, name: str, parent=None, attributes: dict = None):
+        self.name = name
+        self.trace_id = parent.trace_id if parent else secrets.token_hex(16)
+        self.span_id = secrets.token_hex(8)
+        self.parent_span_id = parent.span_id if parent else ""
+        self.attributes = dict(attributes or {})
+        self.events = []
+        self.status = "STATUS_CODE_UNSET"
+        self.start_time_unix_nano = time.time_ns()
+        self.end_time_unix_nano = None
+
+    def set_attribute(self, key: str, value):
+        self.attributes[key] = value
+
+    def record_exception(self, exc: BaseException):
+        self.status = "STATUS_CODE_ERROR"
+        self.events.append({
+            "name": "exception",
+            "timeUnixNano": time.time_ns(),
+            "attributes": {"exception.type": type(exc).__name__, "exception.message": str(exc)[:500]},
+        })
+
+    def to_dict(self) -> dict:
+        return {
+            "resource": {"service.name": SERVICE_NAME},
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "parentSpanId": self.parent_span_id,
+            "name": self.name,
+            "startTimeUnixNano": self.start_time_unix_nano,
+            "endTimeUnixNano": self.end_time_unix_nano,
+            "attributes": self.attributes,
+            "events": self.events,
+            "status": {"code": self.status},
+        }
+
+
+class ConsoleSpanExporter:
+    """Print each finished span as one JSON line on stdout."""
+
+    def export(self, span: Span):
+        print(json.dumps(span.to_dict(), ensure_ascii=False, default=str), file=sys.stdout, flush=True)
+
+
+class FileSpanExporter:
+    """Append each finished span as one JSON line to a file."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def export(self, span: Span):
+        line = json.dumps(span.to_dict(), ensure_ascii=False, default=str)
+        with self._lock:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line + "\n")
+
+
+def _exporter_from_env():
+    setting = os.environ.get("STUDY_BUDDY_TRACE_EXPORT", "").strip()
+    if setting == "console":
+        return ConsoleSpanExporter()
+    if setting.startswith("file:"):
+        return FileSpanExporter(setting[len("file:"):])
+    return None
+
+
+EXPORTER = _exporter_from_env()
+
+
+def current_span():
+    """Get the innermost open span on this thread, if any."""
+    stack = getattr(_local, "stack", None)
+    return stack[-1] if stack else None
+
+
+@contextmanager
+def trace_span(name: str, **attributes):
+    """Trace a block: records its duration metric and exports the span when it ends."""
+    stack = getattr(_local, "stack", None)
+    if stack is None:
+        stack = _local.stack = []
+    span = Span(name, stack[-1] if stack else None, attributes)
+    stack.append(span)
+    start = time.perf_counter()
+    try:
+        yield span
+    except Exception as e:
+        span.record_exception(e)
+        raise
+    finally:
+        duration = time.perf_counter() - start
+        stack.pop()
+        span.end_time_unix_nano = time.time_ns()
+        if span.status == "STATUS_CODE_UNSET":
+            span.status = "STATUS_CODE_OK"
+        status = "error" if span.status == "STATUS_CODE_ERROR" else "ok"
+        SPAN_DURATION.observe(duration, span=name, status=status)
+        if EXPORTER is not None:
+            try:
+                EXPORTER.export(span)
+            except Exception as e:
+                print(f"Trace export error: {e}")
+
+
+def traced(name: str = None):
+    """Decorator that wraps every call of a function in a span."""
+    def decorator(func):
+        span_name = name or func.__name__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with trace_span(span_name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def _generation_outcome(span: Span) -> str:
+    return "fallback" if span.attributes.get("llm.fallback") else "success"
+
+
+def traced_generator(func):
+    """Decorator for Gemini generator functions: span + request counter by outcome.
+
+    Streaming (generator) functions are traced until the stream is exhausted.
+    """
+    if inspect.isgeneratorfunction(func):
+        @functools.wraps(func)
+        def stream_wrapper(*args, **kwargs):
+            try:
+                with trace_span(func.__name__, **{"llm.function": func.__name__, "llm.stream": True}) as span:
+                    yield from func(*args, **kwargs)
+            except Exception:
+                GENERATION_REQUESTS.inc(function=func.__name__, outcome="error")
+                raise
+            GENERATION_REQUESTS.inc(function=func.__name__, outcome=_generation_outcome(span))
+        return stream_wrapper
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        try:
+            with trace_span(func.__name__, **{"llm.function": func.__name__}) as span:
+                result = func(*args, **kwargs)
+        except Exception:
+            GENERATION_REQUESTS.inc(function=func.__name__, outcome="error")
+            raise
+        GENERATION_REQUESTS.inc(function=func.__name__, outcome=_generation_outcome(span))
+        return result
+    return wrapper
+
+
+def record_fallback(exc: BaseException = None):
+    """Mark the current generator span as having returned canned fallback text."""
+    span = current_span()
+    if span is None:
+        return
+    span.set_attribute("llm.fallback", True)
+    if exc is not None:
+        span.record_exception(exc)
+
+
+def record_token_usage(function: str, response):
+    """Count prompt/response tokens from a google-genai response, when it reports them."""
+    usage = getattr(response, "usage_metadata", None)
+    if usage is None:
+        return
+    prompt_tokens = getattr(usage, "prompt_token_count", None) or 0
+    output_tokens = getattr(usage, "candidates_token_count", None) or 0
+    if prompt_tokens:
+        LLM_TOKENS.inc(prompt_tokens, function=function, direction="input")
+    if output_tokens:
+        LLM_TOKENS.inc(output_tokens, function=function, direction="output")
+    span = current_span()
+    if span is not None:
+        span.set_attribute("llm.usage.input_tokens", prompt_tokens)
+        span.set_attribute("llm.usage.output_tokens", output_tokens)
+
+
+# ============================================================
+# PROMETHEUS ENDPOINT - Local scrape target
+# ============================================================
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = REGISTRY.render_prometheus().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+_server_lock = threading.Lock()
+_server = None
+_server_failed = False
+
+
+def start_metrics_server(port: int, host: str = "127.0.0.1"):
+    """Serve /metrics on a daemon thread; safe to call on every rerun."""
+    global _server, _server_failed
+    with _server_lock:
+        if _server is not None or _server_failed:
+            return _server
+        try:
+            _server = ThreadingHTTPServer((host, port), _MetricsHandler)
+        except OSError as e:
+            _server_failed = True
+            print(f"Metrics server could not start on port {port}: {e}")
+            return None
+        threading.Thread(target=_server.serve_forever, name="metrics-server", daemon=True).start()
+        return _server
+
+
+def start_metrics_server_from_env():
+    """Start the /metrics endpoint if STUDY_BUDDY_METRICS_PORT is set."""
+    port = os.environ.get("STUDY_BUDDY_METRICS_PORT")
+    if port and port.isdigit():
+        return start_metrics_server(int(port))
+    return None
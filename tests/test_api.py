@@ -0,0 +1,35 @@
+import pytest
+
+pytest.importorskip("starlette")
+from starlette.testclient import TestClient
+
+import api
+
+HEADERS = {"Authorization": "Bearer test-key"}
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setenv("STUDY_BUDDY_API_KEY", "test-key")
+    monkeypatch.setattr(api, "gemini_configured", lambda: True)
+    return TestClient(api.create_app())
+
+
+def test_bad_fields_are_422(client):
+    response = client.post("/api/quiz", json={"topic": "Volcanoes", "num_questions": 99}, headers=HEADERS)
+    assert response.status_code == 422
+
+
+def test_unusable_model_output_is_502_not_422(client, monkeypatch):
+    monkeypatch.setattr(api, "generate_quiz_with_gemini", lambda *args, **kwargs: "Sorry, I can't help with that.")
+    response = client.post("/api/quiz", json={"topic": "Volcanoes"}, headers=HEADERS)
+    assert response.status_code == 502
+    assert response.json()["category"]
+
+
+def test_no_response_from_model_is_502(client, monkeypatch):
+    def no_response(*args, **kwargs):
+        raise ValueError("No response received from AI")
+    monkeypatch.setattr(api, "generate_quiz_with_gemini", no_response)
+    response = client.post("/api/batch", json={"items": [{"type": "quiz", "topic": "Volcanoes"}]}, headers=HEADERS)
+    assert response.json()["results"][0]["status"] == 502
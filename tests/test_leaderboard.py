@@ -0,0 +1,46 @@
+from datetime import datetime, timedelta
+
+from leaderboard import GLOBAL_SCOPE, Leaderboards, SortedBoard
+
+NOW = datetime(2026, 10, 19, 12)
+
+
+def test_ranks_and_ties():
+    board = SortedBoard()
+    for student, xp in [("a", 50), ("b", 30), ("c", 50)]:
+        board.add(student, xp)
+    assert board.top(3) == [(1, "a", 50), (1, "c", 50), (3, "b", 30)]
+    assert board.rank("b") == 3
+
+
+def test_board_keeps_only_the_top_players():
+    board = SortedBoard(max_players=2)
+    for student, xp in [("a", 10), ("b", 30), ("c", 20)]:
+        board.add(student, xp)
+    assert [row[1] for row in board.top()] == ["b", "c"]
+    assert board.xp("a") is None
+
+
+def test_names_only_show_on_the_class_board():
+    boards = Leaderboards()
+    boards.record("s1", 40, classroom="5b", name="Ana Lopez", now=NOW)
+    assert boards.top("5b", now=NOW)[0]["name"] == "Ana Lopez"
+    assert boards.top(GLOBAL_SCOPE, now=NOW)[0]["name"].startswith("Player ")
+
+
+def test_reads_do_not_create_boards():
+    boards = Leaderboards()
+    assert boards.top("nobody", now=NOW) == []
+    assert boards.standing("s1", "nobody", now=NOW) == {"rank": None, "xp": None, "players": 0}
+    assert boards._boards == {}
+
+
+def test_idle_and_excess_classrooms_are_dropped():
+    boards = Leaderboards(scope_ttl_s=3600, max_scopes=2)
+    boards.record("s1", 10, classroom="old", name="Old", now=NOW)
+    boards.record("s2", 10, classroom="new", now=NOW + timedelta(hours=2))
+    assert boards.top("old", now=NOW + timedelta(hours=2)) == []
+    boards.record("s3", 10, classroom="newer", now=NOW + timedelta(hours=2, minutes=1))
+    boards.record("s4", 10, classroom="newest", now=NOW + timedelta(hours=2, minutes=2))
+    assert boards.top("new", now=NOW + timedelta(hours=2, minutes=2)) == []
+    assert boards.top("newest", now=NOW + timedelta(hours=2, minutes=2))
@@ -0,0 +1,40 @@
+import pytest
+
+from quiz_variants import make_variant, remap_letters
+
+SWAP = {"A": "B", "B": "A", "C": "D", "D": "C"}
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("The answer is C because lava cools fast.", "The answer is D because lava cools fast."),
+    ("Option (B) is correct.", "Option (A) is correct."),
+    ("Correct Answer: A", "Correct Answer: B"),
+    ("**C** is the best choice.", "**D** is the best choice."),
+    ("B) Rome was never the capital.", "A) Rome was never the capital."),
+    ("Answers A and B both describe plates moving apart.", "Answers B and A both describe plates moving apart."),
+    ("Options A/B are too small.", "Options B/A are too small."),
+    ("Choices A, B or C would all melt.", "Choices B, A or D would all melt."),
+    ("Options (A), (C), and (D) are wrong.", "Options (B), (D), and (C) are wrong."),
+    ("The answer is C and Vitamin D helps too.", "The answer is D and Vitamin D helps too."),
+])
+def test_option_letters_are_remapped(text, expected):
+    assert remap_letters(text, SWAP) == expected
+
+
+@pytest.mark.parametrize("text", [
+    "Vitamin C is correct for treating scurvy.",
+    "Plan B is the right answer for a rainy day.",
+    "Hepatitis A is correct (it spreads through food, like Hepatitis A).",
+    "A volcano is a vent in the crust.",
+])
+def test_capitals_that_are_not_options_are_kept(text):
+    assert remap_letters(text, SWAP) == text
+
+
+def test_variant_keeps_answers_with_their_options():
+    questions = [{"number": n + 1, "text": f"Q{n}", "emoji": "", "options": {l: f"{l}{n}" for l in "ABCD"}}
+                 for n in range(5)]
+    answers = ["A", "B", "C", "D", "A"]
+    shuffled, new_answers, _, order = make_variant(questions, answers, [""] * 5, seed=7)
+    for q, answer, index in zip(shuffled, new_answers, order):
+        assert q["options"][answer] == questions[index]["options"][answers[index]]
@@ -0,0 +1,36 @@
+from topic_index import TopicIndex, canonical_topic_key, normalize_topic
+
+
+def test_plurals_fold_onto_the_singular():
+    for plural, singular in [("Volcanoes", "Volcano"), ("Foxes", "Fox"), ("Gases", "Gas"), ("Churches", "Church"),
+                             ("Glasses", "Glass"), ("Butterflies", "Butterfly"), ("Fractions", "Fraction"),
+                             ("Shoes", "Shoe")]:
+        assert normalize_topic(plural) == normalize_topic(singular)
+
+
+def test_words_ending_in_s_that_are_not_plurals_are_kept():
+    assert normalize_topic("Diabetes") == "diabetes"
+    assert normalize_topic("Physics") == "physics"
+    assert normalize_topic("Hepatitis") == "hepatitis"
+
+
+def test_trailing_roman_numerals_are_numbers():
+    assert normalize_topic("Algebra II") == normalize_topic("Algebra 2") == "algebra 2"
+    assert normalize_topic("Henry VIII") == "henry 8"
+    assert normalize_topic("Elizabeth I") == "elizabeth 1"
+    assert normalize_topic("World War II") == "world war 2"
+    assert normalize_topic("Type I diabetes") == "type 1 diabetes"
+    assert normalize_topic("Vi editor") == "vi editor"
+    assert normalize_topic("Linux CLI") == "linux cli"
+
+
+def test_numbered_topics_never_fuzzy_merge():
+    index = TopicIndex()
+    for first, second in [("Algebra I", "Algebra II"), ("Spanish I", "Spanish II"), ("Elizabeth I", "Elizabeth II"),
+                          ("Henry VII", "Henry VIII"), ("Algebra I honors", "Algebra II honors")]:
+        assert canonical_topic_key(first, index) != canonical_topic_key(second, index)
+
+
+def test_typos_still_merge():
+    index = TopicIndex()
+    assert canonical_topic_key("Photosynthesis", index) == canonical_topic_key("Photosynthesys", index)
@@ -0,0 +1,252 @@
+# ============================================================
+# Study Buddy Quest - Topic Canonicalization 🗂️
+# Turns what students type ("WW2", "World War II",
+# "Science: WWII", "world war 2 ") into one canonical topic
+# key so caches can share work across near-duplicate topics.
+#
+#   normalize_topic()   case/accent/punctuation/whitespace folding,
+#                       numerals, roman numerals, aliases, plurals
+#   TopicIndex          character n-gram index that maps a new key
+#                       onto a close existing one (fuzzy match)
+#   canonical_topic_key()  both, against the shared TOPIC_INDEX
+# ============================================================
+
+import re
+import threading
+import unicodedata
+from collections import OrderedDict
+
+FUZZY_THRESHOLD = 0.8
+NGRAM_SIZE = 3
+MAX_INDEXED_TOPICS = 20_000
+
+# Category prefixes the app adds ("Science: volcanoes") don't change the topic
+CATEGORY_PREFIX = re.compile(r"^[A-Za-z][A-Za-z &/'-]{0,30}:\s*(?=\S)")
+
+NUMBER_WORDS = {
+    "zero": "0", "one": "1", "two": "2", "three": "3", "four": "4", "five": "5",
+    "six": "6", "seven": "7", "eight": "8", "nine": "9", "ten": "10",
+    "eleven": "11", "twelve": "12", "thirteen": "13", "fourteen": "14", "fifteen": "15",
+    "sixteen": "16", "seventeen": "17", "eighteen": "18", "nineteen": "19", "twenty": "20",
+    "first": "1", "second": "2", "third": "3", "fourth": "4", "fifth": "5",
+}
+
+ROMAN_VALUES = {"i": 1, "v": 5, "x": 10, "l": 50, "c": 100}
+ROMAN_NUMERAL = re.compile(r'^(?=[ivxlc]{2,}$)c{0,3}(xc|xl|l?x{0,3})(ix|iv|v?i{0,3})$')
+# Roman numerals are read as numbers after these words ("world war ii", "part iv") or as the
+# last word ("algebra ii", "henry viii"); elsewhere they are usually words or names ("vi editor")
+TRAILING_ROMAN_NUMERAL = re.compile(r'^(?=[ivx]{2,}$)x{0,3}(ix|iv|v?i{0,3})$')  # no l/c: "cli", "xl"
+ROMAN_CONTEXT = {"war", "part", "chapter", "grade", "book", "volume", "unit", "act", "episode", "type", "phase",
+                 "level", "class", "section"}
+
+# Abbreviations and alternate names -> canonical phrase (applied to whole normalized topics or tokens)
+ALIASES = {
+    "ww1": "world war 1",
+    "wwi": "world war 1",
+    "ww 1": "world war 1",
+    "great war": "world war 1",
+    "first world war": "world war 1",
+    "ww2": "world war 2",
+    "wwii": "world war 2",
+    "ww 2": "world war 2",
+    "second world war": "world war 2",
+    "usa": "united states",
+    "us": "united states",
+    "america": "united states",
+    "uk": "united kingdom",
+    "britain": "united kingdom",
+    "great britain": "united kingdom",
+    "us history": "united states history",
+    "american history": "united states history",
+    "us government": "united states government",
+    "dna": "deoxyribonucleic acid",
+    "math": "mathematics",
+    "maths": "mathematics",
+    "bio": "biology",
+    "chem": "chemistry",
+    "geo": "geography",
+    "comp sci": "computer science",
+    "cs": "computer science",
+    "ai": "artificial intelligence",
+    "ml": "machine learning",
+    "pe": "physical education",
+    "mlk": "martin luther king jr",
+    "martin luther king junior": "martin luther king jr",
+    "fdr": "franklin d roosevelt",
+    "jfk": "john f kennedy",
+}
+
+STOPWORDS = {"the", "a", "an", "about", "quiz", "on"}
+
+# Plurals the suffix rules below would get wrong
+PLURAL_FORMS = {"shoes": "shoe", "canoes": "canoe", "toes": "toe", "oboes": "oboe", "gases": "gas",
+                "buses": "bus", "viruses": "virus", "atlases": "atlas", "bonuses": "bonus"}
+
+# Words where stripping a trailing "s" would be wrong ("diabetes" is already left alone: only
+# "-ies", "-oes/-xes/-ches/-shes/-sses" and an "s" after another consonant are plurals)
+PLURAL_EXCEPTIONS = {"physics", "mathematics", "economics", "politics", "genetics", "ethics",
+                     "news", "species", "series", "gas", "bus", "virus", "atlas", "texas", "paris",
+                     "mars", "venus", "uranus", "christmas", "is", "us", "its", "this", "jesus",
+                     "states"}
+
+
+def _roman_to_int(token: str) -> int:
+    total = 0
+    for i, ch in enumerate(token):
+        value = ROMAN_VALUES[ch]
+        if i + 1 < len(token) and ROMAN_VALUES[token[i + 1]] > value:
+            total -= value
+        else:
+            total += value
+    return total
+
+
+def _singular(token: str) -> str:
+    if token in PLURAL_FORMS:
+        return PLURAL_FORMS[token]
+    if token in PLURAL_EXCEPTIONS or len(token) <= 3 or token.isdigit():
+        return token
+    if token.endswith("ies") and len(token) > 4:
+        return token[:-3] + "y"
+    if token.endswith(("oes", "xes", "ches", "shes", "sses")):
+        return token[:-2]
+    if token.endswith("s") and token[-2] not in "aeious" and not token.endswith("ics"):
+        return token[:-1]
+    return token
+
+
+def _fold(text: str) -> str:
+    """Lowercase, strip accents and punctuation, collapse whitespace."""
+    text = unicodedata.normalize("NFKD", text)
+    text = "".join(ch for ch in text if not unicodedata.combining(ch))
+    text = text.lower().replace("&", " and ")
+    text = re.sub(r"['’]", "", text)
+    # Dotted abbreviations: "u.s." -> "us"
+    text = re.sub(r'\b([a-z])\.(?=[a-z]\b)', r'\1', text)
+    text = re.sub(r'[^a-z0-9]+', ' ', text)
+    return " ".join(text.split())
+
+
+def normalize_topic(topic: str) -> str:
+    """Deterministic canonical form of a topic (no fuzzy matching)."""
+    if not topic:
+        return ""
+    topic = CATEGORY_PREFIX.sub("", topic.strip().lstrip("📸").strip())
+    words = _fold(topic).split()
+    if len(words) > 1:
+        words = [w for w in words if w not in STOPWORDS] or words
+    text = " ".join(words)
+    text = ALIASES.get(text, text)
+
+    tokens = []
+    words = text.split()
+    for i, token in enumerate(words):
+        token = ALIASES.get(token, token)
+        token = NUMBER_WORDS.get(token, token)
+        last = i == len(words) - 1
+        if tokens and tokens[-1] in ROMAN_CONTEXT:
+            if ROMAN_NUMERAL.match(token):
+                token = str(_roman_to_int(token))
+            elif token == "i":
+                # "world war i", "type i diabetes"
+                token = "1"
+        elif tokens and last and (TRAILING_ROMAN_NUMERAL.match(token) or token == "i"):
+            # "algebra ii", "henry viii", "elizabeth i"
+            token = str(_roman_to_int(token))
+        if re.match(r'^\d+(st|nd|rd|th)$', token):
+            token = re.sub(r'(st|nd|rd|th)$', '', token)
+        else:
+            # Split letter/number runs: "grade5" -> "grade 5"
+            token = re.sub(r'(?<=[a-z])(?=\d)|(?<=\d)(?=[a-z])', ' ', token)
+        tokens.extend(_singular(t) for t in token.split())
+
+    text = " ".join(tokens)
+    return ALIASES.get(text, text)
+
+
+def _numbers(key: str) -> list:
+    """Digits and any roman numerals left in a normalized topic, in order."""
+    return [token for token in key.split() if token.isdigit() or ROMAN_NUMERAL.match(token)]
+
+
+def _ngrams(text: str, n: int = NGRAM_SIZE) -> set:
+    padded = f" {text} "
+    return {padded[i:i + n] for i in range(max(1, len(padded) - n + 1))}
+
+
+def similarity(a: str, b: str) -> float:
+    """Dice coefficient of character n-grams (1.0 = identical)."""
+    grams_a, grams_b = _ngrams(a), _ngrams(b)
+    if not grams_a or not grams_b:
+        return 0.0
+    return 2 * len(grams_a & grams_b) / (len(grams_a) + len(grams_b))
+
+
+class TopicIndex:
+    """Known canonical topics with an inverted n-gram index for fuzzy lookups."""
+
+    def __init__(self, threshold: float = FUZZY_THRESHOLD, max_topics: int = MAX_INDEXED_TOPICS):
+        self.threshold = threshold
+        self.max_topics = max_topics
+        self._topics = OrderedDict()  # canonical key -> n-gram set (LRU order)
+        self._postings = {}  # n-gram -> set of canonical keys
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._topics)
+
+    def _add(self, key: str, grams: set):
+        self._topics[key] = grams
+        for gram in grams:
+            self._postings.setdefault(gram, set()).add(key)
+        while len(self._topics) > self.max_topics:
+            old_key, old_grams = self._topics.popitem(last=False)
+            for gram in old_grams:
+                keys = self._postings.get(gram)
+                if keys is not None:
+                    keys.discard(old_key)
+                    if not keys:
+                        del self._postings[gram]
+
+    def best_match(self, normalized: str) -> tuple:
+        """Get (closest known key, similarity) using only topics that share an n-gram."""
+        grams = _ngrams(normalized)
+        with self._lock:
+            counts = {}
+            for gram in grams:
+                for key in self._postings.get(gram, ()):
+                    counts[key] = counts.get(key, 0) + 1
+            best_key, best_score = None, 0.0
+            for key, shared in counts.items():
+                score = 2 * shared / (len(grams) + len(self._topics[key]))
+                if score > best_score or (score == best_score and best_key is not None and key < best_key):
+                    best_key, best_score = key, score
+        return best_key, best_score
+
+    def resolve(self, normalized: str) -> str:
+        """Map a normalized topic onto a known close match, or register it as a new canonical key."""
+        if not normalized:
+            return ""
+        with self._lock:
+            if normalized in self._topics:
+                self._topics.move_to_end(normalized)
+                return normalized
+        match, score = self.best_match(normalized)
+        # Numbers must agree exactly: "world war 1" is not a typo of "world war 2"
+        if match is not None and score >= self.threshold and _numbers(match) == _numbers(normalized):
+            with self._lock:
+                if match in self._topics:
+                    self._topics.move_to_end(match)
+            return match
+        with self._lock:
+            if normalized not in self._topics:
+                self._add(normalized, _ngrams(normalized))
+        return normalized
+
+
+TOPIC_INDEX = TopicIndex()
+
+
+def canonical_topic_key(topic: str, index: TopicIndex = None) -> str:
+    """Canonical key for a topic: normalized, then fuzzy-matched against topics seen before."""
+    return (index or TOPIC_INDEX).resolve(normalize_topic(topic))
@@ -0,0 +1,129 @@
+# ============================================================
+# Study Buddy Quest - AI Tutor Sessions 🧑‍🏫
+# The quiz context (questions, answers, explanations and what
+# the student got wrong) is built once per quiz as a fixed
+# system instruction. Each turn then sends only a rolling
+# summary of older messages, the last few messages verbatim
+# and the new question.
+# ============================================================
+
+import hashlib
+import re
+
+KEEP_RECENT_MESSAGES = 4  # user + tutor messages sent word-for-word
+SUMMARY_MAX_CHARS = 1200
+SUMMARY_LINE_CHARS = 160
+
+TUTOR_RULES = """Respond as a helpful tutor:
+1. Answer their specific question directly and clearly
+2. Use simple, age-appropriate language
+3. Give examples if helpful
+4. Be encouraging and supportive
+5. Keep your response concise (2-4 short paragraphs max)
+6. If they ask something unrelated to the topic, gently guide them back to the quiz topic
+
+Remember: You're helping them LEARN, not just giving answers. Explain the "why" behind concepts!
+IMPORTANT: Use plain text only. Do NOT use any HTML tags, markdown formatting, or special formatting."""
+
+
+def _wrong_indexes(wrong_questions: list) -> list:
+    """Zero-based indexes of missed questions (accepts numbers or {'question_num': n} dicts)."""
+    indexes = []
+    for wq in wrong_questions:
+        q_num = wq.get('question_num', 0) if isinstance(wq, dict) else int(wq)
+        indexes.append(q_num - 1)
+    return indexes
+
+
+def quiz_fingerprint(topic: str, parsed_questions: list, correct_answers: list) -> str:
+    """Identify a quiz so its tutor session is rebuilt only when the quiz changes."""
+    text = topic + "|" + "|".join(q.get('text', '') for q in parsed_questions) + "|" + "".join(correct_answers)
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+def build_system_instruction(topic: str, parsed_questions: list, correct_answers: list,
+                             explanations: list, wrong_questions: list,
+                             got_perfect_score: bool = False) -> str:
+    """Compact quiz context: missed questions in full, the rest as one line each."""
+    missed = set(_wrong_indexes(wrong_questions))
+    lines = []
+    for i, q in enumerate(parsed_questions):
+        correct_ans = correct_answers[i] if i < len(correct_answers) else "?"
+        answer_text = q.get('options', {}).get(correct_ans, '')
+        if i in missed:
+            explanation = explanations[i] if i < len(explanations) else ""
+            lines.append(f"Q{i+1} (missed): {q.get('text', 'Question')}\n"
+                         f"Answer: {correct_ans}) {answer_text}\nExplanation: {explanation}")
+        else:
+            lines.append(f"Q{i+1}: {q.get('text', 'Question')} → {correct_ans}) {answer_text}")
+    context_text = "\n".join(lines) if lines else "General topic discussion."
+
+    if got_perfect_score:
+        score_context = "The student got a PERFECT SCORE! They're curious to learn more about the topic."
+    elif missed:
+        score_context = "The student got these questions wrong: " + ", ".join(f"Q{i+1}" for i in sorted(missed))
+    else:
+        score_context = "The student wants to understand the topic better."
+
+    return f"""You are a friendly, encouraging AI tutor helping a student who just took a quiz about "{topic}".
+
+Quiz content covered:
+{context_text}
+
+Student performance: {score_context}
+
+{TUTOR_RULES}"""
+
+
+def _first_sentence(text: str) -> str:
+    text = " ".join(text.split())
+    match = re.match(r'(.+?[.!?])(\s|$)', text)
+    sentence = match.group(1) if match else text
+    if len(sentence) > SUMMARY_LINE_CHARS:
+        sentence = sentence[:SUMMARY_LINE_CHARS - 1].rstrip() + "…"
+    return sentence
+
+
+class TutorSession:
+    """Tutor context for one quiz plus a rolling summary of the chat so far."""
+
+    def __init__(self, topic: str, parsed_questions: list, correct_answers: list,
+                 explanations: list, wrong_questions: list, got_perfect_score: bool = False):
+        self.fingerprint = quiz_fingerprint(topic, parsed_questions, correct_answers)
+        self.system_instruction = build_system_instruction(
+            topic, parsed_questions, correct_answers, explanations, wrong_questions, got_perfect_score)
+        self.summary_lines = []
+        self.summarized_upto = 0
+
+    def _compact(self, history: list):
+        """Fold messages older than the recent window into one-line summaries (each message once)."""
+        if self.summarized_upto > len(history):
+            # Chat was cleared
+            self.summary_lines = []
+            self.summarized_upto = 0
+        cutoff = max(0, len(history) - KEEP_RECENT_MESSAGES)
+        for msg in history[self.summarized_upto:cutoff]:
+            who = "Student asked" if msg["role"] == "user" else "Tutor explained"
+            self.summary_lines.append(f"- {who}: {_first_sentence(msg['content'])}")
+        self.summarized_upto = max(self.summarized_upto, cutoff)
+        while len(self.summary_lines) > 1 and sum(len(line) + 1 for line in self.summary_lines) > SUMMARY_MAX_CHARS:
+            self.summary_lines.pop(0)
+
+    def build_contents(self, history: list, question: str) -> list:
+        """Gemini `contents` for the next turn; `history` is the chat before `question`."""
+        self._compact(history)
+        turns = []
+        if self.summary_lines:
+            turns.append(("user", "Earlier in our chat:\n" + "\n".join(self.summary_lines)))
+        for msg in history[self.summarized_upto:]:
+            turns.append(("user" if msg["role"] == "user" else "model", msg["content"]))
+        turns.append(("user", question))
+
+        # Gemini expects alternating roles, so merge back-to-back messages from the same side
+        contents = []
+        for role, text in turns:
+            if contents and contents[-1]["role"] == role:
+                contents[-1]["parts"][0]["text"] += "\n\n" + text
+            else:
+                contents.append({"role": role, "parts": [{"text": text}]})
+        return contents